@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""录制上游接口的真实响应，供 :class:`benchmarks.upstream.RecordedUpstream` 离线回放
+
+需要访问网络，录制结果保存在 ``benchmarks/fixtures`` 下::
+
+    python -m benchmarks.record_fixtures --codes 004898 013594 000198
+
+    fixtures/
+        fund_name_em.csv                         # ak.fund_name_em()
+        fund_purchase_em.csv                     # ak.fund_purchase_em()
+        nav/<基金代码>.csv                       # ak.fund_open_fund_info_em(period="成立来")
+        tiantian/<接口名>/<基金代码>.json        # 天天基金接口的原始JSON
+
+天天基金接口近1月等区间的数据回放时由成立以来的数据截取，录制一次即可覆盖增量更新的路径；
+akshare的净值接口本身不支持按区间获取，总是返回成立以来的全部数据。
+"""
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+import akshare as ak
+
+from benchmarks.upstream import FIXTURES_DIR
+
+logger = logging.getLogger(__name__)
+
+TIANTIAN_ENDPOINTS = {
+    "FundVPageDiagram": ("https://fundcomapi.tiantianfunds.com/mm/newCore/FundVPageDiagram", {"RANGE": "ln"}),
+    "FundBondInvestDistri": ("https://fundcomapi.tiantianfunds.com/mm/FundMNewApi/FundBondInvestDistri", {}),
+    "FundAssetAllocation": ("https://fundcomapi.tiantianfunds.com/mm/FundMNewApi/FundAssetAllocation", {}),
+}
+
+
+def record(fund_codes: List[str], fixtures_dir: Path = FIXTURES_DIR) -> None:
+    """录制基金列表和 ``fund_codes`` 中各基金的净值及天天基金接口数据"""
+    from src.api.tiantian_api import client
+
+    fixtures_dir.mkdir(parents=True, exist_ok=True)
+    ak.fund_name_em().to_csv(fixtures_dir / "fund_name_em.csv", index=False)
+    ak.fund_purchase_em().to_csv(fixtures_dir / "fund_purchase_em.csv", index=False)
+
+    for fund_code in fund_codes:
+        logger.info(f"录制基金{fund_code}")
+        try:
+            nav_dir = fixtures_dir / "nav"
+            nav_dir.mkdir(exist_ok=True)
+            ak.fund_open_fund_info_em(symbol=fund_code, indicator="单位净值走势", period="成立来").to_csv(nav_dir / f"{fund_code}.csv", index=False)
+        except Exception as e:
+            # 货币基金没有单位净值走势，只录制天天基金接口
+            logger.warning(f"基金{fund_code}净值数据录制失败: {e}")
+
+        for endpoint, (url, params) in TIANTIAN_ENDPOINTS.items():
+            content = client.get_json(url, params={"FCODE": fund_code, **params})
+            endpoint_dir = fixtures_dir / "tiantian" / endpoint
+            endpoint_dir.mkdir(parents=True, exist_ok=True)
+            (endpoint_dir / f"{fund_code}.json").write_text(json.dumps(content, ensure_ascii=False), encoding="utf-8")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="录制上游接口的响应")
+    parser.add_argument("--codes", nargs="+", required=True, help="需要录制的基金代码")
+    parser.add_argument("--fixtures-dir", type=Path, default=FIXTURES_DIR, help="录制结果的保存目录")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    record(args.codes, args.fixtures_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
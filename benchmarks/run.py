@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+"""离线基准测试
+
+上游接口由 :class:`benchmarks.upstream.RecordedUpstream` 替代，缓存写入临时目录，不访问网络、不影响项目缓存。用法::
+
+    python -m benchmarks.run                                  # 运行全部基准测试
+    python -m benchmarks.run --quick --suite calculate cache  # 只运行部分测试，并缩小数据规模
+    python -m benchmarks.run --output results.json            # 保存结果
+    python -m benchmarks.run --save-baseline                  # 将结果保存为基线
+    python -m benchmarks.run --baseline benchmarks/baseline.json --threshold 0.25
+
+每项结果为单次操作的耗时（秒，越小越好），取多轮测量中的最小值。指定基线时，耗时超过基线 ``1 + threshold`` 倍的项目视为性能回退，
+进程以非零状态退出。基线与机器相关，在新环境中应先用 ``--save-baseline`` 重新生成。
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from benchmarks.upstream import RecordedUpstream
+
+BASELINE_FILE = Path(__file__).resolve().parent / "baseline.json"
+
+# 完整运行和 --quick 运行的数据规模
+SIZES = {
+    "full": {
+        "days": [1000, 5000, 10000],
+        "entries": [100, 1000, 10000],
+        "universe": [2000, 20000],
+        "concurrency": [1, 16, 64],
+        "funds": 20,
+        "requests": 1000,
+    },
+    "quick": {"days": [1000, 5000], "entries": [100, 1000], "universe": [2000], "concurrency": [1, 16], "funds": 5, "requests": 200},
+}
+
+# 天天基金净值接口
+TIANTIAN_NAV_URL = "https://fundcomapi.tiantianfunds.com/mm/newCore/FundVPageDiagram"
+
+
+def measure(func: Callable[[], object], number: int = 1, repeat: int = 5) -> float:
+    """返回单次调用的耗时（秒），为 ``repeat`` 轮测量中每轮平均耗时的最小值"""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def nav_frame(upstream: RecordedUpstream, fund_code: str) -> pd.DataFrame:
+    """与 ``get_fund_networth`` 返回格式相同的净值数据"""
+    from src.fund import _fetch_fund_networth
+
+    with upstream.install():
+        return _fetch_fund_networth(fund_code)
+
+
+def money_frame(upstream: RecordedUpstream, fund_code: str) -> pd.DataFrame:
+    """与 ``get_money_fund_values`` 返回格式相同的货币基金收益数据"""
+    from src.api.tiantian_api import _process_money_fund_values
+
+    return _process_money_fund_values(fund_code, upstream.tiantian_get_json(TIANTIAN_NAV_URL, {"FCODE": fund_code, "RANGE": "ln"}))
+
+
+def bench_calculate(sizes: Dict[str, list]) -> Dict[str, float]:
+    """各统计函数在不同净值历史长度下的单次耗时"""
+    from src import fund
+
+    results = {}
+    for days in sizes["days"]:
+        upstream = RecordedUpstream(universe=4, days=days)
+        fund_data = nav_frame(upstream, "000001")
+        money_data = money_frame(upstream, "000003")
+
+        cases = {
+            "weekly_returns": lambda: fund.calculate_weekly_returns(fund_data),
+            "annualized_returns": lambda: fund.calculate_annualized_returns(fund_data),
+            "historical_performance": lambda: fund.calculate_historical_performance(fund_data),
+            "networth_points": lambda: fund.get_historical_networth_points(fund_data),
+            "risk_metrics": lambda: fund.calculate_fund_risk_metrics(fund_data),
+            "fund_analytics": lambda: fund._build_fund_analytics(fund_data),
+            "money_fund_analytics": lambda: fund._build_money_fund_analytics(money_data),
+        }
+        for name, func in cases.items():
+            results[f"calculate.{name}[{days}d]"] = measure(func, number=10)
+    return results
+
+
+def _clear_fund_caches() -> None:
+    from src import fund
+    from src.api import tiantian_api
+
+    fund.fund_networth_cache.clear()
+    fund.fund_analytics_cache.clear()
+    tiantian_api.cache.clear()
+    tiantian_api.values_cache.clear()
+
+
+def bench_fund_returns(sizes: Dict[str, list], days: int) -> Dict[str, float]:
+    """get_fund_returns 的冷启动（无缓存）、磁盘缓存命中和内存缓存命中的延迟"""
+    from src import fund
+
+    upstream = RecordedUpstream(universe=2000, days=days)
+    # 普通基金和货币基金各取若干只
+    fund_codes = {
+        "fund": [f"{i:06d}" for i in range(1, 4 * sizes["funds"], 4)],
+        "money_fund": [f"{i:06d}" for i in range(3, 4 * sizes["funds"], 4)],
+    }
+
+    results = {}
+    with upstream.install():
+        # 基金列表所有请求共用，先加载；再生成一遍合成数据，使冷启动耗时不包含数据生成
+        fund.get_cached_fund_info()
+        _clear_fund_caches()
+        for codes in fund_codes.values():
+            for fund_code in codes:
+                fund.get_fund_returns(fund_code)
+
+        for kind, codes in fund_codes.items():
+            elapsed = []
+            for fund_code in codes:
+                _clear_fund_caches()
+                start = time.perf_counter()
+                fund.get_fund_returns(fund_code)
+                elapsed.append(time.perf_counter() - start)
+            results[f"fund_returns.{kind}.cold[{days}d]"] = min(elapsed)
+
+            # 清空内存层，只命中磁盘缓存
+            def disk_hit():
+                for fund_code in codes:
+                    fund.fund_networth_cache.memory.clear()
+                    fund.fund_analytics_cache.memory.clear()
+                    fund.get_fund_returns(fund_code)
+
+            results[f"fund_returns.{kind}.warm_disk[{days}d]"] = measure(disk_hit) / len(codes)
+            warm_memory = measure(lambda: [fund.get_fund_returns(fund_code) for fund_code in codes])
+            results[f"fund_returns.{kind}.warm_memory[{days}d]"] = warm_memory / len(codes)
+    return results
+
+
+def bench_cache(sizes: Dict[str, list], days: int, cache_dir: Path) -> Dict[str, float]:
+    """FileCache 和 NavFileCache 的读写耗时随条目数量的变化"""
+    from src import fund
+    from src.utils.cache_utils import FileCache, NavFileCache
+
+    upstream = RecordedUpstream(universe=4, days=days)
+    fund_data = nav_frame(upstream, "000001")
+    # 与统计结果快照大小相同的对象
+    analytics = fund._build_fund_analytics(fund_data)
+
+    results = {}
+    rng = np.random.default_rng(0)
+    for entries in sizes["entries"]:
+        for name, cache_cls, value, count in (
+            ("file", FileCache, analytics, entries),
+            # 净值数据较大，条目数量最多1000
+            ("nav", NavFileCache, fund_data, min(entries, 1000)),
+        ):
+            cache = cache_cls(ttl=3600, maxsize=count, cache_dir=cache_dir / f"{name}-{entries}")
+            start = time.perf_counter()
+            for i in range(count):
+                cache[f"key{i}"] = value
+            results[f"cache.{name}.write[{count}]"] = (time.perf_counter() - start) / count
+
+            keys = [f"key{i}" for i in rng.integers(0, count, size=min(count, 500))]
+            results[f"cache.{name}.read[{count}]"] = measure(lambda: [cache[key] for key in keys], repeat=3) / len(keys)
+
+            # 重新打开缓存目录时扫描已有条目的耗时
+            reopened = cache_cls(ttl=3600, maxsize=count, cache_dir=cache.cache_dir)
+            start = time.perf_counter()
+            len(reopened)
+            results[f"cache.{name}.scan[{count}]"] = time.perf_counter() - start
+    return results
+
+
+def bench_api(sizes: Dict[str, list], days: int) -> Dict[str, float]:
+    """并发请求 ``/api/fund/{code}`` 时每个请求的平均耗时，其倒数为每秒请求数"""
+    import httpx
+
+    from src import fund
+    from src.main import app
+
+    upstream = RecordedUpstream(universe=2000, days=days)
+    fund_codes = [f"{i:06d}" for i in range(1, sizes["funds"] + 1)]
+    requests_per_level = sizes["requests"]
+
+    async def run(concurrency: int, headers: Optional[Dict[str, str]] = None) -> float:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            queue: asyncio.Queue = asyncio.Queue()
+            for i in range(requests_per_level):
+                queue.put_nowait(fund_codes[i % len(fund_codes)])
+
+            async def worker():
+                while not queue.empty():
+                    fund_code = queue.get_nowait()
+                    response = await client.get(f"/api/fund/{fund_code}", params={"format": "columnar"}, headers=headers)
+                    if response.status_code not in (200, 304):
+                        raise RuntimeError(f"{fund_code}: HTTP {response.status_code}")
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            return (time.perf_counter() - start) / requests_per_level
+
+    results = {}
+    with upstream.install():
+        for fund_code in fund_codes:
+            fund.get_fund_returns(fund_code)
+        for concurrency in sizes["concurrency"]:
+            results[f"api.fund[c={concurrency}]"] = min(asyncio.run(run(concurrency)) for _ in range(3))
+        # 条件请求：ETag匹配时返回304，不计算收益
+        results["api.fund.not_modified"] = min(asyncio.run(run(1, {"If-None-Match": "*"})) for _ in range(3))
+    return results
+
+
+def bench_screener(sizes: Dict[str, list]) -> Dict[str, float]:
+    """全市场筛选统计在不同基金数量下的耗时，使用近1年的合成净值矩阵"""
+    from src.screener import calculate_screener_stats
+
+    results = {}
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range(end="2025-06-13", periods=260).to_numpy().astype("int64")
+    for universe in sizes["universe"]:
+        matrix = np.cumprod(1 + rng.normal(0.0003, 0.01, (len(dates), universe)), axis=0)
+        # 约5%的净值缺失
+        matrix[rng.random(matrix.shape) < 0.05] = np.nan
+        matrix[0] = 1.0
+        codes = [f"{i:06d}" for i in range(1, universe + 1)]
+        results[f"screener.stats[{universe}]"] = measure(lambda: calculate_screener_stats(dates, codes, matrix), repeat=3)
+    return results
+
+
+# 在新进程中导入应用，依次请求首页和已缓存的基金，输出各步耗时及此时是否已导入akshare、pandas
+STARTUP_SCRIPT = """
+import asyncio, json, sys, time
+
+start = time.perf_counter()
+from src.main import app
+timings = {"import_app": time.perf_counter() - start}
+loaded = {}
+
+import httpx
+
+async def main():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+        for name, path in [("first_index", "/")] + [(name, f"/api/fund/{code}") for name, code in json.loads(sys.argv[1]).items()]:
+            start = time.perf_counter()
+            response = await client.get(path)
+            timings[name] = time.perf_counter() - start
+            response.raise_for_status()
+            loaded[name] = {"akshare": "akshare" in sys.modules, "pandas": "pandas" in sys.modules}
+
+asyncio.run(main())
+print(json.dumps({"timings": timings, "loaded": loaded}))
+"""
+
+
+def _import_time(module: str, env: Dict[str, str]) -> Dict[str, float]:
+    """用 ``-X importtime`` 导入模块，返回 ``module`` 及其直接导入的各模块的累计导入耗时（秒）"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], env=env, cwd=PROJECT_DIR, capture_output=True, text=True, check=True
+    )
+    modules = {}
+    for line in completed.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package，名称前每两个空格表示一层嵌套
+        if not line.startswith("import time:") or not line.split("|")[1].strip().isdigit():
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1 or name.strip() == module:
+            modules[name.strip()] = modules.get(name.strip(), 0) + int(cumulative) / 1e6
+    return modules
+
+
+def bench_startup(days: int) -> Dict[str, float]:
+    """冷启动耗时：导入应用，以及新进程中首次请求首页和首次请求已缓存基金的延迟
+
+    首页和缓存命中的请求不应导入akshare，否则抛出RuntimeError
+    """
+    from src import fund
+
+    upstream = RecordedUpstream(universe=2000, days=days)
+    fund_codes = {"first_fund_hit": "000001", "first_money_fund_hit": "000003"}
+    with upstream.install():
+        for fund_code in fund_codes.values():
+            fund.get_fund_returns(fund_code)
+
+    # 子进程使用相同的缓存目录和模块搜索路径
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+    modules = _import_time("src.main", env)
+    heaviest = sorted(((seconds, name) for name, seconds in modules.items() if name != "src.main"), reverse=True)[:8]
+    print("src.main 导入耗时最多的模块: " + ", ".join(f"{name} {seconds * 1000:.0f}ms" for seconds, name in heaviest), file=sys.stderr)
+
+    runs = []
+    for _ in range(3):
+        completed = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT, json.dumps(fund_codes)], env=env, cwd=PROJECT_DIR, capture_output=True, text=True, check=True
+        )
+        runs.append(json.loads(completed.stdout.splitlines()[-1]))
+
+    for name, loaded in runs[0]["loaded"].items():
+        if loaded["akshare"]:
+            raise RuntimeError(f"冷启动后请求{name}时导入了akshare")
+
+    results = {"startup.import_main": modules["src.main"]}
+    for name in runs[0]["timings"]:
+        results[f"startup.{name}"] = min(run["timings"][name] for run in runs)
+    return results
+
+
+SUITES = ["calculate", "fund_returns", "cache", "api", "screener", "startup"]
+
+
+def run_suites(suites: List[str], quick: bool, days: int, cache_dir: Path) -> Dict[str, float]:
+    sizes = SIZES["quick" if quick else "full"]
+    results = {}
+    for suite in suites:
+        start = time.perf_counter()
+        if suite == "calculate":
+            results.update(bench_calculate(sizes))
+        elif suite == "fund_returns":
+            results.update(bench_fund_returns(sizes, days))
+        elif suite == "cache":
+            results.update(bench_cache(sizes, days, cache_dir / "bench_cache"))
+        elif suite == "api":
+            results.update(bench_api(sizes, days))
+        elif suite == "screener":
+            results.update(bench_screener(sizes))
+        elif suite == "startup":
+            results.update(bench_startup(days))
+        print(f"{suite} 完成，用时{time.perf_counter() - start:.1f}秒", file=sys.stderr)
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    """返回耗时超过基线 ``1 + threshold`` 倍的项目说明"""
+    regressions = []
+    for name, seconds in sorted(results.items()):
+        base = baseline.get(name)
+        if base and seconds > base * (1 + threshold):
+            regressions.append(f"{name}: {seconds * 1000:.3f}ms，基线{base * 1000:.3f}ms（{seconds / base - 1:+.0%}）")
+    return regressions
+
+
+def print_table(results: Dict[str, float], baseline: Dict[str, float]) -> None:
+    width = max(map(len, results), default=0)
+    print(f"{'benchmark':<{width}}  {'ms/op':>10}  {'ops/s':>10}  {'vs baseline':>11}")
+    for name, seconds in sorted(results.items()):
+        base = baseline.get(name)
+        change = f"{seconds / base - 1:+.0%}" if base else "-"
+        print(f"{name:<{width}}  {seconds * 1000:>10.3f}  {1 / seconds if seconds else float('inf'):>10.1f}  {change:>11}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="离线基准测试")
+    parser.add_argument("--suite", nargs="+", choices=SUITES, default=SUITES, help="需要运行的测试，默认全部")
+    parser.add_argument("--quick", action="store_true", help="缩小数据规模，用于快速检查")
+    parser.add_argument("--days", type=int, default=2500, help="fund_returns、cache、api 测试中每只基金的净值天数")
+    parser.add_argument("--output", type=Path, help="结果保存路径（JSON）")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE, help="对比的基线文件")
+    parser.add_argument("--save-baseline", action="store_true", help="将结果合并保存到基线文件")
+    parser.add_argument("--threshold", type=float, default=0.25, help="耗时超过基线的比例达到该值时视为性能回退")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory(prefix="alpha-select-bench-") as cache_dir:
+        # 在导入 src 之前设置，所有缓存写入临时目录
+        os.environ["FUND_CACHE_DIR"] = str(Path(cache_dir) / "fund")
+        os.environ["CACHE_DIR"] = str(Path(cache_dir) / "api")
+        # 替身不需要保护，不限制对它的请求速率，避免冷缓存的耗时被限流等待占据
+        os.environ.setdefault("UPSTREAM_RATE", "1000000")
+        os.environ.setdefault("UPSTREAM_BURST", "1000000")
+        # main.py 按相对路径挂载静态文件
+        os.chdir(PROJECT_DIR)
+        results = run_suites(args.suite, args.quick, args.days, Path(cache_dir))
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"] if args.baseline.exists() else {}
+    print_table(results, baseline)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "quick": args.quick,
+            "days": args.days,
+        },
+        "results": results,
+    }
+    if args.output is not None:
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    if args.save_baseline:
+        report["results"] = {**baseline, **results}
+        args.baseline.write_text(json.dumps(report, indent=2, ensure_ascii=False, sort_keys=True), encoding="utf-8")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for line in regressions:
+        print(f"性能回退 {line}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""离线的上游数据替身
+
+替换 ``akshare`` 的 ``fund_name_em``、``fund_purchase_em``、``fund_open_fund_info_em`` 和天天基金接口的
+``client.get_json``，优先返回 ``record_fixtures.py`` 录制的真实响应，没有录制数据的基金使用按基金代码
+确定性生成的合成数据，因此基准测试和单元测试都不需要访问网络，结果可以复现。
+
+    upstream = RecordedUpstream(universe=2000, days=2500)
+    with upstream.install():
+        get_fund_returns("000001")
+"""
+
+import json
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+# 合成数据的最后一个交易日，固定以便结果可以复现
+END_DATE = pd.Timestamp("2025-06-13")
+
+FUND_TYPES = ["混合型-偏股", "债券型-长债", "货币型-普通货币", "指数型-股票"]
+
+# 天天基金的 RANGE 参数对应的自然日数
+TIANTIAN_RANGE_DAYS = {"y": 31, "3y": 92, "6y": 183, "n": 366, "3n": 1100, "5n": 1830, "ln": None}
+
+
+class RecordedUpstream:
+    """上游接口替身
+
+    Parameters
+    ----------
+    universe : int
+        合成基金列表中的基金数量，基金代码为 000001 起的连续编号，类型按 ``FUND_TYPES`` 轮换
+    days : int
+        每只基金合成净值历史的交易日数
+    fixtures_dir : Path
+        录制数据所在目录，不存在时全部使用合成数据
+    """
+
+    def __init__(self, universe: int = 2000, days: int = 2500, fixtures_dir: Optional[Path] = FIXTURES_DIR):
+        self.universe = universe
+        self.days = days
+        self.fixtures_dir = Path(fixtures_dir) if fixtures_dir is not None else None
+        self.calls: Counter = Counter()
+        # 合成数据按 (种类, 基金代码) 缓存，避免基准测试的耗时被数据生成占据
+        self._frames: Dict[Tuple[str, str], pd.DataFrame] = {}
+
+    # ---------------------------------------------------------------- 录制数据
+
+    def _recorded(self, *parts: str) -> Optional[Path]:
+        if self.fixtures_dir is None:
+            return None
+        path = self.fixtures_dir.joinpath(*parts)
+        return path if path.exists() else None
+
+    # ---------------------------------------------------------------- akshare
+
+    def codes(self):
+        return [f"{i:06d}" for i in range(1, self.universe + 1)]
+
+    def fund_type(self, fund_code: str) -> str:
+        return FUND_TYPES[(int(fund_code) - 1) % len(FUND_TYPES)]
+
+    def fund_name_em(self) -> pd.DataFrame:
+        self.calls["fund_name_em"] += 1
+        recorded = self._recorded("fund_name_em.csv")
+        if recorded is not None:
+            return pd.read_csv(recorded, dtype={"基金代码": str})
+
+        codes = self.codes()
+        return pd.DataFrame(
+            {
+                "基金代码": codes,
+                "拼音缩写": "JJ",
+                "基金简称": [f"基金{code}" for code in codes],
+                "基金类型": [self.fund_type(code) for code in codes],
+                "拼音全称": "JIJIN",
+            }
+        )
+
+    def fund_purchase_em(self) -> pd.DataFrame:
+        self.calls["fund_purchase_em"] += 1
+        recorded = self._recorded("fund_purchase_em.csv")
+        if recorded is not None:
+            return pd.read_csv(recorded, dtype={"基金代码": str})
+
+        codes = self.codes()
+        return pd.DataFrame(
+            {
+                "基金代码": codes,
+                "申购状态": ["暂停申购" if int(code) % 3 == 0 else "开放申购" for code in codes],
+                "赎回状态": "开放赎回",
+            }
+        )
+
+    def _dates(self) -> pd.DatetimeIndex:
+        return pd.bdate_range(end=END_DATE, periods=self.days)
+
+    def _navs(self, fund_code: str) -> pd.DataFrame:
+        if ("nav", fund_code) in self._frames:
+            return self._frames["nav", fund_code].copy()
+        rng = np.random.default_rng(int(fund_code))
+        navs = np.cumprod(1 + rng.normal(0.0003, 0.01, self.days)).round(4)
+        growth = np.r_[0.0, np.diff(navs) / navs[:-1] * 100].round(2)
+        df = self._frames["nav", fund_code] = pd.DataFrame({"净值日期": self._dates(), "单位净值": navs, "日增长率": growth})
+        return df.copy()
+
+    def _money_values(self, fund_code: str) -> pd.DataFrame:
+        if ("money", fund_code) in self._frames:
+            return self._frames["money", fund_code].copy()
+        rng = np.random.default_rng(int(fund_code))
+        yields = (1.8 + np.cumsum(rng.normal(0, 0.01, self.days))).clip(0.5).round(4)
+        income = (yields / 365 * 100 + rng.normal(0, 0.005, self.days)).round(4)
+        df = self._frames["money", fund_code] = pd.DataFrame({"净值日期": self._dates(), "每万份收益": income, "7日年化收益率": yields})
+        return df.copy()
+
+    def fund_open_fund_info_em(self, symbol: str = "000001", indicator: str = "单位净值走势", period: str = "成立来") -> pd.DataFrame:
+        # 与akshare一致，period 参数不起作用，总是返回成立以来的全部数据
+        self.calls["fund_open_fund_info_em"] += 1
+        recorded = self._recorded("nav", f"{symbol}.csv")
+        if recorded is not None:
+            df = pd.read_csv(recorded, parse_dates=["净值日期"])
+        elif symbol in self.codes():
+            df = self._navs(symbol)
+        else:
+            # 与akshare一致，不存在的基金代码解析响应时出错
+            raise KeyError("Data_netWorthTrend")
+        # 与akshare一致，日期列为 datetime.date 对象
+        df["净值日期"] = df["净值日期"].dt.date
+        return df
+
+    # ---------------------------------------------------------------- 天天基金
+
+    def tiantian_get_json(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+        params = params or {}
+        fund_code = params.get("FCODE", "")
+        endpoint = url.rsplit("/", 1)[-1]
+        self.calls[f"tiantian.{endpoint}"] += 1
+
+        recorded = self._recorded("tiantian", endpoint, f"{fund_code}.json")
+        if recorded is not None:
+            content = json.loads(recorded.read_text(encoding="utf-8"))
+            if endpoint == "FundVPageDiagram":
+                content = dict(content, data=self._since_records(content.get("data", []), TIANTIAN_RANGE_DAYS[params.get("RANGE", "ln")]))
+            return content
+
+        if endpoint != "FundVPageDiagram":
+            return {"data": [], "errorCode": 0, "success": True, "totalCount": 0}
+
+        if "货币型" in self.fund_type(fund_code):
+            df = self._money_values(fund_code).rename(columns={"每万份收益": "DWJZ", "7日年化收益率": "LJJZ"})
+        else:
+            df = self._navs(fund_code).rename(columns={"单位净值": "DWJZ"})
+            df["LJJZ"] = df["DWJZ"]
+        records = [
+            {"FSRQ": date, "DWJZ": f"{dwjz:.4f}", "LJJZ": f"{ljjz:.4f}"}
+            for date, dwjz, ljjz in zip(df["净值日期"].dt.strftime("%Y-%m-%d"), df["DWJZ"], df["LJJZ"])
+        ]
+        records = self._since_records(records, TIANTIAN_RANGE_DAYS[params.get("RANGE", "ln")])
+        return {"data": records, "errorCode": 0, "success": True, "totalCount": len(records)}
+
+    @staticmethod
+    def _since_records(records, days: Optional[int]):
+        if days is None or not records:
+            return records
+        cutoff = (pd.Timestamp(max(record["FSRQ"] for record in records)) - pd.Timedelta(days=days)).strftime("%Y-%m-%d")
+        return [record for record in records if record["FSRQ"] >= cutoff]
+
+    # ---------------------------------------------------------------- 安装
+
+    @contextmanager
+    def install(self) -> Iterator["RecordedUpstream"]:
+        """在代码块内用替身替换上游接口"""
+        import akshare
+
+        from src.api import tiantian_api
+
+        with ExitStack() as stack:
+            stack.enter_context(mock.patch.object(akshare, "fund_name_em", self.fund_name_em, create=True))
+            stack.enter_context(mock.patch.object(akshare, "fund_purchase_em", self.fund_purchase_em, create=True))
+            stack.enter_context(mock.patch.object(akshare, "fund_open_fund_info_em", self.fund_open_fund_info_em, create=True))
+            stack.enter_context(mock.patch.object(tiantian_api.client, "get_json", self.tiantian_get_json))
+            yield self
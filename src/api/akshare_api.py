@@ -1,20 +1,26 @@
 # -*- coding: utf-8 -*-
 import logging
+import os
 from datetime import timedelta
-from typing import Dict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
 
-import akshare as ak
 import pandas as pd
-from cachetools import cached
 
-from ..utils.cache_utils import FileCache
+from ..utils import governor, telemetry
+from ..utils.cache_utils import FileCache, TieredCache, single_flight
 
-cache = FileCache(ttl=timedelta(hours=24))
+cache = TieredCache(
+    FileCache(ttl=timedelta(hours=24), maxsize=8, cache_dir=Path(os.getenv("CACHE_DIR", ".cache")) / "akshare"),
+    maxsize=8,
+)
+
+telemetry.register_caches({"akshare": cache})
 
 logger = logging.getLogger(__name__)
 
 
-@cached(cache=cache, key=lambda: "get_fund_list")
+@single_flight(cache=cache, key=lambda: "get_fund_list")
 def get_fund_list() -> pd.DataFrame:
     """获取所有公募基金数据
 
@@ -22,13 +28,46 @@ def get_fund_list() -> pd.DataFrame:
         pd.DataFrame: 包含所有公募基金数据的DataFrame
             columns: 基金代码、基金简称、基金类型、申购状态、赎回状态
     """
-    fund_name_df = ak.fund_name_em()[["基金代码", "基金简称", "基金类型"]]
-    fund_purchase_df = ak.fund_purchase_em()[["基金代码", "申购状态", "赎回状态"]]
+    # akshare依赖众多、导入较慢，只在需要请求上游时导入
+    import akshare as ak
+
+    with telemetry.span("upstream_fund_list"):
+        with governor.guard(governor.EASTMONEY_HOST):
+            fund_name_df = ak.fund_name_em()[["基金代码", "基金简称", "基金类型"]]
+        with governor.guard(governor.EASTMONEY_HOST):
+            fund_purchase_df = ak.fund_purchase_em()[["基金代码", "申购状态", "赎回状态"]]
     fund_df = pd.merge(fund_name_df, fund_purchase_df, on="基金代码", how="outer")
 
     return fund_df
 
 
+FUND_INFO_COLUMNS = ["基金代码", "基金简称", "基金类型", "申购状态", "赎回状态"]
+
+
+# 最近一次构建索引所用的基金列表和构建结果，基金列表在内存层中未被替换时直接复用索引
+_fund_index: Tuple[Optional[pd.DataFrame], Optional[Dict[str, tuple]]] = (None, None)
+
+
+def get_fund_index() -> Dict[str, tuple]:
+    """获取以基金代码为键的基金信息索引
+
+    由 :func:`get_fund_list` 的缓存条目构建，与基金列表始终一致；每份基金列表在每个进程中只构建一次，
+    查询单只基金时不再扫描整个基金列表
+
+    Returns:
+        Dict[str, tuple]: 基金代码 -> (基金简称, 基金类型, 申购状态, 赎回状态)
+    """
+    global _fund_index
+
+    fund_list = get_fund_list()
+    cached_list, fund_index = _fund_index
+    if cached_list is not fund_list:
+        fund_df = fund_list.drop_duplicates("基金代码")
+        fund_index = dict(zip(fund_df["基金代码"], fund_df[FUND_INFO_COLUMNS[1:]].itertuples(index=False, name=None)))
+        _fund_index = (fund_list, fund_index)
+    return fund_index
+
+
 def get_fund_info(fund_code: str) -> Dict[str, str]:
     """获取指定基金基本信息
 
@@ -43,10 +82,9 @@ def get_fund_info(fund_code: str) -> Dict[str, str]:
         包含基金基本信息的字典，包括：
         - 基金代码, 基金简称, 基金类型, 申购状态, 赎回状态
     """
-    fund_df = get_fund_list()
-    fund_info = fund_df[fund_df["基金代码"] == fund_code]
+    fund_info = get_fund_index().get(fund_code)
 
-    if fund_info.empty:
+    if fund_info is None:
         return {
             "基金代码": fund_code,
             "基金简称": "未查询到",
@@ -55,4 +93,4 @@ def get_fund_info(fund_code: str) -> Dict[str, str]:
             "赎回状态": "未查询到",
         }
 
-    return fund_info.to_dict(orient="records")[0]
+    return dict(zip(FUND_INFO_COLUMNS, (fund_code, *fund_info)))
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ..utils.governor import guard
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class HttpClient:
+    """带连接池的HTTP客户端
+
+    同一个实例内复用长连接，避免每次请求重新进行TCP和TLS握手。
+    同时建立的连接数不超过 ``max_connections``，超出的请求等待空闲连接；
+    连接错误和 ``RETRY_STATUS_CODES`` 中的状态码按指数退避重试。
+
+    Parameters
+    ----------
+    headers : dict, optional
+        每个请求都携带的请求头
+    timeout : float
+        单次请求的超时时间，单位为秒，可在调用时覆盖
+    max_connections : int
+        最大并发连接数
+    retries : int
+        失败后的最大重试次数
+    backoff : float
+        退避基数，第n次重试前等待 ``backoff * 2 ** (n - 1)`` 秒
+    """
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 10,
+        max_connections: int = 10,
+        retries: int = 3,
+        backoff: float = 0.5,
+    ):
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.retries = retries
+        self.backoff = backoff
+
+        self._session: Optional[requests.Session] = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        """同步会话，首次使用时创建"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    retry = Retry(
+                        total=self.retries,
+                        backoff_factor=self.backoff,
+                        status_forcelist=RETRY_STATUS_CODES,
+                        allowed_methods=frozenset(["GET"]),
+                        raise_on_status=False,
+                    )
+                    adapter = HTTPAdapter(pool_maxsize=self.max_connections, pool_block=True, max_retries=retry)
+                    session = requests.Session()
+                    session.headers.update(self.headers)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    def get_json(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+        """发送GET请求并解析JSON响应，请求受目标主机的限流和熔断控制（见 :mod:`src.utils.governor`）"""
+        with guard(urlsplit(url).hostname):
+            response = self.session.get(url, params=params, timeout=timeout or self.timeout)
+            response.raise_for_status()
+            return response.json()
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
@@ -1,17 +1,37 @@
 # -*- coding: utf-8 -*-
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
-from typing import Any, Dict, List
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
-import cachetools.func
 import pandas as pd
-import requests
-from cachetools import cached
 
-from ..utils.cache_utils import FileCache
+from ..utils import telemetry
+from ..utils.cache_utils import FileCache, NavFileCache, TieredCache, get_or_refresh, single_flight
+from ..utils.nav_utils import merge_recent_history
 from .akshare_api import get_fund_info
-
-cache = FileCache(ttl=timedelta(hours=24))
+from .http_client import HttpClient
+
+MAX_FUND_CACHE = int(os.getenv("MAX_FUND_CACHE", 100))
+CACHE_DIR = Path(os.getenv("CACHE_DIR", ".cache"))
+
+# 每只基金缓存券种分布、资产分布两个条目
+cache = FileCache(ttl=timedelta(hours=24), maxsize=2 * MAX_FUND_CACHE, cache_dir=CACHE_DIR / "tiantian")
+# 净值数据与 fund_networth_cache 一样以列式二进制格式保存，读取时内存映射、不经过pickle，内存层保存最近使用的对象。
+# 缓存中不含基金代码列，日期无法解析的行在写入前丢弃
+values_cache = TieredCache(
+    NavFileCache(
+        ttl=timedelta(hours=24),
+        maxsize=MAX_FUND_CACHE,
+        max_bytes=int(os.getenv("MAX_FUND_CACHE_BYTES", 256 * 1024 * 1024)),
+        cache_dir=CACHE_DIR / "tiantian_values",
+    ),
+    maxsize=int(os.getenv("MAX_FUND_MEMORY_CACHE", 32)),
+)
+
+telemetry.register_caches({"tiantian": cache, "tiantian_values": values_cache})
 
 logger = logging.getLogger(__name__)
 
@@ -20,8 +40,19 @@ TIANTIAN_HEADERS = {
     "User-Agent": "EMProjJijin/6.6.13 (iPhone; iOS 17.4.1; Scale/3.00)",
 }
 
+# 所有天天基金接口共用一个连接池
+client = HttpClient(
+    headers=TIANTIAN_HEADERS,
+    timeout=float(os.getenv("TIANTIAN_TIMEOUT", 10)),
+    max_connections=int(os.getenv("TIANTIAN_MAX_CONNECTIONS", 10)),
+)
+
+FUND_VALUES_URL = "https://fundcomapi.tiantianfunds.com/mm/newCore/FundVPageDiagram"
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="tiantian")
+
 
-@cached(cache=cache, key=lambda fund_code: f"get_bond_investment_distribution__{fund_code}")
+@single_flight(cache=cache, key=lambda fund_code: f"get_bond_investment_distribution__{fund_code}")
 def get_bond_investment_distribution(fund_code: str) -> dict:
     """获取债券基金券种分布数据
         {
@@ -63,8 +94,8 @@ def get_bond_investment_distribution(fund_code: str) -> dict:
     result = {"基金代码": fund_code, "报告日期": "", "信用债": 0, "利率债": 0, "可转债": 0, "其他券种": 0}
 
     url = "https://fundcomapi.tiantianfunds.com/mm/FundMNewApi/FundBondInvestDistri"
-    response = requests.get(url, params={"FCODE": fund_code}, headers=TIANTIAN_HEADERS)
-    content = response.json()
+    with telemetry.span("upstream_tiantian"):
+        content = client.get_json(url, params={"FCODE": fund_code})
     if content.get("totalCount", 0) == 0:
         logger.warning(f"基金{fund_code}券种分布数据缺失.")
         return result
@@ -79,7 +110,7 @@ def get_bond_investment_distribution(fund_code: str) -> dict:
     return result
 
 
-@cached(cache=cache, key=lambda fund_code: f"get_fund_asset_allocation__{fund_code}")
+@single_flight(cache=cache, key=lambda fund_code: f"get_fund_asset_allocation__{fund_code}")
 def get_fund_asset_allocation(fund_code: str) -> dict:
     """获取资产分类分布数据
     {
@@ -109,8 +140,8 @@ def get_fund_asset_allocation(fund_code: str) -> dict:
     result = {"基金代码": fund_code, "报告日期": "", "股票": 0, "债券": 0, "现金": 0, "其他资产": 0}
 
     url = "https://fundcomapi.tiantianfunds.com/mm/FundMNewApi/FundAssetAllocation"
-    response = requests.get(url, params={"FCODE": fund_code}, headers=TIANTIAN_HEADERS)
-    content = response.json()
+    with telemetry.span("upstream_tiantian"):
+        content = client.get_json(url, params={"FCODE": fund_code})
     if content.get("totalCount", 0) == 0:
         logger.warning(f"基金{fund_code}资产分类分布数据缺失.")
         return result
@@ -127,10 +158,13 @@ def get_fund_asset_allocation(fund_code: str) -> dict:
 
 
 def get_fund_distribution(fund_code: str) -> dict:
-    """获取基金券种分布和资产分类分布数据"""
+    """获取基金券种分布和资产分类分布数据，两个接口并发请求"""
+    bond_future = _executor.submit(get_bond_investment_distribution, fund_code)
+    asset_future = _executor.submit(get_fund_asset_allocation, fund_code)
+
     result = {"基金代码": fund_code}
-    result.update(get_bond_investment_distribution(fund_code))
-    result.update(get_fund_asset_allocation(fund_code))
+    result.update(bond_future.result())
+    result.update(asset_future.result())
     return result
 
 
@@ -172,19 +206,23 @@ def _process_money_fund_values(fund_code: str, content: dict):
     return df
 
 
-@cached(cache=cache, key=lambda fund_code: f"get_fund_values__{fund_code}")
-def get_fund_values(fund_code: str):
-    url = "https://fundcomapi.tiantianfunds.com/mm/newCore/FundVPageDiagram"
-    params = {"FCODE": fund_code, "RANGE": "ln"}
-    response = requests.get(url, params=params, headers=TIANTIAN_HEADERS)
-    content = response.json()
-
-    fund_info = get_fund_info(fund_code)
-    fund_type = fund_info["基金类型"]
+def _process_fund_values(fund_code: str, content: dict):
+    """
+    处理非货币基金净值数据
 
-    if "货币型" in fund_type:
-        return _process_money_fund_values(fund_code, content)
+    Parameters
+    ----------
+    fund_code : str
+        基金代码，例如"004898"
+    content : dict
+        包含基金净值数据的字典
 
+    Returns
+    -------
+    pd.DataFrame
+        包含基金净值数据的DataFrame
+        列包括：基金代码、净值日期、单位净值、累计净值
+    """
     if content.get("totalCount", 0) == 0:
         logger.warning(f"基金{fund_code}净值数据缺失.")
         df = pd.DataFrame(columns=["基金代码", "净值日期", "单位净值", "累计净值"])
@@ -205,3 +243,93 @@ def get_fund_values(fund_code: str):
     df.insert(0, "基金代码", fund_code)
 
     return df
+
+
+def _fetch_fund_values(fund_code: str, fund_type: str, range_: str) -> pd.DataFrame:
+    """获取指定区间的基金净值数据，range_ 为接口的RANGE参数，例如 y（近1月）、ln（成立来）"""
+    params = {"FCODE": fund_code, "RANGE": range_}
+    with telemetry.span("upstream_tiantian"):
+        content = client.get_json(FUND_VALUES_URL, params=params)
+
+    if "货币型" in fund_type:
+        return _process_money_fund_values(fund_code, content)
+    return _process_fund_values(fund_code, content)
+
+
+def fetch_recent_networth(fund_code: str, range_: str = "y") -> pd.DataFrame:
+    """获取非货币基金最近一段时间的单位净值走势，用于增量刷新akshare获取的净值历史
+
+    akshare的 ``fund_open_fund_info_em`` 不支持按区间获取，每次都返回成立以来的全部数据；天天基金接口按RANGE参数只返回对应区间。
+    返回的列与akshare的单位净值走势一致。响应中没有日增长率（JZZZL）时按单位净值计算，区间第一天缺少前一日净值而被丢弃
+
+    Parameters
+    ----------
+    fund_code : str
+        基金代码
+    range_ : str
+        接口的RANGE参数，默认 y（近1月）
+
+    Returns
+    -------
+    pd.DataFrame
+        按净值日期升序排列的DataFrame，列包括：净值日期、单位净值、日增长率
+    """
+    params = {"FCODE": fund_code, "RANGE": range_}
+    with telemetry.span("upstream_tiantian"):
+        content = client.get_json(FUND_VALUES_URL, params=params)
+
+    records = content.get("data") or []
+    data = pd.DataFrame(records) if records else pd.DataFrame(columns=["FSRQ", "DWJZ"])
+    df = pd.DataFrame(
+        {
+            "净值日期": pd.to_datetime(data["FSRQ"], errors="coerce"),
+            "单位净值": pd.to_numeric(data["DWJZ"], errors="coerce"),
+        }
+    )
+    if "JZZZL" in data.columns:
+        df["日增长率"] = pd.to_numeric(data["JZZZL"], errors="coerce")
+    df = df.dropna(subset=["净值日期"]).sort_values("净值日期", ignore_index=True)
+    if "日增长率" not in df.columns:
+        df["日增长率"] = (df["单位净值"].pct_change() * 100).round(2)
+        df = df.iloc[1:].reset_index(drop=True)
+    return df
+
+
+def _to_cached_values(df: pd.DataFrame) -> pd.DataFrame:
+    """去掉基金代码列和日期无法解析的行，得到 ``values_cache`` 中保存的数据"""
+    df = df.drop(columns="基金代码")
+    df["净值日期"] = pd.to_datetime(df["净值日期"], errors="coerce")
+    return df.dropna(subset=["净值日期"]).reset_index(drop=True)
+
+
+def fund_values_cache_key(fund_code: str) -> str:
+    """基金净值数据在 ``values_cache`` 中的键"""
+    return f"get_fund_values__{fund_code}"
+
+
+def get_fund_values_entry(fund_code: str, allow_stale: bool = True) -> Tuple[float, pd.DataFrame]:
+    """获取基金成立以来的净值数据及其缓存过期时间，返回 (过期时间, 数据)
+
+    数据为 ``values_cache`` 中缓存的对象，按净值日期升序排列，不含基金代码列，调用方不应原地修改。
+    缓存过期后在 ``STALE_SOFT_LIMIT`` 内直接返回旧数据并在后台刷新，见 :func:`get_or_refresh`。
+    刷新时只获取近1月的数据合并到旧数据中；检测到缺口或历史净值被修正时再获取成立以来的全部数据
+    """
+
+    def fetch(history: Optional[pd.DataFrame]) -> pd.DataFrame:
+        fund_type = get_fund_info(fund_code)["基金类型"]
+        value_column = "每万份收益" if "货币型" in fund_type else "单位净值"
+        if history is not None and value_column in history.columns:
+            recent = _to_cached_values(_fetch_fund_values(fund_code, fund_type, "y"))
+            df = merge_recent_history(history, recent, value_column=value_column)
+            if df is not None:
+                return df
+        return _to_cached_values(_fetch_fund_values(fund_code, fund_type, "ln"))
+
+    return get_or_refresh(values_cache, fund_values_cache_key(fund_code), fetch, allow_stale=allow_stale)
+
+
+def get_fund_values(fund_code: str, allow_stale: bool = True) -> pd.DataFrame:
+    """获取基金成立以来的净值数据，首列为基金代码，其余见 :func:`get_fund_values_entry`"""
+    df = get_fund_values_entry(fund_code, allow_stale=allow_stale)[1].copy(deep=False)
+    df.insert(0, "基金代码", fund_code)
+    return df
@@ -1,75 +1,185 @@
 # -*- coding: utf-8 -*-
-import json
+import logging
 import os
-import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-import akshare as ak
+import numpy as np
 import pandas as pd
 from dateutil.relativedelta import relativedelta
 
-if os.getenv("VERCEL_ENV", "development") == "development":
+from src.metrics import calculate_risk_metrics
+from src.money_fund import calculate_money_fund_weekly_income, calculate_money_fund_yields, calculate_yield_trend
+from src.returns import DAY_NS, aggregate_weekly, calculate_period_returns, daily_returns, to_date_array
+from src.utils import governor, telemetry
+from src.utils.cache_utils import FileCache, JsonFileCache, NavFileCache, TieredCache, get_or_refresh
+from src.utils.nav_utils import merge_recent_history, tail_window
+
+logger = logging.getLogger(__name__)
+
+if os.getenv("FUND_CACHE_DIR"):
+    CACHE_DIR = Path(os.getenv("FUND_CACHE_DIR"))
+elif os.getenv("VERCEL_ENV", "development") == "development":
     CACHE_DIR = Path(__file__).parent.parent / "cache"
 else:
     CACHE_DIR = Path("/tmp/cache")
-CACHE_DIR.mkdir(exist_ok=True)
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
-FUND_CACHE_INDEX = CACHE_DIR / "fund_cache_index.json"
 MAX_FUND_CACHE = int(os.getenv("MAX_FUND_CACHE", 100))
+MAX_FUND_CACHE_BYTES = int(os.getenv("MAX_FUND_CACHE_BYTES", 256 * 1024 * 1024))
+MAX_FUND_MEMORY_CACHE = int(os.getenv("MAX_FUND_MEMORY_CACHE", 32))
+FUND_BATCH_WORKERS = int(os.getenv("FUND_BATCH_WORKERS", 8))
+
+FUND_INFO_KEY = "fund_info"
+
+# get_fund_info 对基金列表中不存在的基金代码返回的基金类型
+UNKNOWN_FUND_TYPE = "未查询到"
+
+# 基金类型包含该字符串的基金按货币基金计算收益
+MONEY_FUND_TYPE = "货币型"
+
+# 统计结果快照的结构版本，快照中的字段变化时递增，使旧版本的快照不再被读取
+FUND_ANALYTICS_VERSION = 3
+
+# 计算收益时使用的历史区间，"all" 为成立以来的全部历史。各统计周期最长为1年，区间多取一周使近1年的周收益完整，
+# 因此使用较短的区间时除"自成立以来"的指标和正收益周数按区间起点计算外，其他结果与使用全部历史相同
+HISTORY_WINDOWS = {
+    "1y": relativedelta(years=1, weeks=1),
+    "3y": relativedelta(years=3, weeks=1),
+    "5y": relativedelta(years=5, weeks=1),
+    "all": None,
+}
+
+# 增量刷新净值时从天天基金获取的最近区间（RANGE参数，y为近1月），缓存超过该区间未更新时会检测到缺口并全量获取
+NETWORTH_RECENT_RANGE = "y"
+
+# 缓存条目在次日零点过期，过期条目在被LRU淘汰前仍可作为上游失败时的回退数据，内存层保存最近使用的对象。
+# 基金列表以JSON保存，冷启动后首次读取不需要pickle；每只基金的净值数据以列式二进制格式保存，读取时内存映射、不经过pickle
+fund_info_cache = TieredCache(
+    JsonFileCache(ttl=timedelta(days=1), maxsize=1, cache_dir=CACHE_DIR / "fund_info"),
+    maxsize=1,
+)
+fund_networth_cache = TieredCache(
+    NavFileCache(
+        ttl=timedelta(days=1),
+        maxsize=MAX_FUND_CACHE,
+        max_bytes=MAX_FUND_CACHE_BYTES,
+        cache_dir=CACHE_DIR / "fund_networth",
+    ),
+    maxsize=MAX_FUND_MEMORY_CACHE,
+)
+# 每只基金在最新净值日期下的统计结果快照，键中包含最新净值日期，净值更新后自然生成新的快照。
+# 每只基金的每个历史区间各有一个快照，容量按区间数放大，否则多区间的请求会互相淘汰其他基金的快照
+fund_analytics_cache = TieredCache(
+    FileCache(ttl=timedelta(days=1), maxsize=MAX_FUND_CACHE * len(HISTORY_WINDOWS), cache_dir=CACHE_DIR / "fund_analytics"),
+    maxsize=MAX_FUND_MEMORY_CACHE * len(HISTORY_WINDOWS),
+)
+telemetry.register_caches({"fund_info": fund_info_cache, "fund_networth": fund_networth_cache, "fund_analytics": fund_analytics_cache})
+
+
+class FundNotFoundError(ValueError):
+    """基金代码不在基金列表中，上游也没有该基金的净值数据"""
+
+
+class FundDataUnavailableError(ValueError):
+    """基金净值数据从上游获取失败，且没有可用的缓存数据"""
+
+
+def seconds_until_tomorrow() -> float:
+    """距离次日零点的秒数，用作当天数据的缓存有效期"""
+    now = datetime.now()
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (tomorrow - now).total_seconds()
+
+
+def _build_fund_index(fund_data: Dict[str, List[str]]) -> Dict[str, Tuple[str, str]]:
+    """以基金代码为键构建 (基金简称, 基金类型) 索引，重复代码保留第一条
+
+    Parameters
+    ----------
+    fund_data : Dict[str, List[str]]
+        按列保存的基金列表，即缓存条目中的 data
+    """
+    fund_index = {}
+    for fund_code, name, fund_type in zip(fund_data["基金代码"], fund_data["基金简称"], fund_data["基金类型"]):
+        fund_index.setdefault(fund_code, (name, fund_type))
+    return fund_index
+
+
+# 最近一次构建索引所用的缓存条目和构建结果，条目在内存层中未被替换时直接复用索引
+_fund_index: Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Tuple[str, str]]]] = (None, None)
+
+
+def _get_cached_fund_info_entry(allow_stale: bool = True) -> Optional[Dict[str, Any]]:
+    """获取缓存的基金列表条目，data 为按列保存的基金列表（列名 -> 值列表）
+
+    条目只包含字符串列表，以JSON保存，进程启动后首次读取不经过pickle、不需要导入akshare。
+    缓存过期后按 :func:`get_or_refresh` 的规则直接返回旧列表并在后台刷新
+    """
+
+    def fetch(_) -> Dict[str, Any]:
+        import akshare as ak
 
+        logger.info("获取新的基金数据并缓存")
+        with telemetry.span("upstream_fund_list"), governor.guard(governor.EASTMONEY_HOST):
+            fund_data = ak.fund_name_em()
+        return {"data": fund_data.to_dict("list")}
 
-def get_cached_fund_info() -> Optional[pd.DataFrame]:
+    try:
+        return get_or_refresh(fund_info_cache, FUND_INFO_KEY, fetch, ttl=seconds_until_tomorrow, allow_stale=allow_stale)[1]
+    except Exception as e:
+        logger.warning(f"获取基金数据出错: {e}")
+        return None
+
+
+def get_cached_fund_info(allow_stale: bool = True) -> Optional[pd.DataFrame]:
     """获取缓存的基金数据，如果缓存不存在或已过期则重新获取
 
+    Parameters
+    ----------
+    allow_stale : bool
+        为False时缓存过期即同步刷新，不返回旧数据，用于预热
+
     Returns
     -------
     pandas.DataFrame or None
         包含基金基本信息的DataFrame，字段包括：基金代码、基金简称、基金类型等
         如果获取失败则返回None
     """
-    cache_file = CACHE_DIR / "fund_info_cache.pkl"
+    entry = _get_cached_fund_info_entry(allow_stale=allow_stale)
+    return None if entry is None else pd.DataFrame(entry["data"])
 
-    today = datetime.now().date()
-    if cache_file.exists():
-        try:
-            with cache_file.open("rb") as f:
-                cache_data = pickle.load(f)
-                cache_date = cache_data.get("date")
-
-                # 如果缓存是今天的，直接返回
-                if cache_date == today:
-                    print("使用缓存的基金数据")
-                    return cache_data.get("data")
-        except Exception as e:
-            print(f"读取缓存文件出错: {e}")
 
-    # 缓存不存在或已过期，重新获取数据
-    try:
-        print("获取新的基金数据并缓存")
-        fund_data = ak.fund_name_em()
+def get_cached_fund_index(fetch: bool = True) -> Optional[Dict[str, Tuple[str, str]]]:
+    """获取缓存的基金代码索引，如果缓存不存在或已过期则重新获取
 
-        # 保存到缓存
-        cache_data = {"date": today, "data": fund_data}
-        with cache_file.open("wb") as f:
-            pickle.dump(cache_data, f)
+    索引在每个进程中对每份基金列表只构建一次
 
-        return fund_data
-    except Exception as e:
-        print(f"获取基金数据出错: {e}")
+    Parameters
+    ----------
+    fetch : bool
+        为False时只使用缓存中的基金列表（包括已过期的），不存在时返回None，不请求上游
 
-        # 如果获取新数据失败但有旧缓存，尝试使用旧缓存
-        if cache_file.exists():
-            try:
-                with cache_file.open("rb") as f:
-                    print("获取新数据失败，使用旧缓存")
-                    return pickle.load(f).get("data")
-            except Exception as e:
-                print(f"使用旧缓存出错: {e}")
-                pass
+    Returns
+    -------
+    Dict[str, Tuple[str, str]] or None
+        以基金代码为键、(基金简称, 基金类型) 为值的字典，如果获取失败则返回None
+    """
+    global _fund_index
+
+    entry = _get_cached_fund_info_entry() if fetch else fund_info_cache.get_stale(FUND_INFO_KEY)
+    if entry is None:
         return None
 
+    cached_entry, fund_index = _fund_index
+    if cached_entry is not entry:
+        fund_index = _build_fund_index(entry["data"])
+        _fund_index = (entry, fund_index)
+    return fund_index
+
 
 def get_fund_info(fund_code: str) -> Dict[str, str]:
     """获取基金基本信息
@@ -89,146 +199,148 @@ def get_fund_info(fund_code: str) -> Dict[str, str]:
         - type: 基金类型
     """
     try:
-        fund_info = get_cached_fund_info()
-        if fund_info is None:
+        fund_index = get_cached_fund_index()
+        if fund_index is None:
             return {"name": f"基金 {fund_code}", "type": "查询信息为空"}
 
-        fund_info = fund_info[fund_info["基金代码"] == fund_code]
-        if fund_info.empty:
-            return {"name": f"基金 {fund_code}", "type": "未查询到"}
+        fund_data = fund_index.get(fund_code)
+        if fund_data is None:
+            return {"name": f"基金 {fund_code}", "type": UNKNOWN_FUND_TYPE}
 
-        fund_data = fund_info.to_dict(orient="records")[0]
-        return {"name": fund_data["基金简称"], "type": fund_data["基金类型"]}
+        return {"name": fund_data[0], "type": fund_data[1]}
 
     except Exception as e:
-        print(f"获取基金信息时出错: {e}")
+        logger.warning(f"获取基金信息时出错: {e}")
         return {"name": f"基金 {fund_code}", "type": "查询错误"}
 
 
-def _get_cache_index() -> Dict:
-    """获取并更新基金缓存索引
+def is_money_fund(fund_type: str) -> bool:
+    """是否为货币基金，货币基金的净值恒为1，使用每万份收益和7日年化收益率计算收益"""
+    return MONEY_FUND_TYPE in fund_type
 
-    Returns
-    -------
-    Dict
-        包含所有缓存基金的索引，格式为 {fund_code: last_access_timestamp}
-    """
-    if FUND_CACHE_INDEX.exists():
-        try:
-            with FUND_CACHE_INDEX.open("r") as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"读取基金缓存索引文件出错: {e}")
-            return {}
-    return {}
 
+def _fetch_fund_networth(fund_code: str) -> pd.DataFrame:
+    """从akshare获取基金成立以来的净值数据，转换日期类型并按日期升序排列"""
+    import akshare as ak
 
-def _update_cache_index(fund_code: str) -> None:
-    """更新基金缓存索引，并在必要时清理旧缓存
+    with governor.guard(governor.EASTMONEY_HOST):
+        fund_data = ak.fund_open_fund_info_em(symbol=fund_code, indicator="单位净值走势", period="成立来")
+    fund_data["净值日期"] = pd.to_datetime(fund_data["净值日期"])
+    return fund_data.sort_values("净值日期", ignore_index=True)
 
-    Parameters
-    ----------
-    fund_code : str
-        要更新的基金代码
-    """
-    # 获取当前缓存索引
-    cache_index = _get_cache_index()
-
-    # 更新当前基金的访问时间
-    current_time = datetime.now().timestamp()
-    cache_index[fund_code] = current_time
-
-    # 如果缓存数量超过限制，删除最旧的缓存
-    if len(cache_index) > MAX_FUND_CACHE:
-        # 按最后访问时间排序
-        sorted_funds = sorted(cache_index.items(), key=lambda x: x[1])
-        # 计算需要删除的数量
-        to_remove = len(cache_index) - MAX_FUND_CACHE
-
-        # 删除最旧的缓存文件和索引条目
-        for i in range(to_remove):
-            old_fund_code = sorted_funds[i][0]
-            old_cache_file = CACHE_DIR / f"fund_data_{old_fund_code}.pkl"
+
+def networth_cache_key(fund_code: str) -> str:
+    """基金净值数据在 ``fund_networth_cache`` 中的键"""
+    return f"fund_networth__{fund_code}"
+
+
+def _get_cached_fund_networth_entry(fund_code: str, allow_stale: bool = True) -> Optional[Tuple[float, pd.DataFrame]]:
+    """获取缓存的基金净值数据及其过期时间，返回 (过期时间, 数据)，获取失败时返回None"""
+
+    def fetch(stale_data: Optional[pd.DataFrame]) -> pd.DataFrame:
+        # akshare的净值接口总是返回全部历史，有旧缓存时只从天天基金获取最近一段时间的数据合并，
+        # 检测到缺口、历史净值被修正或天天基金请求失败时再从akshare全量获取
+        if stale_data is not None:
+            from src.api.tiantian_api import fetch_recent_networth
+
+            logger.info(f"增量获取基金净值数据: {fund_code}")
             try:
-                if old_cache_file.exists():
-                    old_cache_file.unlink()  # 删除文件
-                    print(f"删除旧缓存文件: {old_fund_code}")
-                del cache_index[old_fund_code]  # 从索引中删除
+                with telemetry.span("upstream_networth"):
+                    recent_data = fetch_recent_networth(fund_code, NETWORTH_RECENT_RANGE)
             except Exception as e:
-                print(f"删除旧缓存文件时出错: {e}")
+                logger.warning(f"增量获取基金{fund_code}净值数据出错，改为全量获取: {type(e).__name__}: {e}")
+            else:
+                fund_data = merge_recent_history(stale_data, recent_data)
+                if fund_data is not None:
+                    return fund_data
+
+        logger.info(f"获取新的基金净值数据并缓存: {fund_code}")
+        with telemetry.span("upstream_networth"):
+            return _fetch_fund_networth(fund_code)
 
-    # 保存更新后的索引
     try:
-        with FUND_CACHE_INDEX.open("w") as f:
-            json.dump(cache_index, f)
+        return get_or_refresh(fund_networth_cache, networth_cache_key(fund_code), fetch, ttl=seconds_until_tomorrow, allow_stale=allow_stale)
     except Exception as e:
-        print(f"保存基金缓存索引文件时出错: {e}")
+        logger.warning(f"获取基金净值数据出错: {e}")
+        return None
 
 
-def get_cached_fund_networth(fund_code: str) -> Optional[pd.DataFrame]:
+def get_cached_fund_networth(fund_code: str, allow_stale: bool = True) -> Optional[pd.DataFrame]:
     """获取缓存的基金净值数据，如果缓存不存在或已过期则重新获取
 
+    缓存在次日零点过期。过期不超过 ``STALE_SOFT_LIMIT`` 秒时直接返回旧数据，并在后台增量刷新（每只基金同时只有一个刷新任务）；
+    过期更久或缓存不存在时同步获取，获取失败时过期不超过 ``STALE_HARD_LIMIT`` 秒的旧数据仍可返回
+
     Parameters
     ----------
     fund_code : str
         基金代码，例如"004898"
+    allow_stale : bool
+        为False时缓存过期即同步刷新，不返回旧数据，用于预热
 
     Returns
     -------
     pandas.DataFrame or None
-        包含基金净值数据的DataFrame，字段包括：净值日期、单位净值、日增长率
-        如果获取失败则返回None
+        包含基金净值数据的DataFrame，按净值日期升序排列，字段包括：净值日期、单位净值、日增长率
+        缓存中的DataFrame会被多个请求共享，不应原地修改。如果获取失败则返回None
     """
-    cache_file = CACHE_DIR / f"fund_networth_{fund_code}.pkl"
-    today = datetime.now().date()
+    entry = _get_cached_fund_networth_entry(fund_code, allow_stale=allow_stale)
+    return None if entry is None else entry[1]
 
-    if cache_file.exists():
-        try:
-            with cache_file.open("rb") as f:
-                cache_data = pickle.load(f)
-                cache_date = cache_data.get("date")
-
-                # 如果缓存是今天的，直接返回
-                if cache_date == today:
-                    print(f"使用缓存的基金净值数据: {fund_code}")
-                    # 更新缓存索引，表示该基金数据被访问
-                    _update_cache_index(fund_code)
-                    return cache_data.get("data")
-        except Exception as e:
-            print(f"读取基金净值缓存文件出错: {e}")
 
-    # 缓存不存在或已过期，重新获取数据
-    try:
-        print(f"获取新的基金净值数据并缓存: {fund_code}")
-        fund_data = ak.fund_open_fund_info_em(symbol=fund_code, indicator="单位净值走势", period="成立来")
+def _with_as_of(fund_data: pd.DataFrame, expires_at: float) -> pd.DataFrame:
+    """浅拷贝数据，在 ``attrs`` 中记录数据的获取日期 as_of 和缓存是否已过期 stale
 
-        # 保存到缓存前先更新缓存索引，可能需要清理旧缓存
-        _update_cache_index(fund_code)
+    缓存条目的有效期为1天（至次日零点或24小时），过期时间前推1天即为从上游获取数据的日期
+    """
+    # 浅拷贝后调用方新增列或修改attrs不会影响缓存
+    fund_data = fund_data.copy(deep=False)
+    fund_data.attrs["as_of"] = _as_of(expires_at)
+    fund_data.attrs["stale"] = time.time() > expires_at
+    return fund_data
 
-        # 保存到缓存
-        cache_data = {"date": today, "data": fund_data}
-        with cache_file.open("wb") as f:
-            pickle.dump(cache_data, f)
 
-        return fund_data
+def _as_of(expires_at: float) -> str:
+    """由缓存条目的过期时间推算从上游获取数据的日期（"%Y-%m-%d"格式）"""
+    return (datetime.fromtimestamp(expires_at) - timedelta(days=1)).strftime("%Y-%m-%d")
 
-    except Exception as e:
-        print(f"获取基金净值数据出错: {e}")
 
-        # 如果获取新数据失败但有旧缓存，尝试使用旧缓存
-        if cache_file.exists():
-            try:
-                with cache_file.open("rb") as f:
-                    print(f"获取新数据失败，使用旧缓存: {fund_code}")
-                    # 即使使用旧缓存，也更新访问时间
-                    _update_cache_index(fund_code)
-                    return pickle.load(f).get("data")
-            except Exception as e:
-                print(f"使用旧缓存出错: {e}")
+def get_cached_nav_dates(fund_code: str) -> Optional[Tuple[str, str]]:
+    """只从缓存中查询基金的最新净值日期和数据获取日期，不请求上游
+
+    用于在不计算收益的情况下判断客户端缓存的响应是否仍然有效。基金类型从缓存的基金列表（包括已过期的）中查询，
+    基金列表不在缓存中时同样返回None，而不是像 :func:`get_fund_info` 那样从上游获取
+
+    Parameters
+    ----------
+    fund_code : str
+        基金代码，例如"004898"
+
+    Returns
+    -------
+    Tuple[str, str] or None
+        (最新净值日期, as_of)，格式均为"%Y-%m-%d"，as_of 同 get_fund_networth。缓存不存在或已过期时返回None
+    """
+    fund_index = get_cached_fund_index(fetch=False)
+    if fund_index is None or fund_code not in fund_index:
         return None
 
+    try:
+        if is_money_fund(fund_index[fund_code][1]):
+            from src.api.tiantian_api import fund_values_cache_key, values_cache
+
+            expires_at, fund_data = values_cache.get_entry(fund_values_cache_key(fund_code))
+        else:
+            expires_at, fund_data = fund_networth_cache.get_entry(networth_cache_key(fund_code))
+    except KeyError:
+        return None
 
-def get_fund_networth(fund_code: str) -> Optional[pd.DataFrame]:
+    if fund_data is None or fund_data.empty:
+        return None
+    return fund_data["净值日期"].iloc[-1].strftime("%Y-%m-%d"), _as_of(expires_at)
+
+
+def get_fund_networth(fund_code: str, allow_stale: bool = True) -> Optional[pd.DataFrame]:
     """获取基金的每日净值数据
 
     使用akshare接口获取指定基金代码的净值数据
@@ -238,67 +350,110 @@ def get_fund_networth(fund_code: str) -> Optional[pd.DataFrame]:
     ----------
     fund_code : str
         基金代码，例如"004898"
+    allow_stale : bool
+        为False时缓存过期即同步刷新，见 get_cached_fund_networth
 
     Returns
     -------
     pandas.DataFrame or None
-        包含基金净值数据的DataFrame，字段包括：净值日期、单位净值、日增长率
+        包含基金净值数据的DataFrame，字段包括：净值日期、单位净值、日增长率，
+        ``attrs`` 中的 as_of 为数据的获取日期，stale 表示是否为等待后台刷新的过期数据。
         如果获取失败则返回None
 
     """
-    fund_data = get_cached_fund_networth(fund_code)
-    fund_data["净值日期"] = pd.to_datetime(fund_data["净值日期"])
-    fund_data.sort_values("净值日期", inplace=True)
-    return fund_data
+    entry = _get_cached_fund_networth_entry(fund_code, allow_stale=allow_stale)
+    if entry is None:
+        return None
+    expires_at, fund_data = entry
+    # 缓存中的数据已按日期排序
+    return _with_as_of(fund_data, expires_at)
 
 
-def calculate_weekly_returns(fund_data: pd.DataFrame, investment_amount: int = 100000) -> pd.DataFrame:
-    """计算每周的收益金额 (全部历史数据)"""
-    # 计算每日收益率
-    fund_data["日收益率"] = fund_data["单位净值"].pct_change()
-    fund_data.loc[fund_data.index[0], "日收益率"] = 0
+def get_money_fund_values(fund_code: str, allow_stale: bool = True) -> Optional[pd.DataFrame]:
+    """获取货币基金的每日收益数据
 
-    # 计算每日收益金额
-    fund_data["日收益金额"] = fund_data["日收益率"] * investment_amount
+    使用天天基金接口获取，数据以列式二进制格式缓存在 ``tiantian_api.values_cache`` 中，过期后同样先返回旧数据并在后台刷新
 
-    # 创建年周组合键，以处理跨年的周
-    fund_data["周"] = fund_data["净值日期"].dt.isocalendar().week
-    fund_data["年"] = fund_data["净值日期"].dt.isocalendar().year
-    fund_data["年周"] = fund_data["年"].astype(str) + "-" + fund_data["周"].astype(str)
+    Parameters
+    ----------
+    fund_code : str
+        基金代码
+    allow_stale : bool
+        为False时缓存过期即同步刷新，不返回旧数据，用于预热
 
-    # 计算周收益
-    weekly_returns_df = (
-        fund_data.groupby("年周").agg(周开始日期=("净值日期", "min"), 周结束日期=("净值日期", "max"), 周收益金额=("日收益金额", "sum")).reset_index()
-    )
+    Returns
+    -------
+    pandas.DataFrame or None
+        按净值日期升序排列的DataFrame，字段包括：净值日期、每万份收益、7日年化收益率，
+        ``attrs`` 中的 as_of 和 stale 同 get_fund_networth。如果获取失败则返回None
+    """
+    from src.api.tiantian_api import get_fund_values_entry
+
+    try:
+        expires_at, fund_data = get_fund_values_entry(fund_code, allow_stale=allow_stale)
+    except Exception as e:
+        logger.warning(f"获取货币基金收益数据出错: {e}")
+        return None
+
+    if "每万份收益" not in fund_data.columns:
+        return None
+    # 缓存中的数据已按日期排序且不含无效日期
+    return _with_as_of(fund_data, expires_at)
+
+
+def load_fund_data(fund_code: str, fund_type: str, allow_stale: bool = True) -> Optional[pd.DataFrame]:
+    """按基金类型获取计算收益所需的数据：货币基金为每日收益数据，其他基金为净值数据
+
+    ``allow_stale`` 为False时缓存过期即同步刷新，不返回等待后台刷新的旧数据
+    """
+    if is_money_fund(fund_type):
+        return get_money_fund_values(fund_code, allow_stale=allow_stale)
+    return get_fund_networth(fund_code, allow_stale=allow_stale)
 
-    # 按日期排序
-    weekly_returns_df = weekly_returns_df.sort_values("周开始日期").reset_index(drop=True)
 
-    # 格式化日期和收益
-    weekly_returns_df["开始日期"] = weekly_returns_df["周开始日期"].dt.strftime("%m.%d")
-    weekly_returns_df["结束日期"] = weekly_returns_df["周结束日期"].dt.strftime("%m.%d")
-    weekly_returns_df["日期范围"] = weekly_returns_df["开始日期"] + " - " + weekly_returns_df["结束日期"]
-    weekly_returns_df["收益"] = weekly_returns_df["周收益金额"]
+def calculate_weekly_returns(fund_data: pd.DataFrame, investment_amount: int = 100000) -> Tuple[pd.DataFrame, Dict[str, any]]:
+    """计算每周的收益金额 (全部历史数据)
 
-    positive_weeks_count = 0
-    if not weekly_returns_df.empty:
-        positive_weeks_count = len(weekly_returns_df[weekly_returns_df["周收益金额"] > 0])
+    以整数周序号划分自然周并求和，不修改传入的DataFrame，也不在此处格式化日期字符串
+
+    Args:
+        fund_data: 包含基金净值数据的DataFrame，需包含'净值日期'和'单位净值'列，按日期升序排列
+        investment_amount: 投资金额，默认100000
+
+    Returns:
+        weekly_returns_df: 每周一行，列包括：周开始日期、周结束日期、周收益金额，按日期升序排列
+        weekly_stats: 包含 positive_weeks_count、period_text、avg_weekly_return 的字典
+    """
+    dates = to_date_array(fund_data["净值日期"])
+    daily_amounts = daily_returns(fund_data["单位净值"].to_numpy(dtype="float64")) * investment_amount
+    return _summarize_weekly(aggregate_weekly(dates, daily_amounts))
+
+
+def _summarize_weekly(weekly: Dict[str, np.ndarray]) -> Tuple[pd.DataFrame, Dict[str, any]]:
+    """将 aggregate_weekly 的结果整理为周收益DataFrame和统计信息，返回值同 calculate_weekly_returns"""
+    weekly_returns_df = pd.DataFrame(
+        {
+            "周开始日期": weekly["start_dates"].view("datetime64[ns]"),
+            "周结束日期": weekly["end_dates"].view("datetime64[ns]"),
+            "周收益金额": weekly["sums"],
+        }
+    )
+
+    weekly_amounts = weekly["sums"]
+    positive_weeks_count = int(np.count_nonzero(weekly_amounts > 0))
 
     avg_weekly_return = 0.0
     period_text = "N/A"
-    if not weekly_returns_df.empty:
-        max_week_end_date = weekly_returns_df["周结束日期"].max()
-        if pd.notna(max_week_end_date):
-            start_date_1y_dt = max_week_end_date - timedelta(days=365)
-            data_1y_weekly = weekly_returns_df[weekly_returns_df["周开始日期"] >= start_date_1y_dt]
-            total_weeks_count = len(weekly_returns_df)
-
-            period_text = "1年"
-            if total_weeks_count >= 52:
-                avg_weekly_return = data_1y_weekly["周收益金额"].mean()
-            else:
-                avg_weekly_return = weekly_returns_df["周收益金额"].mean()
-                period_text = f"{total_weeks_count}周"
+    total_weeks_count = len(weekly_amounts)
+    if total_weeks_count > 0:
+        period_text = "1年"
+        if total_weeks_count >= 52:
+            # 近1年：周开始日期不早于最后一周结束日期前365天
+            start_1y = weekly["end_dates"][-1] - 365 * DAY_NS
+            avg_weekly_return = float(weekly_amounts[np.searchsorted(weekly["start_dates"], start_1y) :].mean())
+        else:
+            avg_weekly_return = float(weekly_amounts.mean())
+            period_text = f"{total_weeks_count}周"
 
     return weekly_returns_df, {
         "positive_weeks_count": positive_weeks_count,
@@ -307,44 +462,42 @@ def calculate_weekly_returns(fund_data: pd.DataFrame, investment_amount: int = 1
     }
 
 
-def get_recent_weekly_returns(weekly_returns_df: pd.DataFrame, num_weeks: int = 12) -> List[Dict[str, any]]:
+def get_recent_weekly_returns(weekly_returns_df: pd.DataFrame, num_weeks: int = 12) -> Dict[str, List[any]]:
     """
-    从已计算的全部周收益数据中提取最近指定周数的数据，并格式化为网页展示所需格式。
+    从已计算的全部周收益数据中提取最近指定周数的数据，并格式化为网页展示所需的列式格式。
+
+    只对返回的这几周格式化日期字符串。
 
     Args:
-        weekly_returns_df (pd.DataFrame): 包含所有周收益数据的DataFrame。
-                                             必须包含 '周开始日期', '日期范围', '开始日期', '结束日期', '收益' 列。
+        weekly_returns_df (pd.DataFrame): calculate_weekly_returns 返回的周收益数据，按日期升序排列。
+                                             必须包含 '周开始日期', '周结束日期', '周收益金额' 列。
         num_weeks (int): 需要提取的最近周数，默认为12。
 
     Returns:
-        weekly_data_list (list): 包含最近 num_weeks 周收益数据的列表，每项为字典。
+        weekly_data (dict): 最近 num_weeks 周的 start_dates、end_dates、return_amounts 三个等长列表，
+            结构见 :class:`src.schemas.WeeklyReturnColumns`。
     """
-    if weekly_returns_df.empty:
-        return []
-
-    recent_weekly_df = weekly_returns_df.sort_values("周开始日期").tail(num_weeks).copy()
-    recent_weekly_df["显示周序号"] = range(1, len(recent_weekly_df) + 1)
-
-    weekly_data_list = []
-    for _, row in recent_weekly_df.iterrows():
-        week_data = {
-            "date_range": row["日期范围"],
-            "start_date": row["开始日期"],
-            "end_date": row["结束日期"],
-            "return_amount": row["收益"],
-        }
-        weekly_data_list.append(week_data)
+    recent_weekly_df = weekly_returns_df.tail(num_weeks)
+    return {
+        "start_dates": recent_weekly_df["周开始日期"].dt.strftime("%m.%d").tolist(),
+        "end_dates": recent_weekly_df["周结束日期"].dt.strftime("%m.%d").tolist(),
+        "return_amounts": recent_weekly_df["周收益金额"].tolist(),
+    }
+
 
-    return weekly_data_list
+def _period_returns(fund_data: pd.DataFrame) -> Dict[str, any]:
+    """对净值数据运行一次多周期收益计算，结果供年化收益率和历史业绩共用"""
+    return calculate_period_returns(to_date_array(fund_data["净值日期"]), fund_data["单位净值"].to_numpy(dtype="float64"))
 
 
-def calculate_annualized_returns(fund_data: pd.DataFrame) -> Dict[str, float]:
+def calculate_annualized_returns(fund_data: pd.DataFrame, period_returns: Optional[Dict[str, any]] = None) -> Dict[str, float]:
     """计算基金的不同周期年化收益率
 
     计算近1周、近1个月、近3个月、近6个月、近1年及自成立以来的年化收益率
 
     Args:
-        fund_data: 包含基金净值数据的DataFrame，需包含'净值日期'和'单位净值'列
+        fund_data: 包含基金净值数据的DataFrame，需包含'净值日期'和'单位净值'列，按日期升序排列
+        period_returns: 已经计算好的 calculate_period_returns 结果，为None时重新计算
 
     Returns:
         包含不同周期年化收益率的字典，键为周期名称，值为年化收益率（百分比）
@@ -352,184 +505,292 @@ def calculate_annualized_returns(fund_data: pd.DataFrame) -> Dict[str, float]:
     if fund_data is None or fund_data.empty:
         return {"1week": 0.0, "1month": 0.0, "3months": 0.0, "6months": 0.0, "1year": 0.0, "since_inception": 0.0}
 
-    # 获取最新日期和净值
-    latest_date = fund_data["净值日期"].max()
-    latest_value = fund_data[fund_data["净值日期"] == latest_date]["单位净值"].values[0]
-
-    # 定义各个周期的时间范围
-    period_deltas = {
-        "1week": pd.Timedelta(days=7),
-        "1month": relativedelta(months=1),
-        "3months": relativedelta(months=3),
-        "6months": relativedelta(months=6),
-        "1year": relativedelta(years=1),
-    }
+    if period_returns is None:
+        period_returns = _period_returns(fund_data)
 
-    results = {}
+    # 没有足够的历史数据或实际天数为0的周期记为0
+    annualized = np.nan_to_num(period_returns["annualized"], nan=0.0)
+    return dict(zip(period_returns["periods"], annualized.tolist()))
 
-    # 计算各个周期的年化收益率
-    for period_name, period_delta in period_deltas.items():
-        start_date = latest_date - period_delta
 
-        # 找到开始日期之前最近的一个交易日数据
-        prior_data = fund_data[fund_data["净值日期"] <= start_date]
-
-        if prior_data.empty:
-            # 如果没有足够的历史数据，则跳过该周期
-            results[period_name] = 0.0
-            continue
+def calculate_historical_performance(fund_data: pd.DataFrame, period_returns: Optional[Dict[str, any]] = None) -> Dict[str, float]:
+    """
+    计算不同时间区间的历史业绩表现
+    计算近1周、近1月、近3月、近6月、近1年的涨跌幅
 
-        # 获取开始日期的净值
-        start_value = prior_data.iloc[-1]["单位净值"]
+    Parameters
+    ----------
+    fund_data : pd.DataFrame
+        包含基金净值数据的DataFrame，需包含'净值日期'和'单位净值'列，按日期升序排列
+    period_returns : Dict[str, any], optional
+        已经计算好的 calculate_period_returns 结果，为None时重新计算
 
-        # 计算实际天数
-        actual_start_date = prior_data.iloc[-1]["净值日期"]
-        actual_days = (latest_date - actual_start_date).days
+    Returns
+    -------
+    Dict[str, float]
+        包含不同时间区间涨跌幅的字典，键为时间区间名称，值为涨跌幅（百分比），没有足够早的数据时为None
+    """
+    if period_returns is None:
+        period_returns = _period_returns(fund_data)
 
-        if actual_days <= 0:
-            results[period_name] = 0.0
+    results = {}
+    for label, pct in zip(period_returns["periods"], period_returns["cumulative"].tolist()):
+        if label == "since":
             continue
+        results[label] = None if np.isnan(pct) else round(pct, 2)
+    return results
 
-        # 计算年化收益率
-        annualized_return = (latest_value - start_value) / start_value / actual_days * 365
 
-        # 转换为百分比并保留两位小数
-        results[period_name] = annualized_return * 100
+def get_historical_networth_points(fund_data: pd.DataFrame, num_points: int = 30) -> Dict[str, List[any]]:
+    """获取基金历史净值数据点，按列整体格式化，返回 dates、values、growth_rates 三个等长列表，见 :class:`src.schemas.NetWorthColumns`"""
+    recent_data = fund_data.tail(num_points)
+    return {
+        "dates": recent_data["净值日期"].dt.strftime("%Y-%m-%d").tolist(),
+        "values": recent_data["单位净值"].astype("float64").round(4).tolist(),
+        "growth_rates": pd.to_numeric(recent_data["日增长率"], errors="coerce").fillna(0.0).round(2).tolist(),
+    }
 
-    # 计算自成立以来的年化收益率
-    # 获取最早的净值数据
-    earliest_data = fund_data.iloc[0]
-    earliest_date = earliest_data["净值日期"]
-    earliest_value = earliest_data["单位净值"]
 
-    # 计算自成立以来的天数
-    inception_days = (latest_date - earliest_date).days
+def calculate_fund_risk_metrics(fund_data: pd.DataFrame) -> Dict[str, any]:
+    """计算基金近1年的风险指标，格式化为网页展示所需格式
 
-    if inception_days > 0:
-        # 计算年化收益率
-        since_inception_return = (latest_value - earliest_value) / earliest_value / inception_days * 365
-        results["since"] = since_inception_return * 100
-    else:
-        results["since"] = 0.0
+    Args:
+        fund_data: 包含基金净值数据的DataFrame，需包含'净值日期'和'单位净值'列，按日期升序排列
 
+    Returns:
+        风险指标字典，见 :func:`src.metrics.calculate_risk_metrics`。日期格式化为字符串，数值保留4位小数，无法计算的指标为None
+    """
+    metrics = calculate_risk_metrics(to_date_array(fund_data["净值日期"]), fund_data["单位净值"].to_numpy(dtype="float64"))
+
+    results = {}
+    for name, value in metrics.items():
+        if name.endswith("_date"):
+            results[name] = None if value is None else pd.Timestamp(value).strftime("%Y-%m-%d")
+        else:
+            results[name] = None if np.isnan(value) else round(value, 4)
     return results
 
 
-def calculate_historical_performance(fund_data: pd.DataFrame) -> Dict[str, float]:
-    """
-    计算不同时间区间的历史业绩表现
-    计算近1月、近3月、近6月、近1年、近3年的涨跌幅
+def _build_fund_analytics(fund_data: pd.DataFrame) -> Dict[str, any]:
+    """计算基金的全部统计结果，金额类数据按投资金额为1计算，使用时再按实际投资金额缩放"""
+    # 全年周收益
+    all_weekly_returns_df, weekly_stats = calculate_weekly_returns(fund_data, investment_amount=1)
 
-    Parameters
-    ----------
-    fund_data : pd.DataFrame
-        包含基金净值数据的DataFrame，需包含'净值日期'和'单位净值'列
+    # 各周期收益率只计算一次，年化收益率和历史业绩共用
+    period_returns = _period_returns(fund_data)
 
-    Returns
-    -------
-    Dict[str, float]
-        包含不同时间区间涨跌幅的字典，键为时间区间名称，值为涨跌幅（百分比）
-    """
-    latest_date = fund_data["净值日期"].max()
-    latest_value = fund_data.loc[fund_data["净值日期"] == latest_date, "单位净值"].values[0]
-
-    # 时间段定义（自然日）
-    period_deltas = {
-        "1week": pd.Timedelta(days=7),
-        "1month": relativedelta(months=1),
-        "3months": relativedelta(months=3),
-        "6months": relativedelta(months=6),
-        "1year": relativedelta(years=1),
+    return {
+        "latest_value": float(fund_data["单位净值"].iloc[-1]),
+        "latest_date": fund_data["净值日期"].iloc[-1].strftime("%Y-%m-%d"),
+        "avg_weekly_return": weekly_stats["avg_weekly_return"],
+        "positive_weeks_count": weekly_stats["positive_weeks_count"],
+        "period_text": weekly_stats["period_text"],
+        # 近3个月周收益
+        "weekly_data": get_recent_weekly_returns(all_weekly_returns_df, num_weeks=12),
+        "annualized_returns": calculate_annualized_returns(fund_data, period_returns),
+        "historical_performance": calculate_historical_performance(fund_data, period_returns),
+        "net_worth_data": get_historical_networth_points(fund_data),
+        "risk_metrics": calculate_fund_risk_metrics(fund_data),
     }
 
-    results = {}
-    for label, delta in period_deltas.items():
-        # 目标时间点（自然时间）
-        if isinstance(delta, pd.Timedelta):
-            target_date = latest_date - delta
-        else:
-            target_date = latest_date - delta
 
-        # 找小于等于 target_date 的最大交易日
-        df_before = fund_data[fund_data["净值日期"] <= target_date]
-        if df_before.empty:
-            results[label] = None  # 没有足够早的数据
-            continue
+def get_money_fund_points(fund_data: pd.DataFrame, num_points: int = 30) -> Dict[str, List[any]]:
+    """获取货币基金最近的每日收益数据点，结构同 get_historical_networth_points，values 为每万份收益，growth_rates 为7日年化收益率"""
+    recent_data = fund_data.tail(num_points)
+    return {
+        "dates": recent_data["净值日期"].dt.strftime("%Y-%m-%d").tolist(),
+        "values": recent_data["每万份收益"].fillna(0.0).round(4).tolist(),
+        "growth_rates": recent_data["7日年化收益率"].fillna(0.0).round(4).tolist(),
+    }
 
-        start_nav = df_before["单位净值"].iloc[-1]
-        pct = (latest_value - start_nav) / start_nav * 100
-        results[label] = round(pct, 2)
 
-    return results
+def _build_money_fund_analytics(fund_data: pd.DataFrame) -> Dict[str, any]:
+    """计算货币基金的全部统计结果，结构与 :func:`_build_fund_analytics` 相同
 
+    周收益金额为每万份收益按投资金额为1换算；年化收益率为各周期7日年化收益率的平均值；
+    历史业绩为各周期每万份收益累计得到的收益率。货币基金不计算风险指标
+    """
+    dates = to_date_array(fund_data["净值日期"])
+    income = fund_data["每万份收益"].to_numpy(dtype="float64")
+    yields = fund_data["7日年化收益率"].to_numpy(dtype="float64")
 
-def get_historical_networth_points(fund_data: pd.DataFrame) -> List[Dict[str, float]]:
-    """获取基金历史净值数据点"""
-    net_worth_data = []
-    if not fund_data.empty:
-        recent_data = fund_data.tail(30)
-        for _, row in recent_data.iterrows():
-            net_worth_data.append(
-                {
-                    "date": row["净值日期"].strftime("%Y-%m-%d"),
-                    "value": round(float(row["单位净值"]), 4),
-                    "growth_rate": round(float(row["日增长率"]) if pd.notna(row["日增长率"]) else 0.0, 2),
-                }
-            )
-    return net_worth_data
+    all_weekly_returns_df, weekly_stats = _summarize_weekly(calculate_money_fund_weekly_income(dates, income))
+    period_returns = calculate_money_fund_yields(dates, income, yields)
+    yield_trend = calculate_yield_trend(dates, yields)
 
+    return {
+        "latest_value": float(fund_data["每万份收益"].iloc[-1]),
+        "latest_date": fund_data["净值日期"].iloc[-1].strftime("%Y-%m-%d"),
+        "avg_weekly_return": weekly_stats["avg_weekly_return"],
+        "positive_weeks_count": weekly_stats["positive_weeks_count"],
+        "period_text": weekly_stats["period_text"],
+        "weekly_data": get_recent_weekly_returns(all_weekly_returns_df, num_weeks=12),
+        "annualized_returns": calculate_annualized_returns(fund_data, period_returns),
+        "historical_performance": calculate_historical_performance(fund_data, period_returns),
+        "net_worth_data": get_money_fund_points(fund_data),
+        "risk_metrics": None,
+        "seven_day_yield": None if np.isnan(yields[-1]) else float(yields[-1]),
+        "yield_trend": None if np.isnan(yield_trend) else round(yield_trend, 4),
+    }
 
-def get_fund_returns(fund_code: str, investment_amount: Optional[int] = 100000) -> Dict[str, any]:
-    """获取基金收益数据
 
-    计算基金的总收益、平均收益、日收益和周收益数据
+def analytics_cache_key(fund_code: str, latest_date: str, money_fund: bool = False, window: str = "all") -> str:
+    """基金统计结果快照在 ``fund_analytics_cache`` 中的键，latest_date 为"%Y-%m-%d"格式的最新净值日期"""
+    kind = "money" if money_fund else "nav"
+    return f"fund_analytics__{fund_code}__{latest_date}__{kind}__{window}__v{FUND_ANALYTICS_VERSION}"
+
+
+def get_fund_analytics(fund_code: str, fund_data: pd.DataFrame, money_fund: bool = False, window: str = "all") -> Dict[str, any]:
+    """获取基金统计结果快照
+
+    快照以 (基金代码, 最新净值日期) 为键缓存，净值更新前的重复请求直接使用快照，
+    并发的请求等待同一次计算的结果。快照中的金额按投资金额为1计算，见 :func:`_build_fund_analytics`
 
     Args:
         fund_code: 基金代码
-        investment_amount: 投资金额，默认100000
+        fund_data: load_fund_data 返回的数据，按日期升序排列且不为空
+        money_fund: 是否为货币基金，货币基金使用 :func:`_build_money_fund_analytics` 计算
+        window: 计算使用的历史区间，取值见 ``HISTORY_WINDOWS``
 
     Returns:
-        包含基金收益数据的字典
+        统计结果字典，被多个请求共享，不应原地修改
     """
-    print(os.environ)
-    # 基金信息
-    fund_info = get_fund_info(fund_code)
+    latest_date = fund_data["净值日期"].iloc[-1].strftime("%Y-%m-%d")
+    cache_key = analytics_cache_key(fund_code, latest_date, money_fund=money_fund, window=window)
 
-    # 基金净值
-    fund_data = get_fund_networth(fund_code)
+    try:
+        return fund_analytics_cache[cache_key]
+    except KeyError:
+        pass
 
-    # 最新净值
-    latest_value = fund_data.iloc[-1]["单位净值"]
-    latest_date = fund_data.iloc[-1]["净值日期"].strftime("%Y-%m-%d")
+    with fund_analytics_cache.lock(cache_key):
+        try:
+            return fund_analytics_cache[cache_key]
+        except KeyError:
+            pass
 
-    # 全年周收益
-    all_weekly_returns_df, weekly_stats = calculate_weekly_returns(fund_data, investment_amount)
+        # 只对区间内的数据计算，区间起点通过二分查找确定
+        fund_data = tail_window(fund_data, HISTORY_WINDOWS[window])
+        with telemetry.span("compute"):
+            analytics = _build_money_fund_analytics(fund_data) if money_fund else _build_fund_analytics(fund_data)
+        fund_analytics_cache.set(cache_key, analytics)
+        return analytics
 
-    # 近3个月周收益
-    weekly_data = get_recent_weekly_returns(all_weekly_returns_df, num_weeks=12)
 
-    # 年化收益率
-    annualized_returns = calculate_annualized_returns(fund_data)
+def get_fund_returns(fund_code: str, investment_amount: int = 100000, window: str = "all") -> Dict[str, any]:
+    """获取基金收益数据
 
-    # 历史业绩
-    historical_performance = calculate_historical_performance(fund_data)
+    计算基金的总收益、平均收益、日收益和周收益数据
+
+    Args:
+        fund_code: 基金代码
+        investment_amount: 投资金额，默认100000，须为正数。快照按金额为1计算后线性缩放，正收益周数等不随金额变化
+        window: 计算使用的历史区间，取值见 ``HISTORY_WINDOWS``，默认使用成立以来的全部历史。
+            使用较短区间时，自成立以来的年化收益率和正收益周数按区间起点计算
 
-    # 历史净值
-    networth_data = get_historical_networth_points(fund_data)
+    Returns:
+        包含基金收益数据的字典，weekly_data 和 net_worth_data 为列式格式，逐行格式见 :func:`src.schemas.to_rows`。
+        as_of 为净值数据从上游获取的日期，stale 为True时表示缓存已过期、返回的是后台刷新完成前的旧数据
+
+    Raises:
+        FundNotFoundError: 基金代码不存在
+        FundDataUnavailableError: 净值数据获取失败且没有可用的缓存
+        ValueError: investment_amount 不是正数或 window 取值无效
+    """
+    if investment_amount is None or investment_amount <= 0:
+        raise ValueError("investment_amount必须是正数")
+    if window not in HISTORY_WINDOWS:
+        raise ValueError(f"window必须是{list(HISTORY_WINDOWS)}之一")
+
+    # 基金信息
+    with telemetry.span("fund_info"):
+        fund_info = get_fund_info(fund_code)
+
+    # 按基金类型选择数据和计算方式，货币基金使用每万份收益，其他基金使用单位净值
+    money_fund = is_money_fund(fund_info["type"])
+    with telemetry.span("load_data"):
+        fund_data = load_fund_data(fund_code, fund_info["type"])
+    if fund_data is None or fund_data.empty:
+        # 基金列表可能尚未收录新成立的基金，因此仍先尝试获取净值，获取不到时才判定为不存在
+        if fund_info["type"] == UNKNOWN_FUND_TYPE:
+            raise FundNotFoundError(f"基金{fund_code}不存在")
+        raise FundDataUnavailableError(f"基金{fund_code}净值数据获取失败")
+
+    # 统计结果与投资金额成正比，快照按金额为1计算，这里只做缩放
+    with telemetry.span("analytics"):
+        analytics = get_fund_analytics(fund_code, fund_data, money_fund=money_fund, window=window)
+    weekly_data = {
+        **analytics["weekly_data"],
+        "return_amounts": [amount * investment_amount for amount in analytics["weekly_data"]["return_amounts"]],
+    }
 
     result = {
         "fund_code": fund_code,
         "fund_name": fund_info["name"],
         "fund_type": fund_info["type"],
-        "latest_value": latest_value,
-        "latest_date": latest_date,
+        "latest_value": analytics["latest_value"],
+        "latest_date": analytics["latest_date"],
         "investment_amount": investment_amount,
-        "avg_weekly_return": weekly_stats["avg_weekly_return"],
-        "positive_weeks_count": weekly_stats["positive_weeks_count"],
-        "period_text": weekly_stats["period_text"],
+        "window": window,
+        "avg_weekly_return": analytics["avg_weekly_return"] * investment_amount,
+        "positive_weeks_count": analytics["positive_weeks_count"],
+        "period_text": analytics["period_text"],
         "weekly_data": weekly_data,
-        "annualized_returns": annualized_returns,
-        "historical_performance": historical_performance,
-        "net_worth_data": networth_data,
+        "annualized_returns": analytics["annualized_returns"],
+        "historical_performance": analytics["historical_performance"],
+        "net_worth_data": analytics["net_worth_data"],
+        "risk_metrics": analytics["risk_metrics"],
+        "as_of": fund_data.attrs["as_of"],
+        "stale": fund_data.attrs["stale"],
     }
+    if money_fund:
+        result["seven_day_yield"] = analytics["seven_day_yield"]
+        result["yield_trend"] = analytics["yield_trend"]
     return result
+
+
+def get_funds_returns(
+    fund_codes: List[str],
+    investment_amount: int = 100000,
+    max_workers: int = FUND_BATCH_WORKERS,
+    window: str = "all",
+) -> Dict[str, any]:
+    """批量获取多只基金的收益数据
+
+    基金列表在整批开始前加载一次，各基金的净值获取和收益计算在线程池中并行执行，
+    单只基金出错不影响其他基金的结果
+
+    Args:
+        fund_codes: 基金代码列表，重复的代码只计算一次
+        investment_amount: 投资金额，默认100000
+        max_workers: 并行计算的最大线程数
+        window: 计算使用的历史区间，见 get_fund_returns
+
+    Returns:
+        包含两个字典的字典：
+        - results: 基金代码 -> get_fund_returns 的结果，顺序与 fund_codes 一致
+        - errors: 基金代码 -> 错误信息
+    """
+    fund_codes = list(dict.fromkeys(fund_codes))
+    if not fund_codes:
+        return {"results": {}, "errors": {}}
+
+    # 预先加载基金列表，避免各线程同时未命中
+    get_cached_fund_index()
+
+    def _get_fund_returns(fund_code: str):
+        try:
+            return fund_code, get_fund_returns(fund_code, investment_amount, window), None
+        except Exception as e:
+            return fund_code, None, f"{type(e).__name__}: {e}"
+
+    results, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(fund_codes))) as executor:
+        for fund_code, result, error in executor.map(_get_fund_returns, fund_codes):
+            if error is None:
+                results[fund_code] = result
+            else:
+                logger.warning(f"计算基金{fund_code}收益时出错: {error}")
+                errors[fund_code] = error
+
+    return {"results": results, "errors": errors}
@@ -1,34 +1,181 @@
 # -*- coding: utf-8 -*-
+import logging
+import os
 import sys
+import time
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
-import uvicorn
-from fastapi import FastAPI, Query, Request
-from fastapi.responses import HTMLResponse
+import anyio
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from pydantic import BaseModel, Field
 
 PROJECT_DIR = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(PROJECT_DIR))
 
 
-from src.fund import get_fund_returns
+# src.fund 和 src.screener 依赖pandas，在接口中按需导入，首页和 /metrics 的冷启动不加载pandas
+from src.schemas import HistoryWindow, ResponseFormat, dump_fund_batch_returns, dump_fund_returns
+from src.utils import telemetry
+from src.utils.http_cache import caching_headers, is_not_modified, make_etag
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s %(message)s")
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Alpha Select")
 app.mount("/static", StaticFiles(directory="src/static"), name="static")
 templates = Jinja2Templates(directory="src/templates")
 
+# 同时在线程池中执行基金计算的最大数量，超出的请求在事件循环中等待，不占用线程
+FUND_WORKERS = int(os.getenv("FUND_WORKERS", 8))
+FUND_BATCH_MAX = int(os.getenv("FUND_BATCH_MAX", 500))
+_fund_limiter: Optional[anyio.CapacityLimiter] = None
+
+# 是否在响应中附带各阶段耗时的 Server-Timing 头
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+
+
+def get_fund_limiter() -> anyio.CapacityLimiter:
+    """获取基金计算的并发限制器，首次调用时在事件循环内创建"""
+    global _fund_limiter
+    if _fund_limiter is None:
+        _fund_limiter = anyio.CapacityLimiter(FUND_WORKERS)
+    return _fund_limiter
+
+
+class FundBatchRequest(BaseModel):
+    fund_codes: List[str] = Field(..., min_length=1, max_length=FUND_BATCH_MAX)
+    # 统计结果快照按金额为1计算后线性缩放，金额须为正数
+    investment_amount: int = Field(100000, gt=0)
+    window: HistoryWindow = "all"
+
+
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    start = time.perf_counter()
+    with telemetry.collect_timings() as timings:
+        response = await call_next(request)
+    elapsed = time.perf_counter() - start
+
+    # 按路由模板统计，避免每个基金代码产生一个时间序列
+    route = request.scope.get("route")
+    path = getattr(route, "path", "unmatched")
+    telemetry.observe("http_request_duration_seconds", elapsed, {"method": request.method, "path": path}, help="HTTP request latency")
+    telemetry.inc("http_requests_total", {"method": request.method, "path": path, "status": str(response.status_code)}, help="HTTP requests")
+
+    if SERVER_TIMING:
+        timings.append(("total", elapsed))
+        response.headers["Server-Timing"] = telemetry.server_timing_header(timings)
+    return response
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_api():
+    return PlainTextResponse(telemetry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    return templates.TemplateResponse(request, "index.html")
+
+
+def fund_etag(fund_code: str, latest_date: str, as_of: str, investment_amount: int, window: str, format: str, stale: bool = False) -> str:
+    """基金收益响应的ETag，响应内容只随最新净值日期、数据获取日期（as_of）、投资金额、历史区间、响应格式以及数据是否过期变化"""
+    from src.fund import FUND_ANALYTICS_VERSION
+
+    return make_etag(fund_code, latest_date, as_of, investment_amount, window, format, stale, FUND_ANALYTICS_VERSION)
 
 
 @app.get("/api/fund/{fund_code}")
-async def fund_returns_api(fund_code: str, investment_amount: Optional[int] = Query(100000)):
-    return get_fund_returns(fund_code, investment_amount)
+async def fund_returns_api(
+    request: Request,
+    fund_code: str,
+    investment_amount: int = Query(100000, gt=0),
+    window: HistoryWindow = Query("all"),
+    format: ResponseFormat = Query("rows"),
+):
+    from src.fund import FundDataUnavailableError, FundNotFoundError, get_cached_nav_dates, get_fund_returns, seconds_until_tomorrow
+
+    # 条件请求先只查缓存中的最新净值日期和数据获取日期，客户端的数据仍然有效时直接返回304，不计算收益，也不请求上游
+    if "if-none-match" in request.headers or "if-modified-since" in request.headers:
+        nav_dates = await anyio.to_thread.run_sync(get_cached_nav_dates, fund_code, limiter=get_fund_limiter())
+        if nav_dates is not None:
+            latest_date, as_of = nav_dates
+            etag = fund_etag(fund_code, latest_date, as_of, investment_amount, window, format)
+            if is_not_modified(request.headers, etag, latest_date):
+                return Response(status_code=304, headers=caching_headers(etag, latest_date, seconds_until_tomorrow()))
+
+    # get_fund_returns 包含同步的网络请求和pandas计算，放到线程池执行以免阻塞事件循环
+    try:
+        result = await anyio.to_thread.run_sync(get_fund_returns, fund_code, investment_amount, window, limiter=get_fund_limiter())
+    except FundNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except FundDataUnavailableError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    etag = fund_etag(fund_code, result["latest_date"], result["as_of"], investment_amount, window, format, result["stale"])
+    # 过期数据正在后台刷新，不允许客户端和CDN缓存，下次请求即可拿到刷新后的数据
+    max_age = 0 if result["stale"] else seconds_until_tomorrow()
+    return Response(
+        dump_fund_returns(result, format),
+        media_type="application/json",
+        headers=caching_headers(etag, result["latest_date"], max_age),
+    )
+
+
+@app.post("/api/funds/returns")
+async def funds_returns_api(batch: FundBatchRequest, format: ResponseFormat = Query("rows")):
+    from src.fund import get_cached_fund_index, get_fund_returns
+
+    fund_codes = list(dict.fromkeys(batch.fund_codes))
+    limiter = get_fund_limiter()
+    # 预先加载基金列表，避免各基金同时未命中
+    await anyio.to_thread.run_sync(get_cached_fund_index, limiter=limiter)
+
+    results, errors = {}, {}
+
+    async def compute(fund_code: str) -> None:
+        try:
+            results[fund_code] = await anyio.to_thread.run_sync(get_fund_returns, fund_code, batch.investment_amount, batch.window, limiter=limiter)
+        except Exception as e:
+            logger.warning(f"计算基金{fund_code}收益时出错: {type(e).__name__}: {e}")
+            errors[fund_code] = f"{type(e).__name__}: {e}"
+
+    # 每只基金各占用一个并发名额，批量请求与单只基金的请求共同受 FUND_WORKERS 限制
+    async with anyio.create_task_group() as task_group:
+        for fund_code in fund_codes:
+            task_group.start_soon(compute, fund_code)
+
+    result = {"results": {fund_code: results[fund_code] for fund_code in fund_codes if fund_code in results}, "errors": errors}
+    return Response(dump_fund_batch_returns(result, format), media_type="application/json")
+
+
+@app.get("/api/screener")
+async def screener_api(
+    sort_by: str = Query("1year"),
+    top_n: int = Query(50, ge=1, le=1000),
+    fund_type: Optional[str] = Query(None),
+    purchase_status: Optional[str] = Query(None),
+    investment_amount: int = Query(100000),
+):
+    """全市场基金排名，只使用已缓存的净值数据，货币基金按每万份收益换算的等效净值计算
+
+    响应中的 missing 为满足筛选条件但没有缓存数据、未参与排名的基金数量，见 :func:`src.screener.screen_funds`
+    """
+    from src.screener import SORT_FIELDS, screen_funds
+
+    if sort_by not in SORT_FIELDS:
+        raise HTTPException(status_code=422, detail=f"sort_by必须是{SORT_FIELDS}之一")
+
+    # 全市场统计结果有内存缓存，未命中时需读取全部已缓存的净值数据，同样放到线程池执行
+    return await anyio.to_thread.run_sync(
+        lambda: screen_funds(sort_by, top_n, fund_type, purchase_status, investment_amount), limiter=get_fund_limiter()
+    )
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+import os
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.returns import DAY_NS, PERIOD_DELTAS, daily_returns
+
+TRADING_DAYS_PER_YEAR = 252
+
+# 无风险利率（年化），用于计算夏普比率和索提诺比率
+RISK_FREE_RATE = float(os.getenv("RISK_FREE_RATE", 0.015))
+
+
+def rolling_volatility(returns: np.ndarray, window: int = 20) -> np.ndarray:
+    """计算滚动年化波动率（百分比）
+
+    通过收益率及其平方的累计和求每个窗口的方差，时间复杂度为O(n)，不逐个窗口重新计算。
+
+    Parameters
+    ----------
+    returns : np.ndarray
+        每日收益率
+    window : int
+        窗口长度（交易日）
+
+    Returns
+    -------
+    np.ndarray
+        与 returns 等长的滚动年化波动率，前 window - 1 天为NaN
+    """
+    returns = np.asarray(returns, dtype="float64")
+    result = np.full(len(returns), np.nan)
+    if window < 2 or len(returns) < window:
+        return result
+
+    cumsum = np.concatenate([[0.0], np.cumsum(returns)])
+    cumsum_sq = np.concatenate([[0.0], np.cumsum(returns**2)])
+    window_sum = cumsum[window:] - cumsum[:-window]
+    window_sum_sq = cumsum_sq[window:] - cumsum_sq[:-window]
+
+    # 样本方差，累计和相减的舍入误差可能使方差略小于0
+    variance = np.maximum((window_sum_sq - window_sum**2 / window) / (window - 1), 0.0)
+    result[window - 1 :] = np.sqrt(variance * TRADING_DAYS_PER_YEAR) * 100
+    return result
+
+
+def max_drawdown(dates: np.ndarray, navs: np.ndarray) -> Dict[str, Any]:
+    """计算最大回撤及其起止日期
+
+    一次遍历维护历史最高净值（``np.maximum.accumulate``），当前净值相对最高净值的跌幅最大处即为最大回撤。
+
+    Parameters
+    ----------
+    dates : np.ndarray
+        升序排列的int64纳秒时间戳
+    navs : np.ndarray
+        净值，不含缺失值
+
+    Returns
+    -------
+    Dict[str, Any]
+        - max_drawdown: 最大回撤（百分比，非负数）
+        - peak_date: 回撤开始前的最高点日期
+        - trough_date: 回撤的最低点日期
+        - recovery_date: 净值回到最高点的日期，尚未修复时为None
+        日期均为int64纳秒时间戳，没有数据时日期为None
+    """
+    navs = np.asarray(navs, dtype="float64")
+    if len(navs) == 0:
+        return {"max_drawdown": 0.0, "peak_date": None, "trough_date": None, "recovery_date": None}
+
+    running_max = np.maximum.accumulate(navs)
+    drawdowns = 1 - navs / running_max
+    trough = int(np.argmax(drawdowns))
+    if drawdowns[trough] <= 0:
+        return {"max_drawdown": 0.0, "peak_date": None, "trough_date": None, "recovery_date": None}
+
+    peak = int(np.argmax(navs[: trough + 1]))
+    recovered = np.flatnonzero(navs[trough:] >= navs[peak])
+    return {
+        "max_drawdown": float(drawdowns[trough] * 100),
+        "peak_date": int(dates[peak]),
+        "trough_date": int(dates[trough]),
+        "recovery_date": int(dates[trough + recovered[0]]) if len(recovered) else None,
+    }
+
+
+def calculate_risk_metrics(
+    dates: np.ndarray,
+    navs: np.ndarray,
+    window: Optional[Any] = PERIOD_DELTAS["1year"],
+    risk_free_rate: float = RISK_FREE_RATE,
+    rolling_window: int = 20,
+) -> Dict[str, Any]:
+    """计算指定窗口内的风险指标
+
+    日收益率只计算一次，波动率、夏普比率、索提诺比率共用；年化收益率与 :func:`src.returns.calculate_period_returns` 一致，
+    按实际天数线性年化。
+
+    Parameters
+    ----------
+    dates : np.ndarray
+        升序排列的int64纳秒时间戳
+    navs : np.ndarray
+        净值，与 dates 等长
+    window : relativedelta or pd.Timedelta, optional
+        统计窗口，从最新日期往前计算，为None时使用全部历史
+    risk_free_rate : float
+        年化无风险利率，例如0.015表示1.5%
+    rolling_window : int
+        滚动波动率的窗口长度（交易日）
+
+    Returns
+    -------
+    Dict[str, Any]
+        - volatility: 年化波动率（百分比）
+        - rolling_volatility: 最近 rolling_window 个交易日的年化波动率（百分比）
+        - max_drawdown, peak_date, trough_date, recovery_date: 见 :func:`max_drawdown`
+        - annualized_return: 年化收益率（百分比）
+        - sharpe_ratio, sortino_ratio, calmar_ratio: 夏普比率、索提诺比率、卡玛比率
+        无法计算的指标为NaN
+    """
+    navs = np.asarray(navs, dtype="float64")
+    valid = ~np.isnan(navs)
+    dates, navs = dates[valid], navs[valid]
+
+    if window is not None and len(dates):
+        # 与 calculate_period_returns 相同，起点为不晚于窗口起始日期的最后一个交易日
+        start = max(int(np.searchsorted(dates, (pd.Timestamp(dates[-1]) - window).value, side="right")) - 1, 0)
+        dates, navs = dates[start:], navs[start:]
+
+    drawdown = max_drawdown(dates, navs)
+    if len(navs) < 2:
+        return {
+            "volatility": np.nan,
+            "rolling_volatility": np.nan,
+            **drawdown,
+            "annualized_return": np.nan,
+            "sharpe_ratio": np.nan,
+            "sortino_ratio": np.nan,
+            "calmar_ratio": np.nan,
+        }
+
+    returns = daily_returns(navs)[1:]
+    daily_risk_free = risk_free_rate / TRADING_DAYS_PER_YEAR
+    excess = returns - daily_risk_free
+
+    std = returns.std(ddof=1) if len(returns) > 1 else np.nan
+    downside = np.sqrt(np.mean(np.minimum(excess, 0.0) ** 2))
+    days = (dates[-1] - dates[0]) // DAY_NS
+    annualized_return = (navs[-1] / navs[0] - 1) * 100 / days * 365 if days > 0 else np.nan
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = excess.mean() / std * np.sqrt(TRADING_DAYS_PER_YEAR) if std > 0 else np.nan
+        sortino = excess.mean() / downside * np.sqrt(TRADING_DAYS_PER_YEAR) if downside > 0 else np.nan
+        calmar = annualized_return / drawdown["max_drawdown"] if drawdown["max_drawdown"] > 0 else np.nan
+
+    return {
+        "volatility": float(std * np.sqrt(TRADING_DAYS_PER_YEAR) * 100),
+        "rolling_volatility": float(rolling_volatility(returns, rolling_window)[-1]),
+        **drawdown,
+        "annualized_return": float(annualized_return),
+        "sharpe_ratio": float(sharpe),
+        "sortino_ratio": float(sortino),
+        "calmar_ratio": float(calmar),
+    }
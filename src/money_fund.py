@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+from typing import Any, Dict, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.returns import PERIOD_DELTAS, aggregate_weekly
+
+
+def calculate_money_fund_yields(
+    dates: np.ndarray,
+    income_per_10k: np.ndarray,
+    seven_day_yields: np.ndarray,
+    period_deltas: Optional[Mapping[str, Any]] = None,
+) -> Dict[str, Any]:
+    """一次计算货币基金多个周期的平均7日年化收益率和累计收益率
+
+    货币基金净值恒为1，收益体现在每万份收益中，因此不使用单位净值的涨跌幅，而是：
+
+    - 平均年化收益率：周期内7日年化收益率的平均值
+    - 累计收益率：周期内每万份收益之和 / 10000，通过累计和相减得到
+
+    每个周期的起点与 :func:`src.returns.calculate_period_returns` 相同，为最新日期减去周期长度后、
+    不晚于该日期的最后一个交易日，所有周期的起点通过一次 ``np.searchsorted`` 找到。
+
+    Parameters
+    ----------
+    dates : np.ndarray
+        升序排列的int64纳秒时间戳，长度为n
+    income_per_10k : np.ndarray
+        每万份收益（元），长度为n，缺失值按0计
+    seven_day_yields : np.ndarray
+        7日年化收益率（百分比），长度为n，缺失值不计入平均
+    period_deltas : Mapping[str, Any], optional
+        周期名称到周期长度的映射，默认为 ``PERIOD_DELTAS``
+
+    Returns
+    -------
+    Dict[str, Any]
+        - periods: 周期名称列表，最后一项为 "since"（自成立以来）
+        - annualized: 各周期平均7日年化收益率（百分比），无法计算时为NaN
+        - cumulative: 各周期累计收益率（百分比），没有足够早的数据时为NaN
+    """
+    period_deltas = PERIOD_DELTAS if period_deltas is None else period_deltas
+    periods = list(period_deltas) + ["since"]
+    if len(dates) == 0:
+        return {"periods": periods, "annualized": np.full(len(periods), np.nan), "cumulative": np.full(len(periods), np.nan)}
+
+    latest_date = pd.Timestamp(dates[-1])
+    anchors = np.array([(latest_date - delta).value for delta in period_deltas.values()], dtype="int64")
+    start_index = np.searchsorted(dates, anchors, side="right") - 1
+    valid = np.append(start_index >= 0, True)
+    # 周期起点当天的收益属于上一个周期，自成立以来则包含第一天
+    start_index = np.append(np.maximum(start_index, 0) + 1, 0)
+
+    income = np.concatenate([[0.0], np.cumsum(np.nan_to_num(income_per_10k, nan=0.0))])
+    yields = np.asarray(seven_day_yields, dtype="float64")
+    has_yield = ~np.isnan(yields)
+    yield_sum = np.concatenate([[0.0], np.cumsum(np.where(has_yield, yields, 0.0))])
+    yield_count = np.concatenate([[0], np.cumsum(has_yield)])
+
+    n = len(dates)
+    counts = yield_count[n] - yield_count[start_index]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average_yields = np.where(counts > 0, (yield_sum[n] - yield_sum[start_index]) / counts, np.nan)
+    cumulative = np.where(valid, (income[n] - income[start_index]) / 10000 * 100, np.nan)
+    return {"periods": periods, "annualized": average_yields, "cumulative": cumulative}
+
+
+def calculate_money_fund_weekly_income(dates: np.ndarray, income_per_10k: np.ndarray, investment_amount: float = 1) -> Dict[str, np.ndarray]:
+    """按自然周汇总货币基金的收益金额，每日收益金额为 每万份收益 × 投资金额 / 10000
+
+    返回值同 :func:`src.returns.aggregate_weekly`
+    """
+    daily_income = np.asarray(income_per_10k, dtype="float64") * investment_amount / 10000
+    return aggregate_weekly(dates, daily_income)
+
+
+def calculate_yield_trend(dates: np.ndarray, seven_day_yields: np.ndarray, window: Any = PERIOD_DELTAS["1month"]) -> float:
+    """7日年化收益率的变化趋势：最新值与最近 ``window`` 内平均值之差（百分点），正数表示收益率在上升"""
+    yields = np.asarray(seven_day_yields, dtype="float64")
+    valid = ~np.isnan(yields)
+    dates, yields = dates[valid], yields[valid]
+    if len(yields) == 0:
+        return np.nan
+
+    start = np.searchsorted(dates, (pd.Timestamp(dates[-1]) - window).value)
+    return float(yields[-1] - yields[start:].mean())
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+from typing import Any, Dict, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+DAY_NS = 86_400_000_000_000
+
+# 默认统计周期（自然日）
+PERIOD_DELTAS = {
+    "1week": pd.Timedelta(days=7),
+    "1month": relativedelta(months=1),
+    "3months": relativedelta(months=3),
+    "6months": relativedelta(months=6),
+    "1year": relativedelta(years=1),
+}
+
+
+def to_date_array(dates: pd.Series) -> np.ndarray:
+    """将日期列转换为int64纳秒时间戳数组"""
+    return dates.to_numpy(dtype="datetime64[ns]").view("int64")
+
+
+def calculate_period_returns(
+    dates: np.ndarray,
+    navs: np.ndarray,
+    period_deltas: Optional[Mapping[str, Any]] = None,
+) -> Dict[str, Any]:
+    """一次计算多个周期的累计收益率和年化收益率
+
+    每个周期的起点为最新日期减去周期长度后、不晚于该日期的最后一个交易日，
+    所有周期的起点通过一次 ``np.searchsorted`` 找到。``navs`` 可以是单只基金的一维净值，
+    也可以是多只基金按相同日期对齐后的二维矩阵（行为日期、列为基金，缺失值为NaN）。
+
+    Parameters
+    ----------
+    dates : np.ndarray
+        升序排列的int64纳秒时间戳，长度为n
+    navs : np.ndarray
+        形状为 (n,) 或 (n, m) 的净值
+    period_deltas : Mapping[str, Any], optional
+        周期名称到周期长度（``pd.Timedelta`` 或 ``relativedelta``）的映射，默认为 ``PERIOD_DELTAS``
+
+    Returns
+    -------
+    Dict[str, Any]
+        - periods: 周期名称列表，最后一项为 "since"（自成立以来）
+        - cumulative: 累计收益率（百分比），形状为 (k,) 或 (k, m)，无法计算时为NaN
+        - annualized: 年化收益率（百分比），按实际天数线性年化，形状同上
+        - days: 各周期起点到最新日期的实际天数，形状同上
+    """
+    period_deltas = PERIOD_DELTAS if period_deltas is None else period_deltas
+    periods = list(period_deltas) + ["since"]
+
+    navs = np.asarray(navs, dtype="float64")
+    if len(dates) == 0:
+        shape = (len(periods),) + navs.shape[1:]
+        return {
+            "periods": periods,
+            "cumulative": np.full(shape, np.nan),
+            "annualized": np.full(shape, np.nan),
+            "days": np.zeros(shape, dtype="int64"),
+        }
+
+    # 统一按二维矩阵计算，最后还原为输入的维度
+    matrix = navs.reshape(len(navs), -1)
+    columns = np.arange(matrix.shape[1])
+
+    latest_date = pd.Timestamp(dates[-1])
+    anchors = np.array([(latest_date - delta).value for delta in period_deltas.values()], dtype="int64")
+
+    # 不晚于各周期目标日期的最后一个交易日
+    start_index = np.searchsorted(dates, anchors, side="right") - 1
+    valid = start_index >= 0
+    start_index = np.where(valid, start_index, 0)
+
+    # 自成立以来的起点为每只基金第一个有效净值
+    first_index = np.argmax(~np.isnan(matrix), axis=0)
+
+    start_navs = np.vstack([matrix[start_index], matrix[first_index, columns]])
+    start_dates = np.vstack([np.repeat(dates[start_index][:, np.newaxis], len(columns), axis=1), dates[first_index][np.newaxis]])
+    valid = np.vstack([np.repeat(valid[:, np.newaxis], len(columns), axis=1), np.ones((1, len(columns)), dtype=bool)])
+
+    days = (dates[-1] - start_dates) // DAY_NS
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cumulative = (matrix[-1] - start_navs) / start_navs * 100
+        annualized = cumulative / days * 365
+    cumulative = np.where(valid, cumulative, np.nan)
+    annualized = np.where(valid & (days > 0), annualized, np.nan)
+
+    shape = (len(periods),) + navs.shape[1:]
+    return {
+        "periods": periods,
+        "cumulative": cumulative.reshape(shape),
+        "annualized": annualized.reshape(shape),
+        "days": days.reshape(shape),
+    }
+
+
+def week_ordinals(dates: np.ndarray) -> np.ndarray:
+    """将int64纳秒时间戳转换为周序号，同一自然周（周一至周日）的日期序号相同"""
+    # 1970-01-01 为周四，偏移3天后按7天整除即以周一为一周的开始
+    return (dates // DAY_NS + 3) // 7
+
+
+def aggregate_weekly(dates: np.ndarray, daily_values: np.ndarray) -> Dict[str, np.ndarray]:
+    """按自然周汇总每日数值
+
+    使用整数周序号划分周边界，再用 ``np.add.reduceat`` 一次求出每周的合计。
+    ``daily_values`` 可以是一维数组，也可以是行为日期、列为基金的二维矩阵，NaN按0计。
+
+    Parameters
+    ----------
+    dates : np.ndarray
+        升序排列的int64纳秒时间戳
+    daily_values : np.ndarray
+        形状为 (n,) 或 (n, m) 的每日数值
+
+    Returns
+    -------
+    Dict[str, np.ndarray]
+        - start_dates: 每周第一个交易日
+        - end_dates: 每周最后一个交易日
+        - sums: 每周合计，形状为 (周数,) 或 (周数, m)
+    """
+    if len(dates) == 0:
+        empty = np.empty(0, dtype="int64")
+        return {"start_dates": empty, "end_dates": empty, "sums": np.empty((0,) + np.shape(daily_values)[1:])}
+
+    boundaries = np.flatnonzero(np.diff(week_ordinals(dates))) + 1
+    starts = np.concatenate([[0], boundaries])
+    ends = np.concatenate([boundaries - 1, [len(dates) - 1]])
+    sums = np.add.reduceat(np.nan_to_num(daily_values, nan=0.0), starts, axis=0)
+    return {"start_dates": dates[starts], "end_dates": dates[ends], "sums": sums}
+
+
+def daily_returns(navs: np.ndarray) -> np.ndarray:
+    """计算每日收益率，第一天为0；缺失的净值沿用前一个有效净值，与 ``pct_change`` 一致
+
+    ``navs`` 可以是一维数组，也可以是行为日期、列为基金的二维矩阵
+    """
+    navs = np.asarray(navs, dtype="float64")
+    if len(navs) == 0:
+        return navs.copy()
+    filled = pd.DataFrame(navs.reshape(len(navs), -1)).ffill().to_numpy()
+    returns = np.zeros_like(filled)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[1:] = filled[1:] / filled[:-1] - 1
+    return returns.reshape(navs.shape)
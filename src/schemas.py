@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""基金收益接口的响应结构和JSON序列化
+
+响应结构用TypedDict描述，由 :class:`pydantic.TypeAdapter` 按结构直接序列化为JSON字节，
+不经过FastAPI的 ``jsonable_encoder`` 逐个反射字段，也不为每个响应创建模型实例。
+"""
+
+from typing import Dict, List, Literal, NotRequired, Optional, TypedDict, Union
+
+from pydantic import TypeAdapter
+
+ResponseFormat = Literal["rows", "columnar"]
+HistoryWindow = Literal["1y", "3y", "5y", "all"]
+
+
+class WeeklyReturn(TypedDict):
+    date_range: str
+    start_date: str
+    end_date: str
+    return_amount: float
+
+
+class NetWorthPoint(TypedDict):
+    date: str
+    value: float
+    growth_rate: float
+
+
+class WeeklyReturnColumns(TypedDict):
+    """列式的周收益数据，各列等长，前端用 ``start_dates[i] + " - " + end_dates[i]`` 拼出日期区间"""
+
+    start_dates: List[str]
+    end_dates: List[str]
+    return_amounts: List[float]
+
+
+class NetWorthColumns(TypedDict):
+    """列式的历史净值数据，各列等长"""
+
+    dates: List[str]
+    values: List[float]
+    growth_rates: List[float]
+
+
+class RiskMetrics(TypedDict):
+    volatility: Optional[float]
+    rolling_volatility: Optional[float]
+    max_drawdown: Optional[float]
+    peak_date: Optional[str]
+    trough_date: Optional[str]
+    recovery_date: Optional[str]
+    annualized_return: Optional[float]
+    sharpe_ratio: Optional[float]
+    sortino_ratio: Optional[float]
+    calmar_ratio: Optional[float]
+
+
+class FundReturns(TypedDict):
+    fund_code: str
+    fund_name: str
+    fund_type: str
+    latest_value: float
+    latest_date: str
+    investment_amount: int
+    window: HistoryWindow
+    avg_weekly_return: float
+    positive_weeks_count: int
+    period_text: str
+    weekly_data: Union[List[WeeklyReturn], WeeklyReturnColumns]
+    annualized_returns: Dict[str, float]
+    historical_performance: Dict[str, Optional[float]]
+    net_worth_data: Union[List[NetWorthPoint], NetWorthColumns]
+    risk_metrics: Optional[RiskMetrics]
+    # 数据从上游获取的日期；stale为True时缓存已过期，数据正在后台刷新
+    as_of: str
+    stale: bool
+    # 仅货币基金
+    seven_day_yield: NotRequired[Optional[float]]
+    yield_trend: NotRequired[Optional[float]]
+
+
+class FundBatchReturns(TypedDict):
+    results: Dict[str, FundReturns]
+    errors: Dict[str, str]
+
+
+fund_returns_adapter = TypeAdapter(FundReturns)
+fund_batch_returns_adapter = TypeAdapter(FundBatchReturns)
+
+
+def to_rows(result: FundReturns) -> FundReturns:
+    """将列式的 weekly_data 和 net_worth_data 转换为逐行的字典列表，其余字段不变
+
+    get_fund_returns 的结果和统计结果快照都是列式的，只有 ``format=rows`` 的响应需要转换
+    """
+    weekly_data = result["weekly_data"]
+    net_worth_data = result["net_worth_data"]
+    return {
+        **result,
+        "weekly_data": [
+            {"date_range": f"{start_date} - {end_date}", "start_date": start_date, "end_date": end_date, "return_amount": return_amount}
+            for start_date, end_date, return_amount in zip(weekly_data["start_dates"], weekly_data["end_dates"], weekly_data["return_amounts"])
+        ],
+        "net_worth_data": [
+            {"date": date, "value": value, "growth_rate": growth_rate}
+            for date, value, growth_rate in zip(net_worth_data["dates"], net_worth_data["values"], net_worth_data["growth_rates"])
+        ],
+    }
+
+
+def dump_fund_returns(result: FundReturns, response_format: ResponseFormat = "rows") -> bytes:
+    """将 get_fund_returns 的结果序列化为JSON字节，``response_format`` 为 "rows" 时图表数据转换为逐行格式"""
+    if response_format == "rows":
+        result = to_rows(result)
+    return fund_returns_adapter.dump_json(result)
+
+
+def dump_fund_batch_returns(batch: FundBatchReturns, response_format: ResponseFormat = "rows") -> bytes:
+    """将 get_funds_returns 的结果序列化为JSON字节"""
+    if response_format == "rows":
+        batch = {"results": {code: to_rows(result) for code, result in batch["results"].items()}, "errors": batch["errors"]}
+    return fund_batch_returns_adapter.dump_json(batch)
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+from cachetools import TTLCache
+from dateutil.relativedelta import relativedelta
+
+from src.api.akshare_api import get_fund_list
+from src.api.tiantian_api import fund_values_cache_key, values_cache
+from src.fund import fund_networth_cache, is_money_fund, networth_cache_key
+from src.returns import DAY_NS, PERIOD_DELTAS, aggregate_weekly, calculate_period_returns, daily_returns, to_date_array
+
+# 全市场统计结果在内存中保存的秒数，期间的筛选请求只做过滤和排序
+SCREENER_TTL = int(os.getenv("SCREENER_TTL", 600))
+
+# 统计窗口：最长的统计周期为1年，多取两周以便找到1年前不晚于目标日期的最后一个交易日
+SCREENER_WINDOW = relativedelta(years=1, weeks=2)
+
+SORT_FIELDS = list(PERIOD_DELTAS) + ["positive_week_ratio", "avg_weekly_return"]
+
+_stats_cache: TTLCache = TTLCache(maxsize=1, ttl=SCREENER_TTL)
+_stats_lock = threading.Lock()
+
+
+def _load_cached_navs(fund_code: str, money_fund: bool) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """读取缓存（包括已过期的缓存）中基金的日期和净值，没有缓存时返回None
+
+    货币基金没有单位净值，按每万份收益复利累计为等效净值 ∏(1 + 每万份收益 / 10000)，其日收益率即每万份收益 / 10000
+    """
+    if money_fund:
+        fund_data = values_cache.get_stale(fund_values_cache_key(fund_code))
+    else:
+        fund_data = fund_networth_cache.get_stale(networth_cache_key(fund_code))
+    if fund_data is None or fund_data.empty:
+        return None
+
+    if money_fund:
+        navs = np.cumprod(1 + np.nan_to_num(fund_data["每万份收益"].to_numpy(dtype="float64"), nan=0.0) / 10000)
+    else:
+        navs = fund_data["单位净值"].to_numpy(dtype="float64")
+    return to_date_array(fund_data["净值日期"]), navs
+
+
+def build_nav_matrix(
+    fund_codes: List[str], window: Any = SCREENER_WINDOW, money_fund_codes: Optional[Set[str]] = None
+) -> Tuple[np.ndarray, List[str], np.ndarray]:
+    """将已缓存的基金净值按日期对齐为 日期 × 基金 矩阵
+
+    只读取缓存（包括已过期的缓存），不请求上游；没有缓存的基金不出现在结果中，可先运行 ``python -m src.warmup`` 预热。
+    只保留全部基金最新日期前 ``window`` 以内的数据。
+
+    Parameters
+    ----------
+    fund_codes : List[str]
+        基金代码列表
+    window : relativedelta or pd.Timedelta
+        统计窗口长度
+    money_fund_codes : Set[str], optional
+        其中的货币基金代码，从天天基金净值缓存读取每万份收益并换算为等效净值，见 :func:`_load_cached_navs`
+
+    Returns
+    -------
+    dates : np.ndarray
+        升序排列的int64纳秒时间戳，为所有基金净值日期的并集
+    codes : List[str]
+        有缓存数据的基金代码，与矩阵的列一一对应
+    matrix : np.ndarray
+        形状为 (len(dates), len(codes)) 的单位净值，基金在某日没有净值时为NaN
+    """
+    money_fund_codes = money_fund_codes or set()
+    series = []
+    for fund_code in fund_codes:
+        navs = _load_cached_navs(fund_code, fund_code in money_fund_codes)
+        if navs is not None:
+            series.append((fund_code, *navs))
+
+    if not series:
+        return np.empty(0, dtype="int64"), [], np.empty((0, 0))
+
+    latest_date = pd.Timestamp(max(fund_dates[-1] for _, fund_dates, _ in series))
+    window_start = (latest_date - window).value
+
+    # 截取窗口内的数据，起点通过二分查找确定
+    windowed = []
+    for fund_code, fund_dates, navs in series:
+        start = np.searchsorted(fund_dates, window_start)
+        windowed.append((fund_code, fund_dates[start:], navs[start:]))
+
+    dates = np.unique(np.concatenate([fund_dates for _, fund_dates, _ in windowed]))
+    matrix = np.full((len(dates), len(windowed)), np.nan)
+    for column, (_, fund_dates, navs) in enumerate(windowed):
+        matrix[np.searchsorted(dates, fund_dates), column] = navs
+
+    return dates, [fund_code for fund_code, _, _ in windowed], matrix
+
+
+def calculate_screener_stats(dates: np.ndarray, codes: List[str], matrix: np.ndarray) -> pd.DataFrame:
+    """对 日期 × 基金 净值矩阵一次性计算所有基金的统计指标
+
+    净值缺失的日期沿用前一个有效净值，各周期以全部基金的最新日期为终点。
+    周收益统计只使用窗口内（近1年）的数据。
+
+    Parameters
+    ----------
+    dates : np.ndarray
+        升序排列的int64纳秒时间戳
+    codes : List[str]
+        基金代码，与矩阵的列一一对应
+    matrix : np.ndarray
+        形状为 (len(dates), len(codes)) 的单位净值
+
+    Returns
+    -------
+    pd.DataFrame
+        以基金代码为索引，列包括：
+        - latest_date: 最新净值日期
+        - 1week ~ 1year: 各周期涨跌幅（百分比），没有足够早的数据时为NaN
+        - positive_weeks_count: 近1年收益为正的周数
+        - positive_week_ratio: 近1年收益为正的周数占有数据周数的比例
+        - avg_weekly_return: 近1年平均每周收益率（投资金额为1时的收益金额）
+    """
+    columns = list(PERIOD_DELTAS) + ["positive_weeks_count", "positive_week_ratio", "avg_weekly_return"]
+    if len(codes) == 0:
+        return pd.DataFrame(columns=["latest_date"] + columns, index=pd.Index([], name="基金代码"))
+
+    has_nav = ~np.isnan(matrix)
+    latest_index = len(dates) - 1 - np.argmax(has_nav[::-1], axis=0)
+    filled = pd.DataFrame(matrix).ffill().to_numpy()
+
+    period_returns = calculate_period_returns(dates, filled)
+    stats = dict(zip(period_returns["periods"], period_returns["cumulative"]))
+
+    # 近1年的周收益：与 calculate_weekly_returns 相同，取周开始日期不晚于最后一周结束日期前365天的周，只统计基金有净值的周
+    weekly = aggregate_weekly(dates, daily_returns(filled))
+    weeks_with_data = aggregate_weekly(dates, has_nav.astype("float64"))["sums"] > 0
+    start_1y = np.searchsorted(weekly["start_dates"], weekly["end_dates"][-1] - 365 * DAY_NS)
+    weeks_with_data = weeks_with_data[start_1y:]
+
+    weekly_sums = np.where(weeks_with_data, weekly["sums"][start_1y:], 0.0)
+    week_counts = weeks_with_data.sum(axis=0)
+    positive_weeks = ((weekly_sums > 0) & weeks_with_data).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stats["positive_weeks_count"] = positive_weeks
+        stats["positive_week_ratio"] = np.where(week_counts > 0, positive_weeks / week_counts, np.nan)
+        stats["avg_weekly_return"] = np.where(week_counts > 0, weekly_sums.sum(axis=0) / week_counts, np.nan)
+
+    result = pd.DataFrame({name: stats[name] for name in columns}, index=pd.Index(codes, name="基金代码"))
+    result.insert(0, "latest_date", dates[latest_index].view("datetime64[ns]"))
+    return result
+
+
+def get_screener_stats() -> pd.DataFrame:
+    """获取全市场基金的统计指标及基金列表信息，结果在内存中缓存 ``SCREENER_TTL`` 秒
+
+    每只基金列表中的基金一行，没有缓存数据的基金各统计指标为空、latest_date 为NaT
+    """
+    with _stats_lock:
+        stats = _stats_cache.get("stats")
+        if stats is not None:
+            return stats
+
+        fund_list = get_fund_list().drop_duplicates("基金代码").set_index("基金代码")
+        money_fund_codes = set(fund_list.index[fund_list["基金类型"].fillna("").map(is_money_fund)])
+        dates, codes, matrix = build_nav_matrix(fund_list.index.tolist(), money_fund_codes=money_fund_codes)
+        stats = fund_list[["基金简称", "基金类型", "申购状态"]].join(calculate_screener_stats(dates, codes, matrix))
+        _stats_cache["stats"] = stats
+        return stats
+
+
+def screen_funds(
+    sort_by: str = "1year",
+    top_n: int = 50,
+    fund_type: Optional[str] = None,
+    purchase_status: Optional[str] = None,
+    investment_amount: int = 100000,
+) -> Dict[str, Any]:
+    """按条件筛选基金并按指定指标排序
+
+    只对有缓存数据的基金排名，货币基金按每万份收益换算的等效净值计算收益。缓存覆盖不全时 missing 大于0，
+    排名只代表已缓存的基金，而不是全市场
+
+    Parameters
+    ----------
+    sort_by : str
+        排序指标，取值见 ``SORT_FIELDS``，按从高到低排序，无法计算的基金排在最后
+    top_n : int
+        返回的基金数量
+    fund_type : str, optional
+        基金类型，匹配基金类型中包含该字符串的基金，例如"债券型"
+    purchase_status : str, optional
+        申购状态，例如"开放申购"
+    investment_amount : int
+        投资金额，用于计算平均每周收益金额
+
+    Returns
+    -------
+    Dict[str, Any]
+        - total: 满足筛选条件且有缓存数据的基金数量
+        - missing: 满足筛选条件但没有缓存数据、未参与排名的基金数量
+        - funds: 排名前 top_n 的基金列表
+    """
+    if sort_by not in SORT_FIELDS:
+        raise ValueError(f"sort_by必须是{SORT_FIELDS}之一")
+
+    stats = get_screener_stats()
+    mask = np.ones(len(stats), dtype=bool)
+    if fund_type:
+        mask &= stats["基金类型"].fillna("").str.contains(fund_type, regex=False).to_numpy()
+    if purchase_status:
+        mask &= (stats["申购状态"] == purchase_status).to_numpy()
+
+    cached = stats["latest_date"].notna().to_numpy()
+    selected = stats[mask & cached]
+    top = selected.sort_values(sort_by, ascending=False, na_position="last", kind="stable").head(top_n)
+
+    funds = []
+    for fund_code, row in zip(top.index, top.to_dict("records")):
+        funds.append(
+            {
+                "fund_code": fund_code,
+                "fund_name": row["基金简称"],
+                "fund_type": row["基金类型"],
+                "purchase_status": row["申购状态"],
+                "latest_date": row["latest_date"].strftime("%Y-%m-%d"),
+                "returns": {label: None if np.isnan(row[label]) else round(row[label], 2) for label in PERIOD_DELTAS},
+                "positive_weeks_count": int(row["positive_weeks_count"]),
+                "positive_week_ratio": None if np.isnan(row["positive_week_ratio"]) else round(row["positive_week_ratio"], 4),
+                "avg_weekly_return": None if np.isnan(row["avg_weekly_return"]) else row["avg_weekly_return"] * investment_amount,
+            }
+        )
+    return {"total": int((mask & cached).sum()), "missing": int((mask & ~cached).sum()), "funds": funds}
@@ -90,11 +90,14 @@ async function loadFundData(fundCode) {
         document.getElementById('netvalue-data-container').innerHTML = '<div class="loading">加载中...</div>';
 
         // 调用API获取数据
-        const response = await fetch(`/api/fund/${fundCode}?investment_amount=${investmentAmount}`);
+        // 图表数据使用列式格式（并列数组），减小响应体积
+        const response = await fetch(`/api/fund/${fundCode}?investment_amount=${investmentAmount}&format=columnar`);
         const data = await response.json();
 
-        if (data.error) {
-            alert(data.error);
+        // 出错时返回 {"detail": ...}：404 基金不存在，502 上游失败且没有缓存，422 参数校验失败（detail 为错误列表）
+        if (!response.ok) {
+            const detail = Array.isArray(data.detail) ? data.detail.map(item => item.msg).join('\n') : data.detail;
+            alert(detail || `获取基金数据失败（${response.status}）`);
             return;
         }
 
@@ -152,18 +155,18 @@ function updateWeeklyReturns(weeklyData) {
     const container = document.getElementById('weeklyReturnsContainer');
     container.innerHTML = '';
 
-    weeklyData.forEach(week => {
+    weeklyData.return_amounts.forEach((returnAmount, i) => {
         const weekItem = document.createElement('div');
         weekItem.className = 'weekly-return-item';
 
         // 判断收益是正还是负
-        const isPositive = week.return_amount > 0;
+        const isPositive = returnAmount > 0;
         const returnColor = isPositive ? 'red' : 'green';
         const signPrefix = isPositive ? '+' : '';
 
         weekItem.innerHTML = `
-            <div class="weekly-return-date">${week.date_range}</div>
-            <div class="weekly-return-value" style="color: ${returnColor}">${signPrefix}${week.return_amount.toFixed(2)}</div>
+            <div class="weekly-return-date">${weeklyData.start_dates[i]} - ${weeklyData.end_dates[i]}</div>
+            <div class="weekly-return-value" style="color: ${returnColor}">${signPrefix}${returnAmount.toFixed(2)}</div>
         `;
 
         container.appendChild(weekItem);
@@ -173,8 +176,9 @@ function updateWeeklyReturns(weeklyData) {
 // 更新周收益率图
 function updateWeeklyReturnsChart(data) {
     const trendCtx = document.getElementById('weeklyReturnsChart').getContext('2d');
-    const trendLabels = data.weekly_data.map(week => week.date_range);
-    const trendData = data.weekly_data.map(week => week.return_amount);
+    const weeklyData = data.weekly_data;
+    const trendLabels = weeklyData.start_dates.map((startDate, i) => `${startDate} - ${weeklyData.end_dates[i]}`);
+    const trendData = weeklyData.return_amounts;
 
     // Check if weeklyReturnsChart exists and is a valid Chart.js instance
     if (window.weeklyReturnsChart && typeof window.weeklyReturnsChart.destroy === 'function') {
@@ -215,8 +219,8 @@ function updateWeeklyReturnsChart(data) {
 // 更新单位净值图
 function updateNetWorthChart(data) {
     const unitCtx = document.getElementById('netWorthChart').getContext('2d');
-    const unitLabels = data.net_worth_data.map(item => item.date);
-    const unitValues = data.net_worth_data.map(item => item.value);
+    const unitLabels = data.net_worth_data.dates;
+    const unitValues = data.net_worth_data.values;
 
     if (window.unitChart && typeof window.unitChart.destroy === 'function') {
         window.unitChart.destroy();
@@ -278,14 +282,14 @@ function updateHistoricalPerformance(performanceData) {
 
 // 更新历史净值数据
 function updateNetValueData(netValueData) {
-    if (!netValueData || netValueData.length === 0) return;
+    if (!netValueData || netValueData.dates.length === 0) return;
 
     const container = document.getElementById('netvalue-data-container');
     container.innerHTML = '';
 
-    const reversedData = [...netValueData].reverse();
-
-    reversedData.forEach(item => {
+    // 从最新的日期开始展示
+    for (let i = netValueData.dates.length - 1; i >= 0; i--) {
+        const item = { date: netValueData.dates[i], value: netValueData.values[i], growth_rate: netValueData.growth_rates[i] };
         const row = document.createElement('div');
         row.className = 'netvalue-row';
 
@@ -300,7 +304,7 @@ function updateNetValueData(netValueData) {
         `;
 
         container.appendChild(row);
-    });
+    }
 }
 
 // 更新脚注的投资金额
@@ -1,76 +1,728 @@
 # -*- coding: utf-8 -*-
+import functools
 import hashlib
+import json
+import logging
 import os
 import pickle
+import tempfile
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from datetime import timedelta
 from pathlib import Path
-from typing import Any, Dict, Union
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
-from cachetools import Cache
+import numpy as np
+import pandas as pd
+from cachetools import Cache, LRUCache
+
+from . import telemetry
+
+try:
+    import fcntl
+except ImportError:  # Windows下只做进程内加锁
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 是否运行在Vercel等无服务器环境中，实例在响应返回后即被冻结，后台线程中的刷新无法保证完成
+SERVERLESS = bool(os.getenv("VERCEL"))
+# 条目过期后多少秒内仍直接返回旧数据并在后台刷新，超过后请求同步等待刷新，为0时不使用后台刷新。
+# 无服务器环境中默认为0，过期条目在请求内同步刷新，刷新失败时仍按 STALE_HARD_LIMIT 回退到旧数据
+STALE_SOFT_LIMIT = int(os.getenv("STALE_SOFT_LIMIT", 0 if SERVERLESS else 24 * 3600))
+# 条目过期后多少秒内可在刷新失败时作为回退数据返回，超过后刷新失败即报错
+STALE_HARD_LIMIT = int(os.getenv("STALE_HARD_LIMIT", 7 * 24 * 3600))
+CACHE_REFRESH_WORKERS = int(os.getenv("CACHE_REFRESH_WORKERS", 4))
+
+
+def _to_seconds(ttl: Union[int, float, timedelta]) -> float:
+    if isinstance(ttl, timedelta):
+        return ttl.total_seconds()
+    return float(ttl)
 
 
 class FileCache(Cache):
+    """按键分片的文件缓存
+
+    每个键单独保存为一个pickle文件，路径为 ``{cache_dir}/{prefix}/{hash[:2]}/{hash}.pkl``，
+    其中 prefix 为键中 ``__`` 之前的部分（例如 ``get_fund_values``），hash 为完整键的 sha1。
+    读写单个键只涉及一个文件，与该前缀下已缓存的键数量无关。
+
+    文件头部保存键和该条目的过期时间，过期时间在写入时按条目单独计算；
+    文件的修改时间记录最近一次访问，超过 ``maxsize`` 个条目或 ``max_bytes`` 字节时按LRU淘汰。
+
+    写入先落到同目录的临时文件再原子替换，读取方不会看到写了一半的文件。
+    :meth:`lock` 提供跨线程、跨进程的按键互斥，用于合并对同一个键的并发回源。
+
+    Parameters
+    ----------
+    ttl : int or timedelta
+        条目默认的有效期，单位为秒
+    maxsize : int
+        最多缓存的条目数量
+    max_bytes : int, optional
+        缓存文件占用的最大磁盘字节数，为None时不限制
+    cache_dir : str or Path, optional
+        缓存目录，默认为环境变量 ``CACHE_DIR`` 或 ``.cache``。
+        淘汰策略作用于整个目录，不同用途的缓存应使用不同目录
+    """
+
+    # 其他进程也可能写入同一目录，间隔一段时间重新扫描磁盘校准LRU索引
+    SCAN_INTERVAL = 300
+
+    # 缓存文件后缀，子类更换序列化格式时同时更换
+    SUFFIX = ".pkl"
+
     def __init__(
         self,
         ttl: Union[int, timedelta] = 86400,
         maxsize: int = 128,
+        max_bytes: Optional[int] = None,
+        cache_dir: Optional[Union[str, Path]] = None,
     ):
         super().__init__(maxsize)
 
-        if isinstance(ttl, timedelta):
-            self.ttl = ttl.total_seconds()
-        else:
-            self.ttl = ttl
+        self.ttl = _to_seconds(ttl)
+        self.max_bytes = max_bytes
 
-        self.cache_dir = Path(os.getenv("CACHE_DIR", ".cache"))
+        self.cache_dir = Path(cache_dir or os.getenv("CACHE_DIR", ".cache"))
         self.cache_dir.mkdir(parents=True, exist_ok=True)
 
+        # LRU索引：路径 -> 文件大小，按最近访问时间从旧到新排列
+        self._index: "OrderedDict[Path, int]" = OrderedDict()
+        self._index_bytes = 0
+        self._scanned_at: Optional[float] = None
+        self._index_lock = threading.RLock()
+
+        # 按sha1前两位分片加锁：进程内使用可重入锁，进程间使用文件锁
+        self._stripe_locks = [threading.RLock() for _ in range(256)]
+        self._stripe_files: List[Optional[BinaryIO]] = [None] * 256
+        self._lock_dir = self.cache_dir / ".locks"
+        self._lock_dir.mkdir(exist_ok=True)
+
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
     def _get_cache_path(self, key: Any) -> Path:
         prefix = key.split("__")[0]
-        return self.cache_dir / f"{prefix}.pkl"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self.cache_dir / prefix / digest[:2] / f"{digest}{self.SUFFIX}"
 
-    def __getitem__(self, key):
-        path = self._get_cache_path(key)
-        if not path.exists():
-            raise KeyError(key)
+    def _dump(self, f: BinaryIO, key: Any, expires_at: float, value: Any) -> None:
+        """将条目写入文件，先写头部再写值"""
+        pickle.dump({"key": key, "expires_at": expires_at}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
 
-        if time.time() - path.stat().st_mtime > self.ttl:
-            path.unlink(missing_ok=True)
+    def _load_header(self, f: BinaryIO) -> Dict[str, Any]:
+        """读取文件头部，至少包含 key 和 expires_at"""
+        return pickle.load(f)
+
+    def _load_value(self, f: BinaryIO, header: Dict[str, Any]) -> Any:
+        """在头部之后读取条目的值"""
+        return pickle.load(f)
+
+    def _read(self, key: Any, path: Path) -> Tuple[float, Any]:
+        """读取条目，返回 (过期时间, 值)，条目不存在或已损坏时抛出KeyError"""
+        try:
+            with open(path, "rb") as f:
+                header = self._load_header(f)
+                cached_key, expires_at = header["key"], header["expires_at"]
+                value = self._load_value(f, header) if cached_key == key else None
+        except FileNotFoundError:
+            raise KeyError(key) from None
+        except (EOFError, KeyError, ValueError, TypeError, pickle.UnpicklingError):
+            self._discard(path)
+            raise KeyError(key) from None
+
+        # 哈希冲突时文件中保存的是其他键
+        if cached_key != key:
             raise KeyError(key)
+        return expires_at, value
 
-        with open(path, "rb") as f:
-            obj: Dict[str, Any] = pickle.load(f)
+    def __getitem__(self, key):
+        return self.get_entry(key)[1]
 
-        if "__" in key:
-            _code = key.split("__")[1]
-            if _code not in obj:
+    def get_entry(self, key: Any) -> Tuple[float, Any]:
+        """读取未过期的条目，返回 (过期时间, 值)，不存在或已过期时抛出KeyError"""
+        path = self._get_cache_path(key)
+        start = time.perf_counter()
+        try:
+            expires_at, value = self._read(key, path)
+            if time.time() > expires_at:
                 raise KeyError(key)
-            return obj[_code]
+        except KeyError:
+            self._count("misses")
+            raise
+        finally:
+            self._observe("read", start)
+
+        self._count("hits")
+        self._touch(path)
+        return expires_at, value
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    def _observe(self, op: str, start: float) -> None:
+        elapsed = time.perf_counter() - start
+        telemetry.observe(
+            "file_cache_io_seconds", elapsed, {"cache": self.cache_dir.name, "op": op}, help="Time spent reading and writing FileCache entries"
+        )
+        telemetry.record_timing(f"{self.cache_dir.name}_{op}", elapsed)
 
-        return obj
+    def stats(self) -> Dict[str, int]:
+        """返回统计：hits、misses、writes、evictions"""
+        with self._stats_lock:
+            return {"hits": self.hits, "misses": self.misses, "writes": self.writes, "evictions": self.evictions}
 
     def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def set(self, key: Any, value: Any, ttl: Optional[Union[int, float, timedelta]] = None) -> float:
+        """写入条目，``ttl`` 为该条目的有效期，默认使用缓存的 ``ttl``。返回条目的过期时间"""
+        expires_at = time.time() + (self.ttl if ttl is None else _to_seconds(ttl))
+
         path = self._get_cache_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        start = time.perf_counter()
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                self._dump(f, key, expires_at, value)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        finally:
+            self._observe("write", start)
+        self._count("writes")
+
+        self._track(path, path.stat().st_size)
+        self._evict()
+        return expires_at
+
+    @contextmanager
+    def lock(self, key: Any) -> Iterator[None]:
+        """按键加互斥锁，同一进程的线程之间以及同一缓存目录的多个进程之间都互斥
 
-        if "__" in key:
-            cache_data = {}
-            if path.exists():
+        典型用法是未命中后加锁、再次检查缓存、仍未命中才回源并写入缓存。
+        键按sha1前两位分到256个锁上，同一线程可重入，极少数不同的键会互相等待。
+        """
+        stripe = int(self._get_cache_path(key).stem[:2], 16)
+        with self._stripe_locks[stripe]:
+            # 当前线程已持有该分片的文件锁（嵌套调用）
+            if self._stripe_files[stripe] is not None:
+                yield
+                return
+
+            with open(self._lock_dir / f"{stripe:02x}.lock", "a+b") as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                self._stripe_files[stripe] = f
+                try:
+                    yield
+                finally:
+                    self._stripe_files[stripe] = None
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+
+    def get_stale_entry(self, key: Any) -> Tuple[float, Any]:
+        """读取条目，忽略其是否过期，返回 (过期时间, 值)，不存在时抛出KeyError"""
+        return self._read(key, self._get_cache_path(key))
+
+    def touch(self, key: Any) -> None:
+        """将条目标记为最近访问，不读取内容。条目不存在时忽略"""
+        self._touch(self._get_cache_path(key))
+
+    def get_stale(self, key: Any, default: Any = None) -> Any:
+        """读取条目，忽略其是否过期。用于上游获取失败时回退到旧数据"""
+        try:
+            return self.get_stale_entry(key)[1]
+        except KeyError:
+            return default
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __delitem__(self, key):
+        path = self._get_cache_path(key)
+        if not path.exists():
+            raise KeyError(key)
+        self._discard(path)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self):
+        with self._index_lock:
+            self._ensure_index()
+            return len(self._index)
+
+    @property
+    def currsize(self):
+        return len(self)
+
+    @property
+    def currbytes(self) -> int:
+        """缓存文件当前占用的磁盘字节数"""
+        with self._index_lock:
+            self._ensure_index()
+            return self._index_bytes
+
+    def expire(self) -> None:
+        """删除所有已过期的条目"""
+        now = time.time()
+        for path in list(self._scan()):
+            try:
                 with open(path, "rb") as f:
-                    cache_data = pickle.load(f)
+                    expires_at = self._load_header(f)["expires_at"]
+            except FileNotFoundError:
+                continue
+            except (EOFError, KeyError, ValueError, TypeError, pickle.UnpicklingError):
+                expires_at = 0
+            if now > expires_at:
+                self._discard(path)
+
+    def clear(self):
+        with self._index_lock:
+            for file in self.cache_dir.rglob(f"*{self.SUFFIX}"):
+                file.unlink(missing_ok=True)
+            for file in self.cache_dir.rglob("*.tmp"):
+                file.unlink(missing_ok=True)
+            self._index.clear()
+            self._index_bytes = 0
+
+    def _scan(self):
+        return self.cache_dir.glob(f"*/*/*{self.SUFFIX}")
+
+    def _ensure_index(self) -> None:
+        """首次使用或距上次扫描超过 ``SCAN_INTERVAL`` 时，按文件修改时间重建LRU索引"""
+        if self._scanned_at is not None and time.time() - self._scanned_at < self.SCAN_INTERVAL:
+            return
+
+        entries = []
+        for path in self._scan():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, path, stat.st_size))
+        entries.sort(key=lambda x: x[0])
+
+        self._index = OrderedDict((path, size) for _, path, size in entries)
+        self._index_bytes = sum(size for _, _, size in entries)
+        self._scanned_at = time.time()
+
+    def _track(self, path: Path, size: int) -> None:
+        with self._index_lock:
+            self._ensure_index()
+            self._index_bytes += size - self._index.pop(path, 0)
+            self._index[path] = size
+
+    def _touch(self, path: Path) -> None:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return
+        with self._index_lock:
+            if path in self._index:
+                self._index.move_to_end(path)
+
+    def _discard(self, path: Path) -> None:
+        path.unlink(missing_ok=True)
+        with self._index_lock:
+            self._index_bytes -= self._index.pop(path, 0)
+
+    def _evict(self) -> None:
+        """淘汰最久未访问的条目，直到条目数量和磁盘占用都不超过上限"""
+        with self._index_lock:
+            while self._index and (len(self._index) > self.maxsize or (self.max_bytes is not None and self._index_bytes > self.max_bytes)):
+                path, size = self._index.popitem(last=False)
+                self._index_bytes -= size
+                path.unlink(missing_ok=True)
+                self._count("evictions")
+
+
+class NavFileCache(FileCache):
+    """以列式二进制格式保存净值数据的文件缓存
+
+    值为包含日期列和若干数值列的DataFrame。文件由一行JSON头部和紧随其后的数据区组成，
+    数据区是形状为 (1 + 列数, 行数) 的小端8字节矩阵：第一行为int64日期（纳秒时间戳），
+    其余各行为对应数值列的float64值。头部补齐到 ``ALIGNMENT`` 字节，数据区按行连续存放。
+    读取时整个数据区以只读内存映射的方式加载，构建DataFrame不复制数据；全程不使用pickle。
+
+    Parameters
+    ----------
+    date_column : str
+        日期列名，其余列均按float64保存
+    **kwargs
+        其余参数见 :class:`FileCache`
+    """
+
+    SUFFIX = ".nav"
+    ALIGNMENT = 64
+
+    def __init__(self, date_column: str = "净值日期", **kwargs):
+        super().__init__(**kwargs)
+        self.date_column = date_column
+
+    def _dump(self, f: BinaryIO, key: Any, expires_at: float, value: pd.DataFrame) -> None:
+        value_columns = [column for column in value.columns if column != self.date_column]
+        header = {"key": key, "expires_at": expires_at, "columns": value_columns, "rows": len(value)}
+        header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        padding = -(len(header_bytes) + 1) % self.ALIGNMENT
+        f.write(header_bytes + b" " * padding + b"\n")
 
-            cache_data[key.split("__")[1]] = value
+        data = np.empty((1 + len(value_columns), len(value)), dtype="<i8")
+        data[0] = value[self.date_column].to_numpy(dtype="datetime64[ns]").view("int64")
+        data[1:] = value[value_columns].apply(pd.to_numeric, errors="coerce").to_numpy(dtype="<f8").T.view("<i8")
+        f.write(data.tobytes())
+
+    def _load_header(self, f: BinaryIO) -> Dict[str, Any]:
+        return json.loads(f.readline())
+
+    def _load_value(self, f: BinaryIO, header: Dict[str, Any]) -> pd.DataFrame:
+        shape = (1 + len(header["columns"]), header["rows"])
+        if header["rows"] == 0:
+            data = np.empty(shape, dtype="<i8")
         else:
-            cache_data = value
+            data = np.memmap(f, dtype="<i8", mode="r", shape=shape, offset=f.tell()).view(np.ndarray)
+
+        columns = {self.date_column: data[0].view("datetime64[ns]")}
+        columns.update(zip(header["columns"], data[1:].view("<f8")))
+        return pd.DataFrame(columns, copy=False)
+
+
+class JsonFileCache(FileCache):
+    """以JSON格式保存的文件缓存
+
+    文件由一行JSON头部和JSON格式的值组成。读取时只使用标准库的 :mod:`json`，反序列化不会像pickle那样
+    导入值所属的模块（例如pandas），适合进程启动后最先读取的小型数据。值须能被 :func:`json.dumps` 序列化，
+    元组读取后变为列表。
+    """
+
+    SUFFIX = ".json"
+
+    def _dump(self, f: BinaryIO, key: Any, expires_at: float, value: Any) -> None:
+        f.write(json.dumps({"key": key, "expires_at": expires_at}, ensure_ascii=False).encode("utf-8") + b"\n")
+        f.write(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    def _load_header(self, f: BinaryIO) -> Dict[str, Any]:
+        return json.loads(f.readline())
 
-        with open(path, "wb") as f:
-            pickle.dump(cache_data, f)
+    def _load_value(self, f: BinaryIO, header: Dict[str, Any]) -> Any:
+        return json.loads(f.read())
+
+
+class TieredCache(Cache):
+    """内存LRU + 磁盘 :class:`FileCache` 两级缓存
+
+    内存层保存反序列化后的对象及其过期时间，命中时不读磁盘；未命中时从磁盘层读取并回填内存层。
+    写入同时落到两层。内存层中的对象会被多个请求共享，调用方不应原地修改返回的值。
+
+    内存层命中时同样更新磁盘层条目的访问时间，使磁盘层的LRU淘汰不会先淘汰最常用的条目；
+    同一个键每 ``TOUCH_INTERVAL`` 秒最多更新一次，避免每次命中都修改文件。
+
+    Parameters
+    ----------
+    disk : FileCache
+        磁盘层缓存
+    maxsize : int
+        内存层最多保存的条目数量
+    """
+
+    # 内存层命中时更新磁盘层访问时间的最小间隔，单位为秒
+    TOUCH_INTERVAL = 60
+
+    def __init__(self, disk: FileCache, maxsize: int = 32):
+        super().__init__(maxsize)
+        self.disk = disk
+        self.memory: LRUCache = LRUCache(maxsize)
+        # 键 -> 最近一次更新磁盘层访问时间的时间
+        self._touched: LRUCache = LRUCache(maxsize)
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __getitem__(self, key):
+        return self.get_entry(key)[1]
+
+    def get_entry(self, key: Any) -> Tuple[float, Any]:
+        """读取未过期的条目，返回 (过期时间, 值)，不存在或已过期时抛出KeyError"""
+        now = time.time()
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry is not None and now <= entry[0]:
+                self.memory_hits += 1
+                touch = now - self._touched.get(key, 0.0) >= self.TOUCH_INTERVAL
+                if touch:
+                    self._touched[key] = now
+            else:
+                entry = None
+        if entry is not None:
+            if touch:
+                self.disk.touch(key)
+            return entry
+
+        try:
+            expires_at, value = self.disk.get_entry(key)
+        except KeyError:
+            with self._lock:
+                self.misses += 1
+            raise
+
+        with self._lock:
+            self.disk_hits += 1
+            self.memory[key] = (expires_at, value)
+            self._touched[key] = now
+        return expires_at, value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def set(self, key: Any, value: Any, ttl: Optional[Union[int, float, timedelta]] = None) -> float:
+        """写入条目，``ttl`` 为该条目的有效期，默认使用磁盘层的 ``ttl``。返回条目的过期时间"""
+        expires_at = self.disk.set(key, value, ttl=ttl)
+        with self._lock:
+            self.memory[key] = (expires_at, value)
+            self._touched[key] = time.time()
+        return expires_at
+
+    def lock(self, key: Any):
+        """按键加互斥锁，见 :meth:`FileCache.lock`"""
+        return self.disk.lock(key)
+
+    def get_stale_entry(self, key: Any) -> Tuple[float, Any]:
+        """读取条目，忽略其是否过期，返回 (过期时间, 值)，不存在时抛出KeyError"""
+        with self._lock:
+            entry = self.memory.get(key)
+        if entry is not None:
+            return entry
+        return self.disk.get_stale_entry(key)
+
+    def get_stale(self, key: Any, default: Any = None) -> Any:
+        """读取条目，忽略其是否过期。用于上游获取失败时回退到旧数据"""
+        try:
+            return self.get_stale_entry(key)[1]
+        except KeyError:
+            return default
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
 
     def __delitem__(self, key):
-        path = self._get_cache_path(key)
-        if path.exists():
-            path.unlink()
+        with self._lock:
+            self.memory.pop(key, None)
+            self._touched.pop(key, None)
+        del self.disk[key]
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self):
+        return len(self.disk)
+
+    @property
+    def currsize(self):
+        return len(self.memory)
+
+    def stats(self) -> Dict[str, int]:
+        """返回命中统计：memory_hits、disk_hits、misses"""
+        with self._lock:
+            return {"memory_hits": self.memory_hits, "disk_hits": self.disk_hits, "misses": self.misses}
 
     def clear(self):
-        for file in self.cache_dir.glob("*.pkl"):
-            file.unlink()
+        with self._lock:
+            self.memory.clear()
+            self._touched.clear()
+            self.memory_hits = self.disk_hits = self.misses = 0
+        self.disk.clear()
+
+
+def _default_key(func: Callable, args: tuple, kwargs: Dict[str, Any]) -> str:
+    """函数名和各参数的字符串以 ``__`` 连接，例如 ``get_fund_values__004898``"""
+    return "__".join([func.__name__, *map(str, args), *(f"{name}={value}" for name, value in sorted(kwargs.items()))])
+
+
+def single_flight(cache: Union[FileCache, TieredCache], key: Optional[Callable[..., str]] = None):
+    """缓存装饰器，与 ``cachetools.cached`` 类似，并合并对同一个键的并发未命中
+
+    未命中时在 ``cache.lock(key)`` 内再次检查缓存，只有第一个拿到锁的调用方执行被装饰的函数，
+    其余线程或进程等待其完成后直接读取写入的结果。
+
+    ``key`` 以被装饰函数的参数调用，须返回字符串（:class:`FileCache` 按字符串键确定文件路径）。
+    默认为函数名和各参数的 ``str`` 以 ``__`` 连接，参数的字符串形式须能区分不同的调用。
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            k = _default_key(func, args, kwargs) if key is None else key(*args, **kwargs)
+            try:
+                return cache[k]
+            except KeyError:
+                pass
+
+            with cache.lock(k):
+                try:
+                    return cache[k]
+                except KeyError:
+                    pass
+                value = func(*args, **kwargs)
+                cache[k] = value
+                return value
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
+
+
+_refresh_executor = ThreadPoolExecutor(max_workers=CACHE_REFRESH_WORKERS, thread_name_prefix="cache-refresh")
+# 正在后台刷新的 (缓存, 键) -> Future，同一个键同时只有一个刷新任务
+_refreshing: Dict[Tuple[int, Any], Future] = {}
+_refreshing_lock = threading.Lock()
+
+
+def _get_stale_entry(cache: Union[FileCache, TieredCache], key: Any) -> Optional[Tuple[float, Any]]:
+    try:
+        return cache.get_stale_entry(key)
+    except KeyError:
+        return None
+
+
+def _refresh(
+    cache: Union[FileCache, TieredCache],
+    key: Any,
+    fetch: Callable[[Optional[Any]], Any],
+    ttl: Optional[Union[int, float, timedelta, Callable[[], float]]],
+    stale: Optional[Tuple[float, Any]],
+    mode: str,
+) -> Tuple[float, Any]:
+    """调用 ``fetch`` 获取新值并写入缓存，调用方须持有 ``cache.lock(key)``"""
+    labels = {"cache": str(key).split("__")[0], "mode": mode}
+    try:
+        value = fetch(None if stale is None else stale[1])
+    except Exception:
+        telemetry.inc("cache_refreshes_total", {**labels, "result": "error"}, help="Cache refreshes from upstream by mode and result")
+        raise
+    telemetry.inc("cache_refreshes_total", {**labels, "result": "ok"}, help="Cache refreshes from upstream by mode and result")
+    expires_at = cache.set(key, value, ttl=ttl() if callable(ttl) else ttl)
+    return expires_at, value
+
+
+def _schedule_refresh(cache: Union[FileCache, TieredCache], key: Any, fetch: Callable[[Optional[Any]], Any], ttl: Any) -> None:
+    """提交后台刷新任务，该键已有刷新任务在执行时直接返回"""
+    owner = (id(cache), key)
+    with _refreshing_lock:
+        if owner in _refreshing:
+            return
+
+        def refresh():
+            try:
+                # 多个进程共用缓存目录时，由先拿到锁的进程刷新，其余进程拿到锁后发现条目已更新即返回
+                with cache.lock(key):
+                    try:
+                        cache.get_entry(key)
+                        return
+                    except KeyError:
+                        pass
+                    stale = _get_stale_entry(cache, key)
+                    _refresh(cache, key, fetch, ttl, stale, mode="background")
+            except Exception as e:
+                logger.warning(f"后台刷新缓存{key}出错: {type(e).__name__}: {e}")
+            finally:
+                with _refreshing_lock:
+                    _refreshing.pop(owner, None)
+
+        _refreshing[owner] = _refresh_executor.submit(refresh)
+
+
+def get_or_refresh(
+    cache: Union[FileCache, TieredCache],
+    key: Any,
+    fetch: Callable[[Optional[Any]], Any],
+    ttl: Optional[Union[int, float, timedelta, Callable[[], float]]] = None,
+    allow_stale: bool = True,
+) -> Tuple[float, Any]:
+    """读取缓存条目，过期时按 stale-while-revalidate 的方式刷新，返回 (过期时间, 值)
+
+    - 条目未过期：直接返回
+    - 条目过期不超过 ``STALE_SOFT_LIMIT`` 秒：直接返回旧条目，同时提交后台刷新，同一个键同时只有一个刷新任务
+    - 条目不存在、过期超过 ``STALE_SOFT_LIMIT`` 秒或 ``allow_stale`` 为False：加锁后同步刷新，并发的请求等待同一次刷新的结果。
+      刷新失败时，过期不超过 ``STALE_HARD_LIMIT`` 秒的旧条目作为回退数据返回，否则抛出刷新时的异常
+
+    调用方可通过返回的过期时间判断数据是否已过期。后台刷新在进程内的线程池中执行，只适用于长期运行的服务；
+    无服务器环境（``SERVERLESS``）中 ``STALE_SOFT_LIMIT`` 默认为0，过期条目总是同步刷新。
+
+    Parameters
+    ----------
+    cache : FileCache or TieredCache
+        缓存
+    key : Any
+        缓存键
+    fetch : Callable
+        从上游获取新值的函数，参数为旧值（没有旧条目时为None），可据此增量更新
+    ttl : int, float, timedelta or Callable, optional
+        新条目的有效期，也可以是返回有效期（秒）的函数，在写入时求值。默认使用缓存的 ``ttl``
+    allow_stale : bool
+        为False时不直接返回过期条目，用于预热等需要最新数据的场景
+    """
+    try:
+        return cache.get_entry(key)
+    except KeyError:
+        pass
+
+    if allow_stale:
+        stale = _get_stale_entry(cache, key)
+        if stale is not None and time.time() - stale[0] <= STALE_SOFT_LIMIT:
+            telemetry.inc(
+                "cache_stale_served_total", {"cache": str(key).split("__")[0]}, help="Expired cache entries served while refreshing in background"
+            )
+            _schedule_refresh(cache, key, fetch, ttl)
+            return stale
+
+    with cache.lock(key):
+        try:
+            return cache.get_entry(key)
+        except KeyError:
+            pass
+
+        stale = _get_stale_entry(cache, key)
+        try:
+            return _refresh(cache, key, fetch, ttl, stale, mode="blocking")
+        except Exception as e:
+            if stale is None or time.time() - stale[0] > STALE_HARD_LIMIT:
+                raise
+            logger.warning(f"刷新缓存{key}出错，使用{(time.time() - stale[0]) / 3600:.1f}小时前过期的旧数据: {type(e).__name__}: {e}")
+            return stale
+
+
+def wait_for_refreshes(timeout: Optional[float] = None) -> None:
+    """等待当前所有后台刷新任务完成，用于测试和批处理脚本退出前"""
+    with _refreshing_lock:
+        futures = list(_refreshing.values())
+    wait(futures, timeout=timeout)
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""访问上游接口的统一限流、并发控制和熔断
+
+每个上游主机对应一个 :class:`UpstreamGovernor`，所有请求在 :func:`guard` 内发出：
+
+- 令牌桶限制平均请求速率和突发请求数（:class:`~src.utils.rate_limit.TokenBucket`）
+- 信号量限制同时进行的请求数
+- 连续失败达到阈值后熔断，熔断期间立即抛出 :class:`UpstreamUnavailableError`，
+  过了冷却时间放行一个探测请求，成功后恢复
+
+等待令牌或并发名额超过 ``UPSTREAM_MAX_WAIT`` 秒时同样抛出 :class:`UpstreamUnavailableError`，
+调用方（:func:`~src.utils.cache_utils.get_or_refresh`）据此回退到缓存中的旧数据，而不是让工作线程排队等待超时。
+
+    with guard(EASTMONEY_HOST):
+        ak.fund_name_em()
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import ContextManager, Dict, Iterable, Iterator, Optional
+
+from . import telemetry
+from .rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# akshare的基金接口都请求东方财富的基金站点
+EASTMONEY_HOST = "fund.eastmoney.com"
+
+# 每个上游主机每秒允许的平均请求数和突发请求数
+UPSTREAM_RATE = float(os.getenv("UPSTREAM_RATE", 10))
+UPSTREAM_BURST = float(os.getenv("UPSTREAM_BURST", 20))
+# 每个上游主机同时进行的最大请求数
+UPSTREAM_CONCURRENCY = int(os.getenv("UPSTREAM_CONCURRENCY", 8))
+# 等待令牌和并发名额的最长秒数
+UPSTREAM_MAX_WAIT = float(os.getenv("UPSTREAM_MAX_WAIT", 5))
+# 连续失败多少次后熔断，熔断多少秒后放行探测请求
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", 30))
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+# 导出指标时的状态值
+CIRCUIT_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class UpstreamUnavailableError(ConnectionError):
+    """上游熔断中或请求排队超时，请求没有发出"""
+
+
+class CircuitBreaker:
+    """连续失败计数的熔断器
+
+    Parameters
+    ----------
+    failure_threshold : int
+        连续失败多少次后熔断
+    reset_timeout : float
+        熔断后多少秒进入半开状态，放行一个探测请求
+    """
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """是否放行请求，半开状态下同一时间只放行一个探测请求"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def release(self) -> None:
+        """放行的请求最终没有发出，不影响熔断状态"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """记录一次失败，返回熔断器是否因此打开"""
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    @property
+    def retry_after(self) -> float:
+        """熔断状态下距离放行探测请求的秒数"""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+
+class UpstreamGovernor:
+    """单个上游主机的限流、并发控制和熔断
+
+    只有网络错误（``OSError``，包括requests的异常）计为失败；上游正常响应但内容无法解析
+    （例如基金代码不存在时akshare抛出的 ``KeyError``）说明上游可用，计为成功。
+
+    Parameters
+    ----------
+    host : str
+        上游主机名，用作指标的标签
+    rate : float
+        每秒允许的平均请求数
+    burst : float
+        允许的最大突发请求数
+    concurrency : int
+        同时进行的最大请求数
+    max_wait : float
+        等待令牌和并发名额的最长秒数
+    breaker : CircuitBreaker, optional
+        熔断器，默认按 ``CIRCUIT_FAILURE_THRESHOLD`` 和 ``CIRCUIT_RESET_TIMEOUT`` 创建
+    """
+
+    def __init__(
+        self,
+        host: str,
+        rate: float = UPSTREAM_RATE,
+        burst: float = UPSTREAM_BURST,
+        concurrency: int = UPSTREAM_CONCURRENCY,
+        max_wait: float = UPSTREAM_MAX_WAIT,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.host = host
+        self.bucket = TokenBucket(rate, capacity=burst)
+        self.concurrency = concurrency
+        self.max_wait = max_wait
+        self.breaker = breaker or CircuitBreaker()
+        self.in_flight = 0
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+
+    def _reject(self, reason: str, message: str) -> UpstreamUnavailableError:
+        telemetry.inc("upstream_rejections_total", {"host": self.host, "reason": reason}, help="Upstream requests rejected before being sent")
+        return UpstreamUnavailableError(message)
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """在代码块内发出一次上游请求，熔断中或排队超时时抛出 :class:`UpstreamUnavailableError`"""
+        if not self.breaker.allow():
+            raise self._reject("circuit_open", f"{self.host}已熔断，{self.breaker.retry_after:.0f}秒后重试")
+
+        deadline = time.monotonic() + self.max_wait
+        if not self.bucket.acquire(timeout=self.max_wait):
+            self.breaker.release()
+            raise self._reject("rate_limited", f"{self.host}请求过多，等待令牌超时")
+        if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            self.breaker.release()
+            raise self._reject("concurrency", f"{self.host}并发请求过多，等待超时")
+
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield
+        except OSError:
+            self._record(success=False)
+            raise
+        except Exception:
+            self._record(success=True)
+            raise
+        except BaseException:
+            # 中断或代码块被放弃（KeyboardInterrupt、GeneratorExit等）时没有结果，释放探测名额，否则半开状态永远不再放行请求
+            self.breaker.release()
+            raise
+        else:
+            self._record(success=True)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def _record(self, success: bool) -> None:
+        telemetry.inc(
+            "upstream_requests_total", {"host": self.host, "result": "success" if success else "failure"}, help="Upstream requests by result"
+        )
+        if success:
+            self.breaker.record_success()
+        elif self.breaker.record_failure():
+            telemetry.inc("upstream_circuit_opens_total", {"host": self.host}, help="Times the upstream circuit breaker opened")
+            logger.warning(f"{self.host}连续失败{self.breaker.failures}次，熔断{self.breaker.reset_timeout:.0f}秒")
+
+
+_governors: Dict[str, UpstreamGovernor] = {}
+_governors_lock = threading.Lock()
+
+
+def get_governor(host: str) -> UpstreamGovernor:
+    """获取上游主机对应的 :class:`UpstreamGovernor`，首次使用时按环境变量配置创建"""
+    governor = _governors.get(host)
+    if governor is None:
+        with _governors_lock:
+            governor = _governors.get(host)
+            if governor is None:
+                breaker = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+                governor = _governors[host] = UpstreamGovernor(
+                    host, UPSTREAM_RATE, UPSTREAM_BURST, UPSTREAM_CONCURRENCY, UPSTREAM_MAX_WAIT, breaker=breaker
+                )
+    return governor
+
+
+def guard(host: str) -> ContextManager[None]:
+    """``get_governor(host).guard()`` 的简写"""
+    return get_governor(host).guard()
+
+
+def reset() -> None:
+    """丢弃所有主机的限流和熔断状态，用于测试"""
+    with _governors_lock:
+        _governors.clear()
+
+
+def _collect_governors() -> Iterable[telemetry.GaugeFamily]:
+    with _governors_lock:
+        governors = list(_governors.values())
+    if not governors:
+        return
+
+    yield (
+        "upstream_circuit_state",
+        "gauge",
+        "Upstream circuit breaker state (0 closed, 1 half-open, 2 open)",
+        [({"host": governor.host}, CIRCUIT_STATE_VALUES[governor.breaker.state]) for governor in governors],
+    )
+    yield (
+        "upstream_consecutive_failures",
+        "gauge",
+        "Consecutive failed upstream requests",
+        [({"host": governor.host}, governor.breaker.failures) for governor in governors],
+    )
+    yield (
+        "upstream_in_flight",
+        "gauge",
+        "Upstream requests currently in flight",
+        [({"host": governor.host}, governor.in_flight) for governor in governors],
+    )
+    yield (
+        "upstream_tokens_available",
+        "gauge",
+        "Tokens left in the upstream rate limit bucket",
+        [({"host": governor.host}, governor.bucket.available) for governor in governors],
+    )
+
+
+telemetry.register_gauges(_collect_governors)
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Mapping
+
+
+def make_etag(*parts: Any) -> str:
+    """由若干部分生成强ETag，各部分相同时ETag相同"""
+    digest = hashlib.sha1("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def http_date(date: str) -> str:
+    """将"%Y-%m-%d"格式的日期转换为HTTP日期（当天零点，GMT）"""
+    return format_datetime(datetime.strptime(date, "%Y-%m-%d").replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def caching_headers(etag: str, last_modified: str, max_age: float) -> Dict[str, str]:
+    """生成缓存相关的响应头
+
+    Parameters
+    ----------
+    etag : str
+        响应的ETag
+    last_modified : str
+        数据的最后更新日期，格式为"%Y-%m-%d"
+    max_age : float
+        浏览器和CDN可缓存的秒数，与服务端缓存的剩余有效期一致
+    """
+    max_age = max(int(max_age), 0)
+    return {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": f"public, max-age={max_age}, s-maxage={max_age}",
+    }
+
+
+def is_not_modified(request_headers: Mapping[str, str], etag: str, last_modified: str) -> bool:
+    """判断条件请求是否可以返回304
+
+    有 If-None-Match 时只比较ETag（RFC 9110），否则比较 If-Modified-Since 与 ``last_modified``
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match 使用弱比较，忽略 W/ 前缀
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return since >= parsedate_to_datetime(http_date(last_modified))
+
+    return False
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def merge_recent_history(
+    history: pd.DataFrame,
+    recent: pd.DataFrame,
+    date_column: str = "净值日期",
+    value_column: str = "单位净值",
+) -> Optional[pd.DataFrame]:
+    """将最近一段时间的净值数据合并到已缓存的完整历史中
+
+    两份数据都需按 ``date_column`` 升序排列。最近数据覆盖历史中相同及之后的日期，
+    以下情况无法安全地增量合并，返回None，调用方应重新获取完整历史：
+
+    - 最近数据为空，或其最早日期晚于历史的最后日期（中间可能缺失数据）
+    - 两份数据重叠日期上的 ``value_column`` 不一致（上游修正了历史净值）
+
+    Parameters
+    ----------
+    history : pd.DataFrame
+        已缓存的完整历史
+    recent : pd.DataFrame
+        最近一段时间的数据，与 history 列相同
+    date_column : str
+        日期列名
+    value_column : str
+        用于校验重叠日期的数值列名
+
+    Returns
+    -------
+    pd.DataFrame or None
+        合并去重后的完整历史，无法增量合并时返回None
+    """
+    if history.empty or recent.empty:
+        return None
+
+    recent_start = recent[date_column].iloc[0]
+    if recent_start > history[date_column].iloc[-1]:
+        return None
+
+    overlap = history.merge(recent[[date_column, value_column]], on=date_column, suffixes=("", "_recent"))
+    if not np.allclose(overlap[value_column], overlap[f"{value_column}_recent"], rtol=0, atol=1e-6, equal_nan=True):
+        return None
+
+    head = history[history[date_column] < recent_start]
+    return pd.concat([head, recent], ignore_index=True).drop_duplicates(date_column, keep="last").reset_index(drop=True)
+
+
+def tail_window(history: pd.DataFrame, window: Optional[Any], date_column: str = "净值日期") -> pd.DataFrame:
+    """截取最近 ``window`` 内的数据
+
+    起点通过对日期列二分查找确定，不逐行扫描，返回的是原数据的切片。为了让以窗口起点为基准的周期收益与全部历史
+    计算的结果一致，额外保留窗口起点之前的最后一个交易日。
+
+    Parameters
+    ----------
+    history : pd.DataFrame
+        按 ``date_column`` 升序排列的数据
+    window : relativedelta or pd.Timedelta, optional
+        窗口长度，从最后一个日期往前计算，为None时返回全部数据
+    date_column : str
+        日期列名
+
+    Returns
+    -------
+    pd.DataFrame
+        窗口内的数据
+    """
+    if window is None or history.empty:
+        return history
+
+    start_date = history[date_column].iloc[-1] - window
+    start = max(int(history[date_column].searchsorted(start_date, side="right")) - 1, 0)
+    return history.iloc[start:]
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """线程安全的令牌桶限流器
+
+    令牌以每秒 ``rate`` 个的速度补充，最多积累 ``capacity`` 个。每次调用上游前取走一个令牌，
+    令牌不足时等待补充，因此长期平均速率不超过 ``rate``，短时间内最多允许 ``capacity`` 个突发请求。
+
+    Parameters
+    ----------
+    rate : float
+        每秒补充的令牌数，即允许的平均请求速率
+    capacity : float, optional
+        令牌桶容量，即允许的最大突发请求数，默认与 ``rate`` 相同（至少为1）
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(1.0, rate if capacity is None else capacity)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """立即尝试取走令牌，令牌不足时返回False，不等待"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """取走令牌，令牌不足时等待补充
+
+        Parameters
+        ----------
+        tokens : float
+            需要的令牌数，不能超过 ``capacity``
+        timeout : float, optional
+            最长等待秒数，为None时一直等待
+
+        Returns
+        -------
+        bool
+            是否取得令牌，只有设置了 ``timeout`` 且超时时返回False
+        """
+        if tokens > self.capacity:
+            raise ValueError("tokens must not exceed capacity")
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+            time.sleep(wait)
+
+    @property
+    def available(self) -> float:
+        """当前可用的令牌数"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
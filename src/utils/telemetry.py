@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""进程内的计数器、耗时统计和Prometheus文本格式导出
+
+- :func:`span` 统计代码块的耗时，计入 ``stage_duration_seconds`` 直方图，
+  并记录到当前请求的 Server-Timing 列表（如果当前请求启用了 :func:`collect_timings`）
+- :func:`inc` 和 :func:`observe` 更新计数器和直方图
+- :func:`register_gauges` 注册在导出时才读取的指标，例如各缓存的命中次数
+- :func:`render_prometheus` 生成 ``/metrics`` 接口的响应内容
+"""
+
+import math
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+# 导出时读取的指标：(指标名, 类型, 说明, [(标签, 值), ...])
+GaugeFamily = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[Labels, float]] = {}
+_histograms: Dict[str, Dict[Labels, List[float]]] = {}
+_help: Dict[str, str] = {}
+_gauge_collectors: List[Callable[[], Iterable[GaugeFamily]]] = []
+_caches: Dict[str, object] = {}
+
+# 当前请求的各阶段耗时，为None时不记录
+_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("timings", default=None)
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> Labels:
+    return tuple(sorted((labels or {}).items()))
+
+
+def inc(name: str, labels: Optional[Dict[str, str]] = None, value: float = 1, help: str = "") -> None:
+    """计数器加 ``value``"""
+    key = _labels(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + value
+        if help:
+            _help.setdefault(name, help)
+
+
+def observe(name: str, value: float, labels: Optional[Dict[str, str]] = None, help: str = "") -> None:
+    """向直方图中记录一个值（通常为秒）"""
+    key = _labels(labels)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        # 各桶的计数，最后两项为总数和总和
+        buckets = series.get(key)
+        if buckets is None:
+            buckets = series[key] = [0.0] * (len(DEFAULT_BUCKETS) + 2)
+        index = bisect_left(DEFAULT_BUCKETS, value)
+        if index < len(DEFAULT_BUCKETS):
+            buckets[index] += 1
+        buckets[-2] += 1
+        buckets[-1] += value
+        if help:
+            _help.setdefault(name, help)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """统计代码块的耗时，计入 ``stage_duration_seconds{stage=...}``，并记录到当前请求的 Server-Timing"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe("stage_duration_seconds", elapsed, {"stage": stage}, help="Duration of fund pipeline stages")
+        record_timing(stage, elapsed)
+
+
+def record_timing(stage: str, elapsed: float) -> None:
+    """只将耗时记录到当前请求的 Server-Timing，不计入直方图"""
+    timings = _timings.get()
+    if timings is not None:
+        timings.append((stage, elapsed))
+
+
+@contextmanager
+def collect_timings() -> Iterator[List[Tuple[str, float]]]:
+    """在代码块内收集 :func:`span` 的耗时，用于生成 Server-Timing 响应头
+
+    通过 contextvars 传递，``anyio.to_thread.run_sync`` 执行的函数中的耗时也会被收集
+    """
+    timings: List[Tuple[str, float]] = []
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def server_timing_header(timings: List[Tuple[str, float]]) -> str:
+    """生成 Server-Timing 响应头，同名阶段的耗时合并，单位为毫秒"""
+    totals: Dict[str, float] = {}
+    for stage, elapsed in timings:
+        totals[stage] = totals.get(stage, 0.0) + elapsed
+    return ", ".join(f"{re.sub(r'[^A-Za-z0-9_-]', '_', stage)};dur={elapsed * 1000:.1f}" for stage, elapsed in totals.items())
+
+
+def register_gauges(collector: Callable[[], Iterable[GaugeFamily]]) -> None:
+    """注册导出时调用的指标收集函数"""
+    with _lock:
+        _gauge_collectors.append(collector)
+
+
+def register_caches(caches: Dict[str, object]) -> None:
+    """注册需要导出统计的缓存，支持 ``FileCache`` 和 ``TieredCache``，名称相同时覆盖
+
+    导出 cache_requests_total（按命中层级）、cache_writes_total、cache_evictions_total 和 cache_entries
+    """
+    with _lock:
+        _caches.update(caches)
+
+
+def _collect_caches() -> Iterable[GaugeFamily]:
+    with _lock:
+        caches = dict(_caches)
+
+    requests, writes, evictions, entries = [], [], [], []
+    for name, cache in caches.items():
+        disk = getattr(cache, "disk", cache)
+        disk_stats = disk.stats()
+        if disk is not cache:
+            tiered_stats = cache.stats()
+            requests.append(({"cache": name, "result": "memory_hit"}, tiered_stats["memory_hits"]))
+            requests.append(({"cache": name, "result": "disk_hit"}, tiered_stats["disk_hits"]))
+            requests.append(({"cache": name, "result": "miss"}, tiered_stats["misses"]))
+        else:
+            requests.append(({"cache": name, "result": "disk_hit"}, disk_stats["hits"]))
+            requests.append(({"cache": name, "result": "miss"}, disk_stats["misses"]))
+        writes.append(({"cache": name}, disk_stats["writes"]))
+        evictions.append(({"cache": name}, disk_stats["evictions"]))
+        entries.append(({"cache": name}, len(disk)))
+
+    if caches:
+        yield "cache_requests_total", "counter", "Cache lookups by result", requests
+        yield "cache_writes_total", "counter", "Entries written to the disk cache", writes
+        yield "cache_evictions_total", "counter", "Entries evicted from the disk cache", evictions
+        yield "cache_entries", "gauge", "Entries currently tracked by the disk cache index", entries
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    labels = list(labels)
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render_prometheus() -> str:
+    """以Prometheus文本格式导出所有指标"""
+    lines = []
+    with _lock:
+        counters = {name: dict(series) for name, series in _counters.items()}
+        histograms = {name: {key: list(buckets) for key, buckets in series.items()} for name, series in _histograms.items()}
+        collectors = [_collect_caches] + _gauge_collectors
+        help_texts = dict(_help)
+
+    for name, series in sorted(counters.items()):
+        lines.append(f"# HELP {name} {help_texts.get(name, name)}")
+        lines.append(f"# TYPE {name} counter")
+        for key, value in series.items():
+            lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+    for name, series in sorted(histograms.items()):
+        lines.append(f"# HELP {name} {help_texts.get(name, name)}")
+        lines.append(f"# TYPE {name} histogram")
+        for key, buckets in series.items():
+            cumulative = 0.0
+            for bound, count in zip(DEFAULT_BUCKETS, buckets):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(key + (('le', _format_value(bound)),))} {_format_value(cumulative)}")
+            lines.append(f"{name}_bucket{_format_labels(key + (('le', '+Inf'),))} {_format_value(buckets[-2])}")
+            lines.append(f"{name}_count{_format_labels(key)} {_format_value(buckets[-2])}")
+            lines.append(f"{name}_sum{_format_labels(key)} {_format_value(buckets[-1])}")
+
+    for collector in collectors:
+        for name, metric_type, help_text, samples in collector():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    """清空计数器和直方图，用于测试和基准测试"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""预热基金数据缓存
+
+在交易日晚间或开盘前批量获取基金列表和各基金净值，写入缓存并生成统计结果快照，
+使白天的请求全部命中缓存。用法::
+
+    python -m src.warmup                          # 预热全部基金
+    python -m src.warmup --codes 004898 013594    # 只预热指定基金
+    python -m src.warmup --codes-file funds.txt --tiantian
+
+已完成的基金记录在进度文件中，中断或部分失败后重新运行会跳过已完成且缓存仍然有效的基金，只重试剩余部分。
+需要预热的基金数量不能超过缓存容量（``MAX_FUND_CACHE``），否则先预热的基金会被LRU淘汰，预热前会检查并拒绝运行。
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from src.fund import (
+    CACHE_DIR,
+    analytics_cache_key,
+    fund_analytics_cache,
+    fund_networth_cache,
+    get_cached_fund_info,
+    get_fund_analytics,
+    get_fund_info,
+    is_money_fund,
+    load_fund_data,
+    networth_cache_key,
+)
+from src.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+WARMUP_WORKERS = int(os.getenv("WARMUP_WORKERS", 8))
+WARMUP_RATE = float(os.getenv("WARMUP_RATE", 5))
+# 每隔多少秒输出一次进度
+WARMUP_PROGRESS_INTERVAL = 10
+# 缓存中还没有条目时，估算容量所用的每只基金净值文件大小：日期和两列数值，约4000个交易日（16年）的历史
+ESTIMATED_NAV_FILE_BYTES = 3 * 8 * 4000
+
+
+def get_universe() -> List[str]:
+    """获取全部基金代码"""
+    from src.api.akshare_api import get_fund_list
+
+    return get_fund_list()["基金代码"].dropna().drop_duplicates().tolist()
+
+
+def load_completed(resume_file: Path) -> set:
+    """读取进度文件中已完成的基金代码"""
+    if not resume_file.exists():
+        return set()
+    return {line.strip() for line in resume_file.read_text(encoding="utf-8").splitlines() if line.strip()}
+
+
+def _nav_cache_capacity(disk) -> int:
+    """净值缓存能保存的基金数量，取条目数上限和按平均文件大小估算的字节上限中较小的一个"""
+    if disk.max_bytes is None:
+        return disk.maxsize
+    count = len(disk)
+    average_bytes = disk.currbytes / count if count else ESTIMATED_NAV_FILE_BYTES
+    return min(disk.maxsize, int(disk.max_bytes // max(average_bytes, 1)))
+
+
+def cache_capacity(tiantian: bool = False) -> int:
+    """预热结果能同时保留在磁盘缓存中的基金数量上限，由 ``MAX_FUND_CACHE`` 和 ``MAX_FUND_CACHE_BYTES`` 决定
+
+    字节上限按缓存中已有条目的平均大小估算，缓存为空时按 ``ESTIMATED_NAV_FILE_BYTES`` 估算
+    """
+    from src.api import tiantian_api
+
+    capacity = min(_nav_cache_capacity(fund_networth_cache.disk), _nav_cache_capacity(tiantian_api.values_cache.disk))
+    if tiantian:
+        # 每只基金在天天基金缓存中有券种分布、资产分布两个条目
+        capacity = min(capacity, tiantian_api.cache.maxsize // 2)
+    return capacity
+
+
+def _check_capacity(count: int, tiantian: bool) -> None:
+    """需要预热的基金数量超过缓存容量时抛出ValueError，否则先预热的基金会在预热过程中被淘汰"""
+    capacity = cache_capacity(tiantian)
+    if count > capacity:
+        raise ValueError(
+            f"需要预热{count}只基金，超过缓存容量{capacity}只，先预热的基金会被淘汰。"
+            f"请将MAX_FUND_CACHE调大到至少{count}，并将MAX_FUND_CACHE_BYTES调大到约{count * ESTIMATED_NAV_FILE_BYTES}"
+        )
+
+
+def is_fund_cached(fund_code: str, tiantian: bool = False) -> bool:
+    """基金的预热结果是否仍全部保存在磁盘缓存中（未过期且未被淘汰），只读取缓存，不请求上游
+
+    检查的是磁盘层而不是内存层，内存层中的条目在磁盘层被淘汰后仍可能存在，但不会被其他进程看到
+    """
+    from src.api import tiantian_api
+
+    money_fund = is_money_fund(get_fund_info(fund_code)["type"])
+    if money_fund:
+        fund_data = tiantian_api.values_cache.disk.get(tiantian_api.fund_values_cache_key(fund_code))
+    else:
+        fund_data = fund_networth_cache.disk.get(networth_cache_key(fund_code))
+    if fund_data is None or fund_data.empty:
+        return False
+
+    latest_date = fund_data["净值日期"].iloc[-1].strftime("%Y-%m-%d")
+    entries = [(fund_analytics_cache.disk, analytics_cache_key(fund_code, latest_date, money_fund=money_fund))]
+    if tiantian:
+        entries += [
+            (tiantian_api.values_cache.disk, tiantian_api.fund_values_cache_key(fund_code)),
+            (tiantian_api.cache, f"get_bond_investment_distribution__{fund_code}"),
+            (tiantian_api.cache, f"get_fund_asset_allocation__{fund_code}"),
+        ]
+    return all(key in cache for cache, key in entries)
+
+
+def warm_up_fund(fund_code: str, limiter: TokenBucket, tiantian: bool = False) -> None:
+    """预热单只基金的净值缓存和统计结果快照，获取失败时抛出异常
+
+    每次调用上游前从 ``limiter`` 取一个令牌
+    """
+    fund_type = get_fund_info(fund_code)["type"]
+    limiter.acquire()
+    # 预热需要最新数据，缓存过期时同步刷新，不返回等待后台刷新的旧数据
+    fund_data = load_fund_data(fund_code, fund_type, allow_stale=False)
+    if fund_data is None or fund_data.empty:
+        raise ValueError(f"基金{fund_code}净值数据获取失败")
+    get_fund_analytics(fund_code, fund_data, money_fund=is_money_fund(fund_type))
+
+    if tiantian:
+        from src.api import tiantian_api
+
+        # 货币基金的天天基金净值数据已在上面获取
+        if not is_money_fund(fund_type):
+            limiter.acquire()
+            tiantian_api.get_fund_values(fund_code, allow_stale=False)
+        # 券种分布和资产分布两个接口并发请求
+        limiter.acquire(2)
+        tiantian_api.get_fund_distribution(fund_code)
+
+
+def warm_up(
+    fund_codes: Optional[Iterable[str]] = None,
+    workers: int = WARMUP_WORKERS,
+    rate: float = WARMUP_RATE,
+    resume_file: Optional[Path] = None,
+    tiantian: bool = False,
+) -> Dict[str, any]:
+    """批量预热基金缓存
+
+    Parameters
+    ----------
+    fund_codes : Iterable[str], optional
+        需要预热的基金代码，为None时预热 ``get_fund_list()`` 中的全部基金
+    workers : int
+        并行预热的最大线程数
+    rate : float
+        每秒最多发起的上游请求数，短时突发不超过 ``max(rate, 2)`` 个
+    resume_file : Path, optional
+        进度文件，每完成一只基金并确认其结果仍在缓存中后追加一行基金代码，重新运行时跳过其中缓存仍然有效的基金。
+        默认按日期保存在缓存目录下
+    tiantian : bool
+        是否同时预热天天基金接口的净值和持仓分布缓存
+
+    Returns
+    -------
+    Dict[str, any]
+        - total: 本次需要预热的基金数量（不含已完成的基金）
+        - succeeded: 成功数量
+        - skipped: 进度文件中已完成而跳过的数量
+        - errors: 基金代码 -> 错误信息
+        - elapsed: 耗时（秒）
+
+    Raises
+    ------
+    ValueError
+        需要预热的基金数量超过缓存容量，见 :func:`cache_capacity`
+    """
+    resume_file = Path(resume_file or CACHE_DIR / f"warmup-{date.today():%Y%m%d}.done")
+
+    # 指定了基金代码时在请求上游之前检查容量；预热全部基金时只需先获取基金列表
+    if fund_codes is not None:
+        fund_codes = list(dict.fromkeys(fund_codes))
+        _check_capacity(len(fund_codes), tiantian)
+
+    # 基金列表所有基金共用，先单独加载一次
+    get_cached_fund_info(allow_stale=False)
+    if fund_codes is None:
+        fund_codes = get_universe()
+        _check_capacity(len(fund_codes), tiantian)
+
+    # 进度文件中的基金在上次运行后可能已被淘汰，只跳过缓存仍然有效的基金
+    completed = load_completed(resume_file)
+    completed = {fund_code for fund_code in fund_codes if fund_code in completed and is_fund_cached(fund_code, tiantian=tiantian)}
+    pending = [fund_code for fund_code in fund_codes if fund_code not in completed]
+    skipped = len(fund_codes) - len(pending)
+    logger.info(f"预热{len(pending)}只基金，跳过已完成的{skipped}只，并发{workers}，限速{rate}次/秒")
+
+    # 突发容量至少为2，使天天基金的两个并发请求可以一次取得令牌
+    limiter = TokenBucket(rate, capacity=max(rate, 2))
+    errors: Dict[str, str] = {}
+    succeeded = 0
+    start = last_report = time.monotonic()
+    write_lock = threading.Lock()
+
+    def _warm_up(fund_code: str) -> None:
+        warm_up_fund(fund_code, limiter, tiantian=tiantian)
+        # 确认结果仍在缓存中后才记为完成，例如超过 MAX_FUND_CACHE_BYTES 时可能已被淘汰
+        if not is_fund_cached(fund_code, tiantian=tiantian):
+            raise ValueError(f"基金{fund_code}的缓存在预热完成前已被淘汰，请调大MAX_FUND_CACHE_BYTES")
+        with write_lock, resume_file.open("a", encoding="utf-8") as f:
+            f.write(f"{fund_code}\n")
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending) or 1)), thread_name_prefix="warmup") as executor:
+        futures = {executor.submit(_warm_up, fund_code): fund_code for fund_code in pending}
+        for done, future in enumerate(as_completed(futures), start=1):
+            fund_code = futures[future]
+            try:
+                future.result()
+                succeeded += 1
+            except Exception as e:
+                logger.warning(f"预热基金{fund_code}失败: {type(e).__name__}: {e}")
+                errors[fund_code] = f"{type(e).__name__}: {e}"
+
+            now = time.monotonic()
+            if now - last_report >= WARMUP_PROGRESS_INTERVAL or done == len(pending):
+                last_report = now
+                throughput = done / max(now - start, 1e-9)
+                eta = (len(pending) - done) / throughput if throughput else 0
+                logger.info(f"进度 {done}/{len(pending)}，失败{len(errors)}，{throughput:.1f}只/秒，预计剩余{eta:.0f}秒")
+
+    elapsed = time.monotonic() - start
+    logger.info(f"预热完成：成功{succeeded}只，失败{len(errors)}只，耗时{elapsed:.1f}秒")
+    return {"total": len(pending), "succeeded": succeeded, "skipped": skipped, "errors": errors, "elapsed": elapsed}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="预热基金数据缓存")
+    parser.add_argument("--codes", nargs="+", help="需要预热的基金代码，默认预热全部基金")
+    parser.add_argument("--codes-file", type=Path, help="基金代码文件，每行一个")
+    parser.add_argument("--workers", type=int, default=WARMUP_WORKERS, help="并行预热的最大线程数")
+    parser.add_argument("--rate", type=float, default=WARMUP_RATE, help="每秒最多发起的上游请求数")
+    parser.add_argument("--resume-file", type=Path, help="进度文件，默认按日期保存在缓存目录下")
+    parser.add_argument("--tiantian", action="store_true", help="同时预热天天基金接口的缓存")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    fund_codes = args.codes
+    if args.codes_file is not None:
+        fund_codes = (fund_codes or []) + [line.strip() for line in args.codes_file.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+    try:
+        summary = warm_up(fund_codes, workers=args.workers, rate=args.rate, resume_file=args.resume_file, tiantian=args.tiantian)
+    except ValueError as e:
+        logger.error(str(e))
+        return 2
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+# 缓存在导入 src 时创建，需在导入之前指向临时目录，测试不读写项目缓存
+_cache_dir = tempfile.mkdtemp(prefix="alpha-select-test-")
+atexit.register(shutil.rmtree, _cache_dir, ignore_errors=True)
+os.environ.setdefault("FUND_CACHE_DIR", str(Path(_cache_dir) / "fund"))
+os.environ.setdefault("CACHE_DIR", str(Path(_cache_dir) / "api"))
+
+
+@pytest.fixture
+def upstream():
+    """用 :class:`benchmarks.upstream.RecordedUpstream` 替代上游接口（需要安装akshare），结束后清空缓存和限流状态"""
+    from benchmarks.upstream import RecordedUpstream
+    from src import fund
+    from src.api import tiantian_api
+    from src.utils import governor
+
+    upstream = RecordedUpstream(universe=8, days=1500, fixtures_dir=None)
+    with upstream.install():
+        yield upstream
+    for cache in (fund.fund_info_cache, fund.fund_networth_cache, fund.fund_analytics_cache, tiantian_api.cache, tiantian_api.values_cache):
+        cache.clear()
+    governor.reset()
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""src.api.akshare_api 中基金列表索引的测试，基金列表直接写入缓存，不请求上游"""
+
+import pandas as pd
+
+from src.api import akshare_api
+
+
+def make_fund_list(fund_type: str) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "基金代码": ["000001", "000001", "000002"],
+            "基金简称": ["基金1", "基金1重复", "基金2"],
+            "基金类型": [fund_type, fund_type, "债券型-长债"],
+            "申购状态": "开放申购",
+            "赎回状态": "开放赎回",
+        }
+    )
+
+
+def test_fund_index_follows_cached_fund_list():
+    akshare_api.cache.set("get_fund_list", make_fund_list("混合型-偏股"))
+    try:
+        assert akshare_api.get_fund_info("000001")["基金简称"] == "基金1"
+        assert akshare_api.get_fund_info("999999")["基金类型"] == "未查询到"
+
+        # 基金列表刷新后索引立即随之更新
+        akshare_api.cache.set("get_fund_list", make_fund_list("指数型-股票"))
+        assert akshare_api.get_fund_info("000001")["基金类型"] == "指数型-股票"
+    finally:
+        akshare_api.cache.clear()
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""src.utils.cache_utils 中各缓存实现和刷新逻辑的测试"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils import cache_utils
+from src.utils.cache_utils import FileCache, JsonFileCache, NavFileCache, TieredCache, get_or_refresh, single_flight
+
+
+def make_navs(periods: int = 10) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "净值日期": pd.bdate_range("2025-01-01", periods=periods),
+            "单位净值": np.linspace(1.0, 1.1, periods),
+            "日增长率": np.r_[np.nan, np.full(periods - 1, 0.5)],
+        }
+    )
+
+
+def test_file_cache_round_trip_and_expiry(tmp_path):
+    cache = FileCache(ttl=60, cache_dir=tmp_path)
+    cache.set("fund__a", {"value": 1})
+    cache.set("fund__b", [1, 2], ttl=-1)
+
+    assert cache["fund__a"] == {"value": 1}
+    assert "fund__b" not in cache
+    # 过期条目仍可作为回退数据读取
+    assert cache.get_stale("fund__b") == [1, 2]
+    assert cache.stats()["hits"] == 1
+
+
+def test_file_cache_evicts_least_recently_used(tmp_path):
+    cache = FileCache(maxsize=2, cache_dir=tmp_path)
+    cache["fund__a"] = 1
+    cache["fund__b"] = 2
+    # 文件修改时间的精度有限，拉开访问时间
+    os.utime(cache._get_cache_path("fund__a"), (time.time() - 10, time.time() - 10))
+    cache["fund__a"]
+    cache["fund__c"] = 3
+
+    assert "fund__a" in cache
+    assert "fund__b" not in cache
+    assert len(cache) == 2
+
+
+def test_nav_file_cache_round_trip(tmp_path):
+    cache = NavFileCache(cache_dir=tmp_path)
+    navs = make_navs()
+    cache["fund_networth__000001"] = navs
+    cache["fund_networth__empty"] = navs.iloc[:0]
+
+    pd.testing.assert_frame_equal(cache["fund_networth__000001"], navs, check_freq=False)
+    assert cache["fund_networth__empty"].empty
+
+
+def test_json_file_cache_round_trip(tmp_path):
+    cache = JsonFileCache(cache_dir=tmp_path)
+    cache["fund_info"] = {"data": {"基金代码": ["000001"], "基金简称": ["基金"]}}
+
+    assert cache["fund_info"] == {"data": {"基金代码": ["000001"], "基金简称": ["基金"]}}
+
+
+def test_tiered_cache_serves_memory_hits(tmp_path):
+    cache = TieredCache(FileCache(cache_dir=tmp_path), maxsize=2)
+    cache["fund__a"] = [1]
+
+    assert cache["fund__a"] is cache["fund__a"]
+    assert cache.stats() == {"memory_hits": 2, "disk_hits": 0, "misses": 0}
+
+
+def test_tiered_cache_memory_hits_keep_disk_entry_recent(tmp_path):
+    cache = TieredCache(FileCache(maxsize=2, cache_dir=tmp_path), maxsize=4)
+    cache.TOUCH_INTERVAL = 0
+    cache["fund__a"] = 1
+    cache["fund__b"] = 2
+    # a 只在内存层命中，磁盘层淘汰时仍应视为最近使用
+    cache["fund__a"]
+    cache["fund__c"] = 3
+
+    assert cache.disk.get("fund__a") == 1
+    assert cache.disk.get("fund__b") is None
+
+
+def test_get_or_refresh_serves_stale_entry_and_refreshes_in_background(tmp_path):
+    cache = FileCache(cache_dir=tmp_path)
+    cache.set("fund__a", "old", ttl=-60)
+
+    expires_at, value = get_or_refresh(cache, "fund__a", lambda stale: stale + "+new")
+    assert value == "old" and expires_at < time.time()
+
+    cache_utils.wait_for_refreshes(5)
+    assert cache["fund__a"] == "old+new"
+
+
+def test_get_or_refresh_without_entry_raises_fetch_error(tmp_path):
+    cache = FileCache(cache_dir=tmp_path)
+
+    def fetch(_):
+        raise ConnectionError("upstream down")
+
+    with pytest.raises(ConnectionError):
+        get_or_refresh(cache, "fund__a", fetch)
+
+
+def test_get_or_refresh_stale_limits(tmp_path, monkeypatch):
+    cache = FileCache(cache_dir=tmp_path)
+    cache.set("fund__a", "old", ttl=-120)
+
+    def fetch(_):
+        raise ConnectionError("upstream down")
+
+    # 超过软限制时同步刷新，刷新失败但未超过硬限制时返回旧数据
+    monkeypatch.setattr(cache_utils, "STALE_SOFT_LIMIT", 60)
+    assert get_or_refresh(cache, "fund__a", fetch)[1] == "old"
+
+    # 超过硬限制后刷新失败即报错
+    monkeypatch.setattr(cache_utils, "STALE_HARD_LIMIT", 60)
+    with pytest.raises(ConnectionError):
+        get_or_refresh(cache, "fund__a", fetch)
+
+
+def test_get_or_refresh_without_soft_limit_refreshes_inline(tmp_path, monkeypatch):
+    # 无服务器环境中软限制为0，过期条目在请求内刷新，不提交后台任务
+    monkeypatch.setattr(cache_utils, "STALE_SOFT_LIMIT", 0)
+    cache = FileCache(cache_dir=tmp_path)
+    cache.set("fund__a", "old", ttl=-1)
+
+    expires_at, value = get_or_refresh(cache, "fund__a", lambda stale: stale + "+new")
+    assert value == "old+new" and expires_at > time.time()
+
+
+def test_single_flight_default_key(tmp_path):
+    cache = FileCache(cache_dir=tmp_path)
+    calls = []
+
+    @single_flight(cache=cache)
+    def get_fund_values(fund_code, period="ln"):
+        calls.append((fund_code, period))
+        return f"{fund_code}-{period}"
+
+    assert get_fund_values("000001") == get_fund_values("000001") == "000001-ln"
+    assert get_fund_values("000001", period="y") == "000001-y"
+    assert calls == [("000001", "ln"), ("000001", "y")]
+    assert cache["get_fund_values__000001"] == "000001-ln"
@@ -1,20 +1,205 @@
 # -*- coding: utf-8 -*-
+"""get_fund_returns 的离线测试，上游接口由 benchmarks.upstream.RecordedUpstream 替代"""
+
+import json
+import os
+import subprocess
 import sys
-from pathlib import Path
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+akshare = pytest.importorskip("akshare")
+
+from src import fund
+from src.api import tiantian_api
+from src.schemas import dump_fund_returns
+from src.utils import cache_utils, governor, telemetry
+
+FUND_CODE = "000001"
+MONEY_FUND_CODE = "000003"
+
+
+def test_fund_returns(upstream):
+    result = fund.get_fund_returns(FUND_CODE, investment_amount=10000)
+
+    assert result["fund_code"] == FUND_CODE
+    assert result["fund_name"] == f"基金{FUND_CODE}"
+    assert result["latest_date"] == "2025-06-13"
+    assert result["window"] == "all"
+    assert len(result["weekly_data"]["return_amounts"]) == 12
+    assert len(result["net_worth_data"]["dates"]) == 30
+    assert set(result["historical_performance"]) == {"1week", "1month", "3months", "6months", "1year"}
+    assert result["risk_metrics"]["max_drawdown"] >= 0
+    # 能按响应结构序列化
+    assert dump_fund_returns(result, "columnar")
+    rows = json.loads(dump_fund_returns(result, "rows"))
+    assert rows["weekly_data"][-1]["return_amount"] == pytest.approx(result["weekly_data"]["return_amounts"][-1])
+    assert rows["net_worth_data"][-1] == {
+        "date": "2025-06-13",
+        "value": result["latest_value"],
+        "growth_rate": result["net_worth_data"]["growth_rates"][-1],
+    }
+
+
+def test_fund_returns_scale_with_investment_amount(upstream):
+    small = fund.get_fund_returns(FUND_CODE, investment_amount=1000)
+    large = fund.get_fund_returns(FUND_CODE, investment_amount=100000)
+
+    assert large["avg_weekly_return"] == pytest.approx(small["avg_weekly_return"] * 100)
+    for small_amount, large_amount in zip(small["weekly_data"]["return_amounts"], large["weekly_data"]["return_amounts"]):
+        assert large_amount == pytest.approx(small_amount * 100)
+
+
+def test_fund_returns_reject_non_positive_amount(upstream):
+    for investment_amount in (0, -100000, None):
+        with pytest.raises(ValueError):
+            fund.get_fund_returns(FUND_CODE, investment_amount=investment_amount)
+
+
+def test_fund_returns_reuse_cached_data(upstream):
+    first = fund.get_fund_returns(FUND_CODE)
+    second = fund.get_fund_returns(FUND_CODE)
+
+    assert first == second
+    assert upstream.calls["fund_open_fund_info_em"] == 1
+    assert upstream.calls["fund_name_em"] == 1
+
+
+def test_fund_returns_window(upstream):
+    full = fund.get_fund_returns(FUND_CODE)
+    one_year = fund.get_fund_returns(FUND_CODE, window="1y")
+
+    assert one_year["window"] == "1y"
+    # 近1年内的统计与使用全部历史时相同
+    assert one_year["weekly_data"] == full["weekly_data"]
+    assert one_year["historical_performance"] == full["historical_performance"]
+
+    with pytest.raises(ValueError):
+        fund.get_fund_returns(FUND_CODE, window="2y")
+
+
+def test_money_fund_returns(upstream):
+    result = fund.get_fund_returns(MONEY_FUND_CODE)
+
+    assert fund.is_money_fund(result["fund_type"])
+    assert result["risk_metrics"] is None
+    assert result["seven_day_yield"] is not None
+    assert upstream.calls["fund_open_fund_info_em"] == 0
+    assert upstream.calls["tiantian.FundVPageDiagram"] == 1
+
+
+def test_money_fund_values_cached_as_columns(upstream):
+    fund.get_fund_returns(MONEY_FUND_CODE)
+    # 清空内存层后从列式文件读取，不经过pickle
+    tiantian_api.values_cache.memory.clear()
+
+    values = tiantian_api.get_fund_values(MONEY_FUND_CODE)
+    assert list(values.columns) == ["基金代码", "净值日期", "每万份收益", "7日年化收益率"]
+    assert (values["基金代码"] == MONEY_FUND_CODE).all()
+    assert fund.get_cached_nav_dates(MONEY_FUND_CODE)[0] == values["净值日期"].iloc[-1].strftime("%Y-%m-%d")
+    assert upstream.calls["tiantian.FundVPageDiagram"] == 1
+
+
+def test_funds_returns_report_errors(upstream):
+    batch = fund.get_funds_returns([FUND_CODE, "999999"])
+
+    assert list(batch["results"]) == [FUND_CODE]
+    assert "999999" in batch["errors"]
+
+
+def test_cache_hit_does_not_import_akshare(upstream):
+    fund.get_fund_returns(FUND_CODE)
+    fund.get_fund_returns(MONEY_FUND_CODE)
+
+    # 新进程使用相同的缓存目录，命中缓存时不应导入akshare
+    script = (
+        "import sys; from src.fund import get_fund_returns; "
+        f"get_fund_returns({FUND_CODE!r}); get_fund_returns({MONEY_FUND_CODE!r}); print('akshare' in sys.modules)"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+    completed = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True)
+    assert completed.stdout.strip() == "False"
+
+
+def expire_networth(fund_code, seconds_ago=60):
+    key = fund.networth_cache_key(fund_code)
+    fund.fund_networth_cache.set(key, fund.fund_networth_cache.get_stale(key), ttl=-seconds_ago)
+
+
+def test_stale_networth_served_while_refreshing(upstream, monkeypatch):
+    fresh = fund.get_fund_returns(FUND_CODE)
+    assert fresh["stale"] is False
+    expire_networth(FUND_CODE)
+
+    # 上游在放行前一直阻塞，请求仍应立即返回旧数据
+    release = threading.Event()
+
+    def slow_get_json(*args, **kwargs):
+        release.wait(5)
+        return upstream.tiantian_get_json(*args, **kwargs)
+
+    monkeypatch.setattr(tiantian_api.client, "get_json", slow_get_json)
+    start = time.perf_counter()
+    stale = [fund.get_fund_returns(FUND_CODE) for _ in range(5)]
+    assert time.perf_counter() - start < 1
+    assert all(result["stale"] for result in stale)
+    assert stale[0]["latest_date"] == fresh["latest_date"]
+
+    release.set()
+    cache_utils.wait_for_refreshes(5)
+    # 多个请求只触发一次后台刷新，且只从天天基金获取近1月的数据，不重新下载全部历史
+    assert upstream.calls["tiantian.FundVPageDiagram"] == 1
+    assert upstream.calls["fund_open_fund_info_em"] == 1
+    assert fund.get_fund_returns(FUND_CODE)["stale"] is False
+
+    merged = fund.get_cached_fund_networth(FUND_CODE)
+    full = fund._fetch_fund_networth(FUND_CODE)
+    pd.testing.assert_frame_equal(merged[["净值日期", "单位净值"]], full[["净值日期", "单位净值"]])
+
+
+def test_stale_networth_hard_limit(upstream, monkeypatch):
+    fund.get_fund_returns(FUND_CODE)
+    expire_networth(FUND_CODE, seconds_ago=3600)
+
+    def failing_fetch(*args, **kwargs):
+        raise ConnectionError("upstream down")
+
+    monkeypatch.setattr(akshare, "fund_open_fund_info_em", failing_fetch)
+    monkeypatch.setattr(tiantian_api.client, "get_json", failing_fetch)
+    # 超过软限制时同步刷新，刷新失败但未超过硬限制时返回旧数据
+    monkeypatch.setattr(cache_utils, "STALE_SOFT_LIMIT", 60)
+    assert fund.get_fund_returns(FUND_CODE)["stale"] is True
+
+    # 超过硬限制后不再返回旧数据
+    monkeypatch.setattr(cache_utils, "STALE_HARD_LIMIT", 60)
+    with pytest.raises(ValueError):
+        fund.get_fund_returns(FUND_CODE)
 
-SCRIPT_DIR = Path(__file__).resolve().parent
-PROJECT_DIR = SCRIPT_DIR.parent
-sys.path.insert(0, str(PROJECT_DIR))
 
-from app.fund import get_fund_info, get_fund_networth, get_fund_returns
+def test_circuit_breaker_falls_back_to_stale_data(upstream, monkeypatch):
+    fund.get_fund_returns(FUND_CODE)
+    expire_networth(FUND_CODE, seconds_ago=3600)
+    calls = []
 
-fund_code = "013594"
+    def failing_fetch(*args, **kwargs):
+        calls.append(args)
+        raise ConnectionError("upstream down")
 
-# fund_info = get_fund_info(fund_code)
-# print(fund_info)
+    def failing_get_json(*args, **kwargs):
+        raise ConnectionError("upstream down")
 
-# data = get_fund_data(fund_code)
-# print(data)
+    monkeypatch.setattr(akshare, "fund_open_fund_info_em", failing_fetch)
+    # 天天基金的增量获取失败后改为从akshare全量获取
+    monkeypatch.setattr(tiantian_api.client, "get_json", failing_get_json)
+    monkeypatch.setattr(cache_utils, "STALE_SOFT_LIMIT", 60)
+    monkeypatch.setattr(governor, "CIRCUIT_FAILURE_THRESHOLD", 3)
+    governor.reset()
 
-returns = get_fund_returns(fund_code)
-print(returns)
+    # 连续失败达到阈值后熔断，之后的请求不再访问上游，直接返回旧数据
+    results = [fund.get_fund_returns(FUND_CODE) for _ in range(6)]
+    assert all(result["stale"] for result in results)
+    assert len(calls) == 3
+    assert 'upstream_circuit_state{host="fund.eastmoney.com"} 2' in telemetry.render_prometheus()
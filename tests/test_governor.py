@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""src.utils.governor 中限流、并发控制和熔断的测试"""
+
+import threading
+import time
+
+import pytest
+
+from src.utils.governor import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, UpstreamGovernor, UpstreamUnavailableError
+
+
+def fail(governor: UpstreamGovernor, error: Exception) -> None:
+    with pytest.raises(type(error)):
+        with governor.guard():
+            raise error
+
+
+def test_circuit_opens_after_consecutive_failures_and_recovers():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    governor = UpstreamGovernor("test", rate=100, burst=10, breaker=breaker)
+
+    fail(governor, ConnectionError("down"))
+    assert breaker.state == CLOSED
+    fail(governor, ConnectionError("down"))
+    assert breaker.state == OPEN
+
+    # 熔断期间不发出请求
+    with pytest.raises(UpstreamUnavailableError):
+        with governor.guard():
+            pytest.fail("request sent while circuit is open")
+
+    # 冷却后放行一个探测请求，成功后恢复
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    governor = UpstreamGovernor("test", rate=100, burst=10, breaker=breaker)
+
+    fail(governor, TimeoutError())
+    time.sleep(0.06)
+    fail(governor, TimeoutError())
+    assert breaker.state == OPEN
+
+
+def test_abandoned_probe_releases_half_open_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    governor = UpstreamGovernor("test", rate=100, burst=10, breaker=breaker)
+
+    fail(governor, ConnectionError("down"))
+    time.sleep(0.06)
+    with pytest.raises(KeyboardInterrupt):
+        with governor.guard():
+            raise KeyboardInterrupt
+    # 探测请求没有结果，仍处于半开状态，下一个请求可以作为探测请求发出
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def test_non_network_errors_do_not_trip_breaker():
+    breaker = CircuitBreaker(failure_threshold=1)
+    governor = UpstreamGovernor("test", rate=100, burst=10, breaker=breaker)
+
+    # 上游正常响应但内容无法解析，例如基金代码不存在
+    fail(governor, KeyError("Data_netWorthTrend"))
+    assert breaker.state == CLOSED
+
+
+def test_concurrency_cap_fails_fast():
+    governor = UpstreamGovernor("test", rate=100, burst=10, concurrency=1, max_wait=0.05)
+    started, release = threading.Event(), threading.Event()
+
+    def hold():
+        with governor.guard():
+            started.set()
+            release.wait(1)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    started.wait(1)
+    try:
+        with pytest.raises(UpstreamUnavailableError):
+            with governor.guard():
+                pass
+    finally:
+        release.set()
+        thread.join()
+    assert governor.in_flight == 0
+
+
+def test_rate_limit_fails_fast():
+    governor = UpstreamGovernor("test", rate=1, burst=1, max_wait=0.05)
+
+    with governor.guard():
+        pass
+    with pytest.raises(UpstreamUnavailableError):
+        with governor.guard():
+            pass
+    # 被拒绝的请求不计为失败
+    assert governor.breaker.failures == 0
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""HTTP接口的测试，上游接口由 benchmarks.upstream.RecordedUpstream 替代"""
+
+import time
+
+import pytest
+
+akshare = pytest.importorskip("akshare")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+
+from src import fund
+from src.main import app
+
+FUND_CODE = "000001"
+
+
+@pytest.fixture
+def client(upstream):
+    with TestClient(app) as client:
+        yield client
+
+
+def test_unknown_fund_returns_404(client):
+    response = client.get("/api/fund/999999")
+
+    assert response.status_code == 404
+
+
+def test_upstream_failure_returns_502(client, monkeypatch):
+    def failing_fetch(*args, **kwargs):
+        raise ConnectionError("upstream down")
+
+    monkeypatch.setattr(akshare, "fund_open_fund_info_em", failing_fetch)
+    response = client.get(f"/api/fund/{FUND_CODE}")
+
+    assert response.status_code == 502
+
+
+def test_non_positive_investment_amount_rejected(client):
+    assert client.get(f"/api/fund/{FUND_CODE}?investment_amount=0").status_code == 422
+    assert client.get(f"/api/fund/{FUND_CODE}?investment_amount=-100000").status_code == 422
+    response = client.post("/api/funds/returns", json={"fund_codes": [FUND_CODE], "investment_amount": None})
+    assert response.status_code == 422
+
+
+def test_batch_reports_each_fund(client):
+    response = client.post("/api/funds/returns", json={"fund_codes": ["000002", FUND_CODE, "999999", FUND_CODE]})
+
+    assert response.status_code == 200
+    batch = response.json()
+    assert list(batch["results"]) == ["000002", FUND_CODE]
+    assert "FundNotFoundError" in batch["errors"]["999999"]
+
+
+def test_if_none_match_returns_304_from_cache(client, upstream):
+    first = client.get(f"/api/fund/{FUND_CODE}")
+    etag = first.headers["ETag"]
+
+    # 基金列表过期后，条件请求仍只读取缓存，不请求上游
+    fund.fund_info_cache.set(fund.FUND_INFO_KEY, fund.fund_info_cache.get_stale(fund.FUND_INFO_KEY), ttl=-60)
+    response = client.get(f"/api/fund/{FUND_CODE}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert upstream.calls["fund_name_em"] == 1
+    assert client.get(f"/api/fund/{FUND_CODE}?format=columnar", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_if_modified_since_returns_304(client):
+    first = client.get(f"/api/fund/{FUND_CODE}")
+    response = client.get(f"/api/fund/{FUND_CODE}", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+
+    assert response.status_code == 304
+
+
+def test_etag_changes_when_data_is_refetched(client):
+    etag = client.get(f"/api/fund/{FUND_CODE}").headers["ETag"]
+
+    # 净值日期不变，但数据是次日重新获取的，as_of 不同
+    key = fund.networth_cache_key(FUND_CODE)
+    expires_at, fund_data = fund.fund_networth_cache.get_entry(key)
+    fund.fund_networth_cache.set(key, fund_data, ttl=expires_at - time.time() + 86400)
+    response = client.get(f"/api/fund/{FUND_CODE}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["latest_date"] == "2025-06-13"
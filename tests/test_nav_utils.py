@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""src.utils.nav_utils 中净值合并和区间截取的测试"""
+
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from src.utils.nav_utils import merge_recent_history, tail_window
+
+
+def make_navs(start: str, periods: int, first_value: float = 1.0) -> pd.DataFrame:
+    dates = pd.bdate_range(start, periods=periods)
+    values = [round(first_value + 0.01 * i, 4) for i in range(periods)]
+    return pd.DataFrame({"净值日期": dates, "单位净值": values, "日增长率": 0.0})
+
+
+def test_merge_recent_history_appends_new_days():
+    history = make_navs("2025-01-01", 100)
+    full = make_navs("2025-01-01", 110)
+    recent = full.iloc[90:].reset_index(drop=True)
+
+    merged = merge_recent_history(history, recent)
+
+    pd.testing.assert_frame_equal(merged, full)
+
+
+def test_merge_recent_history_rejects_gap():
+    history = make_navs("2025-01-01", 100)
+    # 缓存超过一个区间未更新，最近数据与历史之间缺少交易日
+    recent = make_navs("2025-01-01", 150).iloc[120:].reset_index(drop=True)
+
+    assert merge_recent_history(history, recent) is None
+    assert merge_recent_history(history, recent.iloc[:0]) is None
+
+
+def test_merge_recent_history_rejects_restated_navs():
+    history = make_navs("2025-01-01", 100)
+    recent = make_navs("2025-01-01", 110).iloc[90:].reset_index(drop=True)
+    # 上游修正了重叠区间内的历史净值，例如分红后的净值调整
+    recent.loc[0, "单位净值"] += 0.01
+
+    assert merge_recent_history(history, recent) is None
+
+
+def test_tail_window_keeps_previous_trading_day():
+    history = make_navs("2024-01-01", 400)
+    window = tail_window(history, relativedelta(years=1))
+
+    start_date = history["净值日期"].iloc[-1] - relativedelta(years=1)
+    assert window["净值日期"].iloc[0] <= start_date < window["净值日期"].iloc[1]
+    assert tail_window(history, None) is history
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""src.returns 和 src.metrics 中收益、风险计算的测试，不依赖上游接口"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.metrics import calculate_risk_metrics, max_drawdown
+from src.returns import aggregate_weekly, calculate_period_returns, daily_returns, to_date_array
+
+
+def make_dates(start: str, periods: int) -> np.ndarray:
+    return to_date_array(pd.Series(pd.bdate_range(start, periods=periods)))
+
+
+def test_daily_returns_forward_fill_missing_navs():
+    navs = np.array([1.0, 1.1, np.nan, 1.21])
+
+    np.testing.assert_allclose(daily_returns(navs), [0.0, 0.1, 0.0, 0.1])
+    np.testing.assert_allclose(daily_returns(navs), pd.Series(navs).ffill().pct_change().fillna(0.0))
+
+
+def test_aggregate_weekly_splits_on_monday():
+    # 2025-06-02 为周一，前两个交易日在上一周
+    dates = to_date_array(pd.Series(pd.to_datetime(["2025-05-29", "2025-05-30", "2025-06-02", "2025-06-03", "2025-06-06"])))
+    weekly = aggregate_weekly(dates, np.array([1.0, 2.0, 3.0, np.nan, 5.0]))
+
+    np.testing.assert_allclose(weekly["sums"], [3.0, 8.0])
+    assert list(weekly["start_dates"]) == [dates[0], dates[2]]
+    assert list(weekly["end_dates"]) == [dates[1], dates[4]]
+
+
+def test_period_returns_match_between_single_fund_and_matrix():
+    dates = make_dates("2023-01-02", 400)
+    navs = np.linspace(1.0, 2.0, 400)
+
+    single = calculate_period_returns(dates, navs)
+    matrix = calculate_period_returns(dates, np.column_stack([navs, navs * 2]))
+
+    assert single["periods"][-1] == "since"
+    assert single["cumulative"][-1] == pytest.approx(100.0)
+    np.testing.assert_allclose(matrix["cumulative"][:, 0], single["cumulative"])
+    np.testing.assert_allclose(matrix["cumulative"][:, 1], single["cumulative"])
+
+
+def test_period_returns_without_enough_history():
+    dates = make_dates("2025-06-02", 5)
+    result = calculate_period_returns(dates, np.ones(5))
+
+    # 只有1周的数据，1个月及更长的周期无法计算
+    cumulative = dict(zip(result["periods"], result["cumulative"]))
+    assert np.isnan(cumulative["1month"]) and np.isnan(cumulative["1year"])
+    assert cumulative["since"] == 0.0
+
+    empty = calculate_period_returns(np.empty(0, dtype="int64"), np.empty(0))
+    assert np.isnan(empty["cumulative"]).all()
+
+
+def test_max_drawdown():
+    dates = make_dates("2025-01-01", 6)
+    result = max_drawdown(dates, np.array([1.0, 1.2, 0.9, 1.0, 1.2, 1.3]))
+
+    assert result["max_drawdown"] == pytest.approx(25.0)
+    assert (result["peak_date"], result["trough_date"], result["recovery_date"]) == (dates[1], dates[2], dates[4])
+    assert max_drawdown(dates, np.linspace(1, 2, 6))["max_drawdown"] == 0.0
+
+
+def test_risk_metrics_window_matches_period_returns():
+    # 最后一个交易日为周一，1年前的目标日期是周六，两者都应从此前周五的净值开始计算
+    dates = to_date_array(pd.Series(pd.bdate_range(end="2024-06-17", periods=400)))
+    navs = np.linspace(1.2, 1.0, 400) + np.sin(np.arange(400) / 5) * 0.02
+
+    period_returns = calculate_period_returns(dates, navs)
+    annualized = dict(zip(period_returns["periods"], period_returns["annualized"]))
+    assert calculate_risk_metrics(dates, navs)["annualized_return"] == pytest.approx(annualized["1year"])
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""src.screener 的离线测试，上游接口由 benchmarks.upstream.RecordedUpstream 替代"""
+
+import pytest
+
+pytest.importorskip("akshare")
+
+from src import fund, screener
+
+
+@pytest.fixture
+def screener_stats(upstream):
+    screener._stats_cache.clear()
+    yield
+    screener._stats_cache.clear()
+
+
+def test_screener_ranks_money_funds_and_reports_missing(upstream, screener_stats):
+    # 合成的8只基金中 000003、000007 为货币基金，只预热其中一只和一只普通基金
+    fund.get_fund_returns("000001")
+    fund.get_fund_returns("000003")
+
+    money = screener.screen_funds(fund_type="货币型")
+    assert (money["total"], money["missing"]) == (1, 1)
+    assert money["funds"][0]["fund_code"] == "000003"
+    assert money["funds"][0]["returns"]["1year"] > 0
+
+    everything = screener.screen_funds()
+    assert (everything["total"], everything["missing"]) == (2, 6)
+    assert {item["fund_code"] for item in everything["funds"]} == {"000001", "000003"}
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""src.warmup 的离线测试，上游接口由 benchmarks.upstream.RecordedUpstream 替代"""
+
+import pytest
+
+pytest.importorskip("akshare")
+
+from src import fund, warmup
+
+FUND_CODES = ["000001", "000002", "000003"]
+
+
+def test_warm_up_refuses_universe_larger_than_cache(upstream, monkeypatch, tmp_path):
+    monkeypatch.setattr(warmup, "cache_capacity", lambda tiantian=False: 2)
+
+    with pytest.raises(ValueError, match="MAX_FUND_CACHE"):
+        warmup.warm_up(FUND_CODES, resume_file=tmp_path / "warmup.done")
+    assert upstream.calls["fund_open_fund_info_em"] == 0
+
+
+def test_warm_up_capacity_respects_byte_limit(upstream, monkeypatch, tmp_path):
+    # 条目数上限足够，但字节上限只够保存两只基金的净值
+    monkeypatch.setattr(fund.fund_networth_cache.disk, "max_bytes", 2 * warmup.ESTIMATED_NAV_FILE_BYTES)
+    assert warmup.cache_capacity() == 2
+
+    with pytest.raises(ValueError, match="MAX_FUND_CACHE_BYTES"):
+        warmup.warm_up(FUND_CODES, resume_file=tmp_path / "warmup.done")
+    assert upstream.calls["fund_open_fund_info_em"] == 0
+    assert upstream.calls["fund_name_em"] == 0
+
+
+def test_warm_up_resume_retries_evicted_funds(upstream, tmp_path):
+    resume_file = tmp_path / "warmup.done"
+    summary = warmup.warm_up(FUND_CODES, rate=1000, resume_file=resume_file)
+    assert summary["succeeded"] == 3 and not summary["errors"]
+    assert warmup.load_completed(resume_file) == set(FUND_CODES)
+
+    # 进度文件中记为完成，但净值缓存已被淘汰的基金在下次运行时重新预热
+    del fund.fund_networth_cache.disk[fund.networth_cache_key("000001")]
+    fund.fund_networth_cache.memory.clear()
+    summary = warmup.warm_up(FUND_CODES, rate=1000, resume_file=resume_file)
+    assert (summary["total"], summary["skipped"], summary["succeeded"]) == (1, 2, 1)
+    assert warmup.is_fund_cached("000001")